@@ -1,15 +1,87 @@
-import cv2
-import pandas as pd
 from datetime import datetime
+import importlib
 import os
-import numpy as np
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-from PIL import Image, ImageTk
 import threading
 import queue
 import time
-from concurrent.futures import ThreadPoolExecutor
+
+from presenca import ArmazenamentoPresenca
+from configuracao import carregar_config, nomes_entradas
+from metricas import RegistroMetricas, ExportadorMetricas
+
+INICIO = time.perf_counter()
+
+
+# OpenCV, NumPy, PIL e os módulos que dependem deles são importados nos métodos que
+# os usam: a janela aparece sem eles, e a thread de inicialização os carrega em seguida
+MODULOS_PESADOS = ("cv2", "numpy", "PIL.Image", "PIL.ImageTk", "reconhecedor", "pipeline", "deteccao",
+                   "cameras", "cadastro", "funcionarios", "perfil", "treinamento", "nucleo")
+
+
+class ApresentadorFrames:
+    """Exibe num Label os frames publicados pelas threads de trabalho
+
+    As threads só gravam no slot (último frame vence); a exibição roda no loop
+    do Tk, com taxa limitada, atualizando sempre o mesmo PhotoImage com paste().
+    """
+
+    def __init__(self, root, label, fps_max=30, tamanho=(640, 480), metricas=None, nome="tela"):
+        self.root = root
+        self.label = label
+        self.metricas = metricas
+        self.nome = nome
+        self.intervalo = max(1, int(1000 / fps_max))
+        self.tamanho = tamanho
+        self.lock = threading.Lock()
+        self.slot = None
+        self.versao = 0
+        self.versao_exibida = 0
+        self.foto = None
+        self.agendamento = None
+
+    def publicar(self, frame_rgb):
+        """Chamado de qualquer thread com o frame RGB final (já com as sobreposições)"""
+        import cv2
+
+        if (frame_rgb.shape[1], frame_rgb.shape[0]) != self.tamanho:
+            frame_rgb = cv2.resize(frame_rgb, self.tamanho)
+        with self.lock:
+            self.slot = frame_rgb
+            self.versao += 1
+
+    def iniciar(self):
+        if self.agendamento is None:
+            self.agendamento = self.root.after(self.intervalo, self.exibir)
+
+    def parar(self):
+        if self.agendamento is not None:
+            self.root.after_cancel(self.agendamento)
+            self.agendamento = None
+
+    def exibir(self):
+        """Roda na thread do Tk; só converte quando há frame novo"""
+        from PIL import Image, ImageTk
+
+        frame = None
+        with self.lock:
+            if self.versao != self.versao_exibida:
+                frame = self.slot
+                self.versao_exibida = self.versao
+
+        if frame is not None:
+            inicio = time.perf_counter()
+            img = Image.fromarray(frame)
+            if self.foto is None:
+                self.foto = ImageTk.PhotoImage(image=img)
+                self.label.config(image=self.foto)
+            else:
+                self.foto.paste(img)
+            if self.metricas:
+                self.metricas.observar("exibicao", time.perf_counter() - inicio, tela=self.nome)
+
+        self.agendamento = self.root.after(self.intervalo, self.exibir)
 
 
 class SistemaReconhecimentoFacial:
@@ -20,40 +92,117 @@ class SistemaReconhecimentoFacial:
         self.root.configure(bg='#f0f0f0')
 
         # Variáveis de controle
-        self.reconhecendo = False
         self.capturando = False
-        self.webcam = None
         self.webcam_cadastro = None
-        self.recognizer = None
-        self.registros_hoje = set()  # Mudado de registrados_hoje para registros_hoje
         self.fila = queue.Queue()
-        self.cache_nomes = {}
+        self.fila_render = None
+        self.perfilador = None
 
         # Configurações
         self.total_imagens_cadastro = 20
-        self.ultima_captura = 0
         self.imagens_capturadas = 0
-        self.camera_index = 0
-        self.camera_index_cadastro = 0
+        self.camera_cadastro = None
 
-        # Detector de faces
-        try:
-            self.detector_face = cv2.CascadeClassifier(
-                cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-            )
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao carregar detector: {e}")
+        # Configurações ajustáveis (config.json sobre os valores padrão)
+        self.config = carregar_config()
+        self.candidatos_indice = self.config["reconhecimento"]["candidatos_indice"]
 
         # Criar pastas necessárias
         os.makedirs("faces", exist_ok=True)
         os.makedirs("registros", exist_ok=True)
         os.makedirs("recognizer", exist_ok=True)
 
+        # Latência por etapa, FPS e filas (painel de diagnóstico e arquivo do Prometheus)
+        self.metricas = RegistroMetricas()
+        self.metricas.adicionar_coletor(self.coletar_metricas)
+        self.exportador_metricas = ExportadorMetricas(self.metricas, self.config["metricas"]["arquivo"],
+                                                      self.config["metricas"]["intervalo"])
+
+        # A janela aparece já; OpenCV, núcleo, bancos, nomes e registros de hoje
+        # vêm da thread de inicialização, que avisa pela fila quando termina
+        self.pronto = threading.Event()
+        self.tempos_inicio = {}
+        self.entradas = nomes_entradas(self.config)
         self.setup_ui_simplificado()
-        self.verificar_camera()
+        self.marcar_etapa("janela", INICIO)
         self.atualizar_interface()
+        threading.Thread(target=self.inicializar, name="inicializacao", daemon=True).start()
+
+    def marcar_etapa(self, etapa, inicio):
+        """Registra a duração de uma etapa da inicialização; retorna o início da próxima"""
+        agora = time.perf_counter()
+        self.tempos_inicio[etapa] = agora - inicio
+        self.metricas.definir("inicializacao_segundos", round(agora - inicio, 3), etapa=etapa)
+        return agora
+
+    def inicializar(self):
+        """Parte pesada da inicialização, fora da thread do Tk"""
+        try:
+            inicio = time.perf_counter()
+            for modulo in MODULOS_PESADOS:
+                importlib.import_module(modulo)
+            from cameras import DescobertaCameras
+            from funcionarios import CadastroFuncionarios
+            from nucleo import NucleoReconhecimento
+            inicio = self.marcar_etapa("importacoes", inicio)
+
+            # Registros de presença (SQLite somente inserção; migra o CSV antigo uma vez)
+            self.presenca = ArmazenamentoPresenca()
+            if self.presenca.linhas_ignoradas:
+                self.fila.put(("log", f"⚠️ {self.presenca.linhas_ignoradas} linhas inválidas do "
+                                      f"{self.presenca.caminho_csv} não foram importadas"))
+            # Funcionários cadastrados: nomes e contadores sem varrer faces/
+            self.funcionarios = CadastroFuncionarios()
+            inicio = self.marcar_etapa("bancos", inicio)
+
+            # Câmeras encontradas (cache em disco); a sondagem roda fora da thread do Tk
+            descoberta = self.config["descoberta"]
+            self.descoberta = DescobertaCameras(descoberta["arquivo"], descoberta["indices"],
+                                                ao_concluir=lambda encontradas: self.fila.put(("cameras", encontradas)))
+
+            # Núcleo sem interface (captura, reconhecimento e registro); esta janela é um cliente
+            self.nucleo = NucleoReconhecimento(self.config, self.presenca,
+                                               ao_evento=self.ao_evento_nucleo, ao_frame=self.ao_frame_nucleo,
+                                               metricas=self.metricas, descoberta=self.descoberta,
+                                               funcionarios=self.funcionarios)
+            if hasattr(self, 'camera_exibida_var'):
+                self.nucleo.entrada_exibida = self.camera_exibida_var.get()
+            self.cache_nomes = self.nucleo.cache_nomes
+            inicio = self.marcar_etapa("nucleo", inicio)
+
+            # Leitura do modelo em segundo plano (não entra na espera do INICIAR)
+            self.nucleo.precarregar_modelo()
+            self.nucleo.atualizar_nomes()
+            hoje = self.nucleo.carregar_registros_hoje()
+            registros = (self.presenca.ultimos_do_dia(hoje, 20), self.presenca.contar_dia(hoje))
+            self.marcar_etapa("nomes_e_registros", inicio)
+            self.fila.put(("pronto", registros))
+        except Exception as e:
+            self.fila.put(("falha_inicio", str(e)))
+
+    def concluir_inicializacao(self, registros):
+        """Chamado pela thread do Tk quando a inicialização em segundo plano termina"""
+        # Exibição dos frames pela thread do Tk (as threads de captura só publicam)
+        fps_exibicao = self.config["interface"]["fps_exibicao"]
+        self.apresentador_cadastro = ApresentadorFrames(self.root, self.camera_cadastro_label, fps_exibicao,
+                                                        metricas=self.metricas, nome="cadastro")
+        self.apresentador_reconhecimento = ApresentadorFrames(self.root, self.camera_label, fps_exibicao,
+                                                              metricas=self.metricas, nome="reconhecimento")
+        self.exportador_metricas.iniciar()
+        self.pronto.set()
+        self.verificar_camera()
         self.atualizar_cache_nomes()
-        self.carregar_registros_hoje()  # Carregar registros do dia atual
+        self.mostrar_registros_hoje(*registros)
+        self.marcar_etapa("total", INICIO)
+        self.log("🚀 Inicialização: " + " | ".join(f"{etapa} {1000 * segundos:.0f} ms"
+                                                  for etapa, segundos in self.tempos_inicio.items()))
+
+    def sistema_pronto(self):
+        """False (com aviso) enquanto a inicialização em segundo plano não terminou"""
+        if self.pronto.is_set():
+            return True
+        messagebox.showinfo("Aguarde", "O sistema ainda está iniciando, tente novamente em instantes.")
+        return False
 
     def setup_ui_simplificado(self):
         """Interface simplificada e funcional"""
@@ -84,6 +233,11 @@ class SistemaReconhecimentoFacial:
         self.notebook.add(self.tab_treinamento, text='⚙️ TREINAMENTO')
         self.setup_aba_treinamento()
 
+        # --- ABA 4: DIAGNÓSTICO ---
+        self.tab_diagnostico = tk.Frame(self.notebook, bg='white')
+        self.notebook.add(self.tab_diagnostico, text='📊 DIAGNÓSTICO')
+        self.setup_aba_diagnostico()
+
         # ========== STATUS BAR ==========
         self.status_bar = tk.Label(self.root, text="✅ Sistema pronto",
                                    bd=1, relief=tk.SUNKEN, anchor=tk.W,
@@ -244,6 +398,36 @@ class SistemaReconhecimentoFacial:
                                               cursor='hand2')
         self.btn_limpar_registros.pack(pady=5)
 
+        # Botão para exportar o histórico no formato CSV
+        self.btn_exportar_registros = tk.Button(control_frame,
+                                                text="📤 EXPORTAR CSV",
+                                                command=self.exportar_registros,
+                                                font=('Arial', 10),
+                                                bg='#16a085', fg='white',
+                                                width=20, height=1,
+                                                relief=tk.RAISED, bd=2,
+                                                cursor='hand2')
+        self.btn_exportar_registros.pack(pady=5)
+
+        # Busca aproximada para galerias grandes (vale a partir do próximo INICIAR)
+        self.usar_indice_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(control_frame, text="Busca aproximada (galerias grandes)",
+                       variable=self.usar_indice_var,
+                       font=('Arial', 10), bg='#ecf0f1', fg='#34495e').pack(pady=5)
+
+        # Câmera mostrada na tela (todas continuam sendo reconhecidas)
+        if len(self.entradas) > 1:
+            self.camera_exibida_var = tk.StringVar(value=self.entradas[0])
+            combo = ttk.Combobox(control_frame, textvariable=self.camera_exibida_var,
+                                 values=self.entradas, state='readonly', width=25)
+            combo.bind('<<ComboboxSelected>>', self.trocar_camera_exibida)
+            combo.pack(pady=5)
+
+        # FPS, latência e descartes de cada câmera
+        self.label_desempenho = tk.Label(control_frame, text="⏱ --", justify=tk.LEFT,
+                                         font=('Arial', 9), bg='#ecf0f1', fg='#7f8c8d')
+        self.label_desempenho.pack(pady=5)
+
         # Lista de registros
         tk.Label(control_frame, text="ÚLTIMOS REGISTROS DE HOJE:",
                  font=('Arial', 11, 'bold'), bg='#ecf0f1', fg='#34495e').pack(pady=(30, 10))
@@ -256,7 +440,7 @@ class SistemaReconhecimentoFacial:
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         self.tree_registros = ttk.Treeview(tree_frame,
-                                           columns=('Hora', 'Nome', 'ID', 'Confiança'),
+                                           columns=('Hora', 'Nome', 'ID', 'Confiança', 'Entrada'),
                                            show='headings', height=8,
                                            yscrollcommand=scrollbar.set)
         self.tree_registros.pack(fill=tk.BOTH, expand=True)
@@ -266,12 +450,14 @@ class SistemaReconhecimentoFacial:
         self.tree_registros.heading('Nome', text='NOME')
         self.tree_registros.heading('ID', text='ID')
         self.tree_registros.heading('Confiança', text='CONFIANÇA')
+        self.tree_registros.heading('Entrada', text='ENTRADA')
 
         # Configurar larguras das colunas
         self.tree_registros.column('Hora', width=80)
         self.tree_registros.column('Nome', width=150)
         self.tree_registros.column('ID', width=50)
         self.tree_registros.column('Confiança', width=80)
+        self.tree_registros.column('Entrada', width=90)
 
     def setup_aba_treinamento(self):
         """Aba de treinamento simplificada"""
@@ -290,13 +476,13 @@ class SistemaReconhecimentoFacial:
 
         # Label para funcionários cadastrados
         self.label_funcionarios = tk.Label(stats_frame,
-                                           text=f"Funcionários cadastrados: {len(self.cache_nomes)}",
+                                           text="Funcionários cadastrados: ...",
                                            font=('Arial', 12), bg='#ecf0f1', fg='#34495e')
         self.label_funcionarios.pack(pady=5)
 
         # Label para total de imagens
         self.label_imagens = tk.Label(stats_frame,
-                                      text=f"Total de imagens: {self.contar_total_imagens()}",
+                                      text="Total de imagens: ...",
                                       font=('Arial', 12), bg='#ecf0f1', fg='#34495e')
         self.label_imagens.pack(pady=5)
 
@@ -316,93 +502,138 @@ class SistemaReconhecimentoFacial:
                                      cursor='hand2')
         self.btn_treinar.pack(pady=20)
 
+        # Incremental: só as pastas novas/alteradas entram via recognizer.update()
+        self.treino_incremental_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(info_frame, text="Treinamento incremental (reconstrói só quando necessário)",
+                       variable=self.treino_incremental_var,
+                       font=('Arial', 10), bg='#ecf0f1', fg='#34495e').pack()
+
         # Log
         self.log_text = scrolledtext.ScrolledText(info_frame,
                                                   height=10, width=60,
                                                   font=('Courier', 10))
         self.log_text.pack(pady=20, padx=20, fill=tk.BOTH, expand=True)
 
-    def verificar_camera(self):
-        """Verifica a câmera de forma simples"""
-        try:
-            # Tentar diferentes índices de câmera
-            indices_tentar = [0, 1, 2]
-            for i in indices_tentar:
-                cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
-                if cap.isOpened():
-                    # Testar se consegue ler um frame
-                    ret, frame = cap.read()
-                    if ret and frame is not None:
-                        self.camera_index = i
-                        self.camera_index_cadastro = i
-                        cap.release()
-                        if hasattr(self, 'status_camera_label'):
-                            self.status_camera_label.config(
-                                text=f"🟢 CÂMERA {i} DISPONÍVEL", fg='#27ae60')
-                        self.log(f"✅ Câmera detectada no índice {i}")
-                        return True
-                cap.release()
+    def setup_aba_diagnostico(self):
+        """Latências por etapa (p50/p95/p99), FPS, descartes e filas, atualizados a cada segundo"""
+        main_frame = tk.Frame(self.tab_diagnostico, bg='white')
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+
+        tk.Label(main_frame, text="DIAGNÓSTICO DE DESEMPENHO",
+                 font=('Arial', 14, 'bold'), bg='white', fg='#2c3e50').pack(pady=(0, 10))
+
+        arquivo = self.config["metricas"]["arquivo"]
+        tk.Label(main_frame,
+                 text=f"Exportado para {arquivo} a cada {self.config['metricas']['intervalo']} s"
+                 if arquivo else "Exportação desativada",
+                 font=('Arial', 9), bg='white', fg='#7f8c8d').pack()
+
+        self.texto_diagnostico = scrolledtext.ScrolledText(main_frame, height=25, font=('Courier', 9))
+        self.texto_diagnostico.pack(fill=tk.BOTH, expand=True, pady=10)
+
+        # Perfil das threads de reconhecimento, cadastro e treinamento (janela limitada)
+        opcoes = self.config["perfil"]
+        limite = f"{opcoes['frames']} frames" if opcoes["frames"] else f"{opcoes['segundos']} s"
+        self.btn_perfil = tk.Button(main_frame, text=f"🔬 PERFILAR THREADS ({limite})",
+                                    command=self.iniciar_perfil,
+                                    font=('Arial', 10), bg='#8e44ad', fg='white',
+                                    relief=tk.RAISED, bd=2, cursor='hand2')
+        self.btn_perfil.pack(pady=5)
+
+        self.root.after(1000, self.atualizar_diagnostico)
 
+    def iniciar_perfil(self):
+        """Liga o perfil; as threads de trabalho entram nele a partir do próximo frame"""
+        if not self.sistema_pronto():
+            return
+        from perfil import Perfilador
+
+        opcoes = self.config["perfil"]
+        self.perfilador = Perfilador(opcoes["pasta"], opcoes["segundos"], opcoes["frames"],
+                                     opcoes["amostragem_ms"] / 1000.0).iniciar()
+        self.nucleo.perfilador = self.perfilador
+        self.btn_perfil.config(state='disabled', bg='#95a5a6')
+        self.log(f"🔬 Perfil iniciado; resultados em {self.perfilador.pasta}")
+
+    def atualizar_diagnostico(self):
+        # Perfil concluído: avisa e libera o botão
+        if self.perfilador and self.perfilador.concluido.is_set():
+            self.log(f"🔬 Perfil concluído: {os.path.join(self.perfilador.pasta, 'resumo.txt')}")
+            self.perfilador = None
+            self.nucleo.perfilador = None
+            self.btn_perfil.config(state='normal', bg='#8e44ad')
+
+        # Só redesenha com a aba visível
+        if self.notebook.select() == str(self.tab_diagnostico):
+            posicao = self.texto_diagnostico.yview()[0]
+            self.texto_diagnostico.delete('1.0', tk.END)
+            self.texto_diagnostico.insert(tk.END, "\n".join(self.metricas.resumo()) or "Sem medições ainda")
+            self.texto_diagnostico.yview_moveto(posicao)
+        self.root.after(1000, self.atualizar_diagnostico)
+
+    def coletar_metricas(self, metricas):
+        """Profundidade das filas da interface, lida no momento da exportação"""
+        metricas.definir("fila_interface", self.fila.qsize())
+        fila_render = self.fila_render
+        if fila_render is not None:
+            metricas.definir("fila_render", len(fila_render))
+            metricas.definir_contador("frames_descartados_render", fila_render.descartados)
+
+    def verificar_camera(self):
+        """Câmera já confirmada (do cache) ou None; sem nenhuma, procura em segundo plano"""
+        camera = self.descoberta.conhecida()
+        if camera is not None:
+            self.mostrar_cameras([camera])
+        else:
             if hasattr(self, 'status_camera_label'):
-                self.status_camera_label.config(
-                    text="🔴 CÂMERA NÃO ENCONTRADA", fg='#e74c3c')
-            return False
-        except Exception as e:
+                self.status_camera_label.config(text="🟡 Procurando câmera...", fg='#e67e22')
+            self.descoberta.descobrir()
+        return camera
+
+    def mostrar_cameras(self, encontradas):
+        """Resultado da descoberta (chamado pela thread do Tk)"""
+        if encontradas:
+            i = encontradas[0]["indice"]
             if hasattr(self, 'status_camera_label'):
                 self.status_camera_label.config(
-                    text=f"🔴 ERRO NA CÂMERA", fg='#e74c3c')
-            return False
+                    text=f"🟢 CÂMERA {i} DISPONÍVEL", fg='#27ae60')
+            self.log(f"✅ Câmera detectada no índice {i} (confirmada em {encontradas[0]['confirmada']})")
+        elif hasattr(self, 'status_camera_label'):
+            self.status_camera_label.config(
+                text="🔴 CÂMERA NÃO ENCONTRADA", fg='#e74c3c')
 
     def carregar_registros_hoje(self):
         """Carrega os registros do dia atual para a interface"""
         try:
-            self.registros_hoje.clear()
-
-            # Limpar treeview
-            if hasattr(self, 'tree_registros'):
-                for item in self.tree_registros.get_children():
-                    self.tree_registros.delete(item)
-
-            # Carregar registros do arquivo CSV
-            arquivo = "registros/presenca.csv"
-            if os.path.exists(arquivo):
-                df = pd.read_csv(arquivo)
-                hoje = datetime.now().strftime('%Y-%m-%d')
-
-                # Filtrar registros de hoje
-                df_hoje = df[df['Data'] == hoje]
-
-                # Adicionar à treeview e ao set de registros
-                for _, row in df_hoje.iterrows():
-                    self.registros_hoje.add(row['ID'])
-                    self.tree_registros.insert('', 0, values=(
-                        row['Hora'],
-                        row['Nome'],
-                        row['ID'],
-                        row['Confianca']
-                    ))
-
-                self.log(f"📋 Carregados {len(df_hoje)} registros de hoje")
+            # Consultas pelo índice de data: só os registros de hoje são lidos
+            hoje = self.nucleo.carregar_registros_hoje()
+            # A treeview mostra no máximo 20 linhas, então só essas são buscadas
+            self.mostrar_registros_hoje(self.presenca.ultimos_do_dia(hoje, 20), self.presenca.contar_dia(hoje))
         except Exception as e:
             self.log(f"Erro ao carregar registros: {e}")
 
+    def mostrar_registros_hoje(self, ultimos, total):
+        if hasattr(self, 'tree_registros'):
+            self.tree_registros.delete(*self.tree_registros.get_children())
+            for id_func, nome, hora, confianca, entrada in ultimos:
+                self.tree_registros.insert('', tk.END, values=(
+                    hora,
+                    nome,
+                    id_func,
+                    f"{confianca:.1f}%",
+                    entrada or ""
+                ))
+
+        self.log(f"📋 Carregados {total} registros de hoje")
+
     def contar_total_imagens(self):
-        """Conta o total de imagens disponíveis"""
-        try:
-            total = 0
-            if os.path.exists("faces"):
-                for pasta in os.listdir("faces"):
-                    caminho = os.path.join("faces", pasta)
-                    if os.path.isdir(caminho):
-                        for arquivo in os.listdir(caminho):
-                            if arquivo.lower().endswith(('.jpg', '.jpeg', '.png')):
-                                total += 1
-            return total
-        except:
-            return 0
+        """Total de imagens cadastradas (mantido pelo registro de funcionários)"""
+        return self.funcionarios.total_imagens()
 
     def iniciar_cadastro(self):
         """Inicia o cadastro de forma simples"""
+        if not self.sistema_pronto():
+            return
         nome = self.nome_entry.get().strip()
         id_func = self.id_entry.get().strip()
 
@@ -417,10 +648,13 @@ class SistemaReconhecimentoFacial:
             messagebox.showerror("Erro", "ID deve ser um número!")
             return
 
-        # Verificar câmera
-        if not self.verificar_camera():
-            messagebox.showerror("Erro", "Câmera não disponível!")
+        # Câmera já confirmada: começa na hora, sem sondar os índices de novo
+        camera = self.verificar_camera()
+        if camera is None:
+            messagebox.showwarning("Atenção", "Nenhuma câmera confirmada ainda. Procurando câmeras, "
+                                              "tente novamente em alguns segundos.")
             return
+        self.camera_cadastro = camera
 
         # Criar pasta
         self.pasta_destino = f"faces/{id_func}_{nome}"
@@ -439,75 +673,96 @@ class SistemaReconhecimentoFacial:
         self.log(f"📸 Iniciando cadastro: {nome} (ID: {id_func})")
 
         # Iniciar captura
+        self.apresentador_cadastro.iniciar()
         self.thread_captura = threading.Thread(target=self.capturar_faces, daemon=True)
         self.thread_captura.start()
 
     def capturar_faces(self):
         """Captura faces de forma simples e rápida"""
+        import cv2
+        from cadastro import FiltroQualidade, GravadorCadastro
+        from cameras import abrir_camera
+        from deteccao import DetectorFaces
+        from treinamento import EXTENSOES_IMAGEM
+
         try:
-            self.webcam_cadastro = cv2.VideoCapture(0)
-            self.webcam_cadastro.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.webcam_cadastro.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            camera = self.camera_cadastro
+            self.webcam_cadastro = abrir_camera(camera["indice"], camera["backend"], 640, 480)
 
-            if not self.webcam_cadastro.isOpened():
+            if self.webcam_cadastro is None:
+                # A câmera do cache sumiu: esquece e procura de novo em segundo plano
+                self.descoberta.invalidar(camera["indice"], camera["backend"])
                 self.fila.put(("erro", "Não foi possível abrir a câmera!"))
                 return
 
             nome = self.nome_entry.get().strip()
+            # Só recortes nítidos, de uma face por vez e diferentes dos já aceitos entram no cadastro
+            opcoes = self.config["cadastro"]
+            filtro = FiltroQualidade(opcoes["nitidez_minima"], opcoes["distancia_hash_minima"])
+            gravador = GravadorCadastro("faces", os.path.basename(self.pasta_destino), self.metricas)
+            # Detector próprio: o do reconhecimento pode estar rodando em outra thread
+            detector = DetectorFaces.de_config(self.config["deteccao"])
 
             while self.capturando and self.imagens_capturadas < self.total_imagens_cadastro:
-                ret, frame = self.webcam_cadastro.read()
+                if self.perfilador:
+                    self.perfilador.quadro("cadastro")
+                with self.metricas.cronometro("captura", entrada="cadastro"):
+                    ret, frame = self.webcam_cadastro.read()
                 if not ret:
                     continue
 
-                frame_processado = frame.copy()
-                cinza = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
                 # Detectar faces
-                faces = self.detector_face.detectMultiScale(
-                    cinza, scaleFactor=1.1, minNeighbors=5, minSize=(100, 100))
+                with self.metricas.cronometro("deteccao", entrada="cadastro"):
+                    cinza = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                    faces = detector.detectar(cinza)
+
+                # O buffer RGB de exibição é uma cópia nova; os recortes saem do frame original
+                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
                 # Desenhar retângulos
                 for (x, y, w, h) in faces:
-                    cv2.rectangle(frame_processado, (x, y), (x + w, y + h), (0, 255, 0), 2)
+                    cv2.rectangle(frame_rgb, (x, y), (x + w, y + h), (0, 255, 0), 2)
 
                 # Adicionar informações no frame
-                cv2.putText(frame_processado, f"CADASTRO: {nome}", (10, 30),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
-                cv2.putText(frame_processado, f"IMAGENS: {self.imagens_capturadas}/{self.total_imagens_cadastro}",
+                cv2.putText(frame_rgb, f"CADASTRO: {nome}", (10, 30),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+                cv2.putText(frame_rgb, f"IMAGENS: {self.imagens_capturadas}/{self.total_imagens_cadastro}",
                             (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
 
-                # Capturar imagens
-                if len(faces) > 0:
-                    for (x, y, w, h) in faces:
-                        if time.time() - self.ultima_captura > 0.3 and self.imagens_capturadas < self.total_imagens_cadastro:
-                            rosto = frame[y:y + h, x:x + w]
-                            rosto = cv2.resize(rosto, (200, 200))
-
-                            self.imagens_capturadas += 1
-                            cv2.imwrite(f"{self.pasta_destino}/{self.imagens_capturadas}.jpg", rosto)
-                            self.ultima_captura = time.time()
+                if len(faces) > 1:
+                    cv2.putText(frame_rgb, "UMA PESSOA POR VEZ", (10, 90),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 80, 80), 2)
 
-                            # Atualizar progresso
-                            self.progress_var.set(self.imagens_capturadas)
-                            self.progress_label.config(
-                                text=f"{self.imagens_capturadas}/{self.total_imagens_cadastro} imagens")
+                # Capturar imagens (a gravação em disco fica com o gravador)
+                aceita = filtro.avaliar(cinza, faces)
+                if aceita is not None:
+                    x, y, w, h = aceita
+                    rosto = cv2.resize(frame[y:y + h, x:x + w], (200, 200))
+                    self.imagens_capturadas += 1
+                    gravador.enfileirar(f"{self.imagens_capturadas}.jpg", rosto)
 
-                            if self.imagens_capturadas >= self.total_imagens_cadastro:
-                                break
+                    # Atualizar progresso (pela thread do Tk)
+                    self.fila.put(("progresso", self.imagens_capturadas))
 
                 # Mostrar frame
-                frame_rgb = cv2.cvtColor(frame_processado, cv2.COLOR_BGR2RGB)
-                img = Image.fromarray(frame_rgb)
-                img = img.resize((640, 480))
-                imgtk = ImageTk.PhotoImage(image=img)
-                self.camera_cadastro_label.config(image=imgtk)
-                self.camera_cadastro_label.image = imgtk
+                self.apresentador_cadastro.publicar(frame_rgb)
 
-                time.sleep(0.03)
+            # Esperar as gravações pendentes
+            gravadas = gravador.finalizar()
+            rejeitadas = filtro.rejeitadas
+            self.log(f"🧹 Descartadas: {rejeitadas['borrada']} borradas, {rejeitadas['repetida']} repetidas, "
+                     f"{rejeitadas['varias_faces']} com mais de uma face")
+            for erro in gravador.erros:
+                self.log(f"⚠️ Falha ao gravar {erro}")
+            self.imagens_capturadas = gravadas
 
             # Finalizar cadastro
             if self.imagens_capturadas > 0:
+                # Num recadastro podem sobrar imagens antigas na pasta: conta a pasta toda
+                pasta = os.path.basename(self.pasta_destino)
+                imagens = sum(1 for a in os.listdir(self.pasta_destino) if a.lower().endswith(EXTENSOES_IMAGEM))
+                id_func, nome_func = pasta.split("_", 1)
+                self.funcionarios.registrar_cadastro(int(id_func), nome_func, pasta, imagens)
                 self.fila.put(("concluido", f"Cadastro concluído! {self.imagens_capturadas} imagens salvas."))
                 self.atualizar_cache_nomes()
             else:
@@ -516,206 +771,221 @@ class SistemaReconhecimentoFacial:
         except Exception as e:
             self.fila.put(("erro", f"Erro na captura: {str(e)}"))
         finally:
+            if self.perfilador:
+                self.perfilador.sair()
             if self.webcam_cadastro:
                 self.webcam_cadastro.release()
 
     def iniciar_reconhecimento(self):
         """Inicia o reconhecimento facial"""
-        if not os.path.exists("recognizer/trainer.yml"):
+        if not self.sistema_pronto():
+            return
+        from nucleo import CAMINHO_MODELO
+        from pipeline import FilaDescarte
+
+        if not os.path.exists(CAMINHO_MODELO):
             messagebox.showerror("Erro", "Treine o modelo primeiro!")
             return
 
         # Carregar registros de hoje antes de iniciar
         self.carregar_registros_hoje()
 
-        self.reconhecendo = True
         self.btn_iniciar_reconhecimento.config(state='disabled', bg='#95a5a6')
         self.btn_parar_reconhecimento.config(state='normal', bg='#e74c3c')
 
         # Carregar modelo
         self.carregar_modelo()
 
-        # Iniciar captura
-        self.thread_reconhecimento = threading.Thread(target=self.capturar_reconhecimento, daemon=True)
-        self.thread_reconhecimento.start()
+        # Iniciar captura; os frames da câmera exibida chegam por ao_frame_nucleo
+        self.apresentador_reconhecimento.iniciar()
+        self.fila_render = FilaDescarte(2)
+        threading.Thread(target=self.renderizar_reconhecimento,
+                         args=(self.fila_render,), daemon=True).start()
+        self.nucleo.iniciar()
 
         self.log("👁️ Reconhecimento iniciado")
 
     def carregar_modelo(self):
         """Carrega o modelo de reconhecimento"""
         try:
-            self.recognizer = cv2.face.LBPHFaceRecognizer_create()
-            self.recognizer.read("recognizer/trainer.yml")
-            self.log("✅ Modelo carregado")
+            recognizer = self.nucleo.carregar_modelo(self.usar_indice_var.get())
+            self.log(f"✅ Modelo carregado ({len(recognizer)} histogramas)")
         except Exception as e:
             self.fila.put(("erro", f"Erro ao carregar modelo: {e}"))
 
-    def capturar_reconhecimento(self):
-        """Captura e reconhece faces"""
-        try:
-            self.webcam = cv2.VideoCapture(0)
-            self.webcam.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.webcam.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    def ao_evento_nucleo(self, tipo, valor):
+        """Eventos do núcleo chegam de outras threads: só entram na fila"""
+        self.fila.put((tipo, valor))
 
-            if not self.webcam.isOpened():
-                self.fila.put(("erro", "Não foi possível abrir a câmera!"))
-                return
+    def ao_frame_nucleo(self, instante, frame, sobreposicoes):
+        if self.fila_render is not None:
+            self.fila_render.put((instante, frame, sobreposicoes))
 
-            while self.reconhecendo:
-                ret, frame = self.webcam.read()
-                if not ret:
-                    continue
+    def trocar_camera_exibida(self, event=None):
+        # Antes de pronto, a escolha é aplicada quando o núcleo é criado
+        if self.pronto.is_set():
+            self.nucleo.entrada_exibida = self.camera_exibida_var.get()
+
+    def renderizar_reconhecimento(self, fila_render):
+        """Estágio de exibição: desenha as identidades e mede a latência fim a fim"""
+        import cv2
+        from pipeline import MedidorDesempenho
+
+        medidor = MedidorDesempenho()
+        ultimo_relatorio = time.perf_counter()
 
-                cinza = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = self.detector_face.detectMultiScale(
-                    cinza, scaleFactor=1.1, minNeighbors=5, minSize=(100, 100))
+        while True:
+            item = fila_render.get(timeout=0.5)
+            if item is None:
+                if fila_render.fechada:
+                    break
+            else:
+                instante, frame, sobreposicoes = item
+                inicio_desenho = time.perf_counter()
 
                 frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-                for (x, y, w, h) in faces:
-                    if self.recognizer:
-                        try:
-                            id_pred, conf = self.recognizer.predict(cinza[y:y + h, x:x + w])
-                            nome = self.cache_nomes.get(id_pred, "Desconhecido")
-
-                            if conf < 80:  # Confiança boa (menor é melhor no LBPH)
-                                cv2.rectangle(frame_rgb, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                                cv2.putText(frame_rgb, f"{nome}", (x, y - 10),
-                                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                                cv2.putText(frame_rgb, f"{100 - conf:.0f}%", (x, y + h + 20),
-                                            # Converter para porcentagem de confiança
-                                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-
-                                # Registrar presença (verificar se já registrou hoje)
-                                if id_pred not in self.registros_hoje:
-                                    self.fila.put(("registrar", (id_pred, nome, 100 - conf)))  # Passar porcentagem
-                            else:
-                                cv2.rectangle(frame_rgb, (x, y), (x + w, y + h), (0, 0, 255), 2)
-                                cv2.putText(frame_rgb, "Desconhecido", (x, y - 10),
-                                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-                        except Exception as e:
-                            cv2.rectangle(frame_rgb, (x, y), (x + w, y + h), (0, 0, 255), 2)
-                            cv2.putText(frame_rgb, "Erro", (x, y - 10),
-                                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+                # Desenhar a identidade em cache de cada trilha visível
+                for (x, y, w, h), nome, conf, confirmada in sobreposicoes:
+                    if confirmada:
+                        cv2.rectangle(frame_rgb, (x, y), (x + w, y + h), (0, 255, 0), 2)
+                        cv2.putText(frame_rgb, f"{nome}", (x, y - 10),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                        cv2.putText(frame_rgb, f"{100 - conf:.0f}%", (x, y + h + 20),
+                                    # Converter para porcentagem de confiança
+                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+                    else:
+                        cv2.rectangle(frame_rgb, (x, y), (x + w, y + h), (0, 0, 255), 2)
+                        cv2.putText(frame_rgb, nome, (x, y - 10),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
 
                 # Mostrar frame
-                img = Image.fromarray(frame_rgb)
-                img = img.resize((640, 480))
-                imgtk = ImageTk.PhotoImage(image=img)
-                self.camera_label.config(image=imgtk)
-                self.camera_label.image = imgtk
+                self.apresentador_reconhecimento.publicar(frame_rgb)
+                self.metricas.observar("desenho", time.perf_counter() - inicio_desenho)
 
-                time.sleep(0.03)
+                # Latência da leitura da câmera até o frame pronto para a tela
+                medidor.registrar(time.perf_counter() - instante)
+                self.metricas.observar("fim_a_fim", time.perf_counter() - instante)
 
-        except Exception as e:
-            self.log(f"Erro no reconhecimento: {e}")
-        finally:
-            if self.webcam:
-                self.webcam.release()
+            # Relatório por câmera mesmo quando a exibida para de mandar frames
+            if time.perf_counter() - ultimo_relatorio >= 1.0:
+                ultimo_relatorio = time.perf_counter()
+                linhas = [f"⏱ tela {medidor.fps():.1f} FPS | latência {medidor.latencia_ms(50):.0f} ms "
+                          f"(p95 {medidor.latencia_ms(95):.0f} ms) | descartados {fila_render.descartados}"]
+                linhas += self.nucleo.resumo_desempenho()
+                self.fila.put(("desempenho", "\n".join(linhas)))
 
     def treinar_modelo(self):
         """Treina o modelo de forma simples e eficiente"""
+        if not self.sistema_pronto():
+            return
+        incremental = self.treino_incremental_var.get()
 
         def treinar():
-            try:
-                faces = []
-                ids = []
-                funcionarios = 0
-                imagens_por_funcionario = {}
+            from reconhecedor import ReconhecedorLBPH, IndiceCentroides, avaliar_indice
+            from treinamento import (listar_funcionarios, carregar_manifesto, salvar_manifesto,
+                                     planejar_treinamento, carregar_imagens, treinar_lbph,
+                                     atualizar_manifesto)
 
+            try:
                 self.status_treinamento.config(text="⏳ Carregando imagens...", fg='#e67e22')
                 self.log("🔍 Iniciando treinamento...")
+                inicio = time.perf_counter()
 
                 if not os.path.exists("faces"):
                     self.fila.put(("erro_treinamento", "Pasta 'faces' não encontrada!"))
                     return
 
                 # Listar todas as pastas de funcionários
-                pastas = [p for p in os.listdir("faces") if os.path.isdir(os.path.join("faces", p))]
+                funcionarios_pastas, ignoradas = listar_funcionarios()
+                for pasta in ignoradas:
+                    self.log(f"⚠️ Pasta ignorada: {pasta}")
 
-                if len(pastas) == 0:
+                if len(funcionarios_pastas) == 0:
                     self.fila.put(("erro_treinamento", "Nenhum funcionário cadastrado!"))
                     return
 
-                self.log(f"📂 Encontradas {len(pastas)} pastas de funcionários")
-
-                for pasta in pastas:
-                    caminho = os.path.join("faces", pasta)
-                    try:
-                        # Extrair ID e nome da pasta
-                        partes = pasta.split("_", 1)
-                        if len(partes) != 2:
-                            continue
-
-                        id_func = int(partes[0])
-                        nome_func = partes[1]
-
-                        # Listar imagens
-                        imagens = []
-                        for arquivo in os.listdir(caminho):
-                            if arquivo.lower().endswith(('.jpg', '.jpeg', '.png')):
-                                img_path = os.path.join(caminho, arquivo)
-                                # Ler imagem em escala de cinza
-                                img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
-                                if img is not None:
-                                    # Redimensionar para tamanho padrão
-                                    img = cv2.resize(img, (200, 200))
-                                    # Equalizar histograma para melhor contraste
-                                    img = cv2.equalizeHist(img)
-                                    faces.append(img)
-                                    ids.append(id_func)
-                                    imagens.append(arquivo)
-
-                        if len(imagens) > 0:
-                            funcionarios += 1
-                            imagens_por_funcionario[nome_func] = len(imagens)
-                            self.log(f"✅ {nome_func}: {len(imagens)} imagens")
-
-                    except ValueError as e:
-                        self.log(f"⚠️ Pasta ignorada: {pasta}")
-                        continue
-                    except Exception as e:
-                        self.log(f"⚠️ Erro ao processar {pasta}: {str(e)}")
-                        continue
-
-                if len(faces) == 0:
-                    self.fila.put(("erro_treinamento", "Nenhuma imagem válida encontrada!"))
-                    return
+                self.log(f"📂 Encontradas {len(funcionarios_pastas)} pastas de funcionários")
 
-                # Converter para numpy array
-                faces_array = np.array(faces, dtype=np.uint8)
-                ids_array = np.array(ids, dtype=np.int32)
+                # Comparar com o manifesto para treinar só o que mudou
+                manifesto = carregar_manifesto()
+                modo, pendentes, motivo = planejar_treinamento(funcionarios_pastas, manifesto)
+                if not incremental and modo != "completo":
+                    modo = "completo"
+                    pendentes = {p: sorted(i["imagens"]) for p, i in funcionarios_pastas.items()}
+                    motivo = "treinamento incremental desativado"
+                self.log(f"🧭 Modo {modo}: {motivo}")
+                inicio = self.fim_fase("listagem", inicio)
 
-                self.status_treinamento.config(text=f"⚡ Treinando com {len(faces)} imagens...", fg='#3498db')
-                self.log(f"⚡ Iniciando treinamento com {len(faces)} imagens de {funcionarios} funcionários")
+                if modo == "atualizado":
+                    self.fila.put(("sucesso_treinamento", "✅ Modelo já está atualizado!"))
+                    return
 
-                # Criar e treinar o reconhecedor LBPH
-                recognizer = cv2.face.LBPHFaceRecognizer_create(
-                    radius=1,
-                    neighbors=8,
-                    grid_x=8,
-                    grid_y=8,
-                    threshold=80.0
-                )
+                # Pré-processamento em paralelo; imagens sem alteração vêm do cache
+                faces, ids, carregadas, decodificadas = carregar_imagens(funcionarios_pastas, pendentes)
+                inicio = self.fim_fase("preprocessamento", inicio)
+                self.log(f"🗃️ {decodificadas} imagens decodificadas, as demais vieram do cache")
 
-                # Treinar o modelo
-                recognizer.train(faces_array, ids_array)
+                for info in carregadas.values():
+                    if info['imagens']:
+                        self.log(f"✅ {info['nome']}: {len(info['imagens'])} imagens")
 
-                # Salvar o modelo
-                recognizer.write("recognizer/trainer.yml")
+                if len(faces) == 0:
+                    if modo != "incremental":
+                        self.fila.put(("erro_treinamento", "Nenhuma imagem válida encontrada!"))
+                        return
+                    # Só imagens ilegíveis pendentes: ficam no manifesto como falhas para não
+                    # voltarem como pendentes, e o modelo atual continua valendo
+                    falhas = sum(len(info["falhas"]) for info in carregadas.values())
+                    salvar_manifesto(atualizar_manifesto(manifesto, carregadas, modo))
+                    self.log(f"⚠️ {falhas} imagens ilegíveis registradas no manifesto e ignoradas")
+                    self.fila.put(("sucesso_treinamento",
+                                   f"✅ Modelo já está atualizado!\n• {falhas} imagens ilegíveis ignoradas"))
+                    return
 
-                # Atualizar cache de nomes
+                self.status_treinamento.config(text=f"⚡ Treinando com {len(faces)} imagens...", fg='#3498db')
+                self.log(f"⚡ Iniciando treinamento com {len(faces)} imagens de {len(set(ids.tolist()))} funcionários")
+
+                # Treinar do zero ou atualizar o modelo existente
+                recognizer = treinar_lbph(faces, ids, modo)
+                reconhecedor = ReconhecedorLBPH.de_modelo_cv2(recognizer)
+                inicio = self.fim_fase("treino", inicio)
+
+                # Índice de busca aproximada e comparação com o LBPH exato
+                self.status_treinamento.config(text="📈 Construindo índice...", fg='#3498db')
+                indice = IndiceCentroides.construir(reconhecedor, self.candidatos_indice)
+                relatorio = avaliar_indice(indice)
+                self.log(f"📈 Índice ({self.candidatos_indice} candidatos): "
+                         f"{relatorio['concordancia']:.1f}% igual ao LBPH exato em {relatorio['amostras']} consultas, "
+                         f"{relatorio['tempo_indice_ms']:.1f} ms vs {relatorio['tempo_exato_ms']:.1f} ms")
+                inicio = self.fim_fase("indice", inicio)
+
+                # Nova versão do modelo (com índice e nomes); com o reconhecimento rodando, entra a quente.
+                # O registro acompanha a listagem que acabou de ser feita (pastas copiadas à mão entram aqui)
+                self.funcionarios.reconciliar(funcionarios_pastas)
                 self.atualizar_cache_nomes()
+                versao = self.nucleo.publicar_modelo(reconhecedor, indice)
+                self.funcionarios.marcar_treinados([info["id"] for info in carregadas.values() if info["imagens"]],
+                                                   versao)
+                self.log(f"📦 Modelo publicado como versão {versao}")
+                del recognizer, reconhecedor, indice
+
+                # Registrar no manifesto o que agora está no trainer.yml
+                manifesto = atualizar_manifesto(manifesto, carregadas, modo)
+                salvar_manifesto(manifesto)
+                self.fim_fase("manifesto", inicio)
 
                 # Estatísticas finais
-                total_imagens = len(faces)
-                mensagem = f"✅ Treinamento concluído!\n• {total_imagens} imagens\n• {funcionarios} funcionários"
+                funcionarios = sum(1 for p in manifesto["pastas"].values() if p["imagens"])
+                total_imagens = sum(len(p["imagens"]) for p in manifesto["pastas"].values())
+                mensagem = (f"✅ Treinamento concluído!\n• {total_imagens} imagens\n• {funcionarios} funcionários"
+                            f"\n• {len(faces)} imagens processadas ({modo})")
 
                 self.fila.put(("sucesso_treinamento", mensagem))
                 self.log(f"✅ Modelo treinado com sucesso! {total_imagens} imagens, {funcionarios} funcionários")
 
                 # Atualizar estatísticas na interface
-                self.label_funcionarios.config(text=f"Funcionários cadastrados: {len(self.cache_nomes)}")
+                self.label_funcionarios.config(text=f"Funcionários cadastrados: {self.funcionarios.total_funcionarios()}")
                 self.label_imagens.config(text=f"Total de imagens: {self.contar_total_imagens()}")
 
             except Exception as e:
@@ -727,27 +997,30 @@ class SistemaReconhecimentoFacial:
         self.btn_treinar.config(state='disabled', bg='#95a5a6', text="TREINANDO...")
 
         # Iniciar thread de treinamento
-        thread = threading.Thread(target=treinar, daemon=True)
+        def treinar_com_perfil():
+            # Com o perfil ligado, a rodada inteira de treinamento é perfilada
+            perfilador = self.perfilador
+            if perfilador is None:
+                return treinar()
+            with perfilador.perfilar("treinamento"):
+                treinar()
+
+        thread = threading.Thread(target=treinar_com_perfil, daemon=True)
         thread.start()
 
+    def fim_fase(self, fase, inicio):
+        """Registra a duração de uma fase do treinamento; retorna o início da próxima"""
+        agora = time.perf_counter()
+        self.metricas.definir("treinamento_fase_segundos", round(agora - inicio, 3), fase=fase)
+        return agora
+
     def atualizar_cache_nomes(self):
         """Atualiza o cache de nomes"""
-        self.cache_nomes.clear()
-        if os.path.exists("faces"):
-            for pasta in os.listdir("faces"):
-                if os.path.isdir(os.path.join("faces", pasta)):
-                    try:
-                        partes = pasta.split("_", 1)
-                        if len(partes) == 2:
-                            id_func = int(partes[0])
-                            nome = partes[1]
-                            self.cache_nomes[id_func] = nome
-                    except:
-                        continue
+        self.nucleo.atualizar_nomes()
 
         # Atualizar label na aba de treinamento se existir
         if hasattr(self, 'label_funcionarios'):
-            self.label_funcionarios.config(text=f"Funcionários cadastrados: {len(self.cache_nomes)}")
+            self.label_funcionarios.config(text=f"Funcionários cadastrados: {self.funcionarios.total_funcionarios()}")
 
         total_imagens = self.contar_total_imagens()
         if hasattr(self, 'label_imagens'):
@@ -756,6 +1029,7 @@ class SistemaReconhecimentoFacial:
     def parar_cadastro(self):
         """Para o cadastro"""
         self.capturando = False
+        self.apresentador_cadastro.parar()
         if hasattr(self, 'btn_iniciar_cadastro'):
             self.btn_iniciar_cadastro.config(state='normal', bg='#27ae60')
         if hasattr(self, 'btn_parar_cadastro'):
@@ -764,7 +1038,11 @@ class SistemaReconhecimentoFacial:
 
     def parar_reconhecimento(self):
         """Para o reconhecimento"""
-        self.reconhecendo = False
+        self.nucleo.parar()
+        if self.fila_render is not None:
+            self.fila_render.fechar()
+            self.fila_render = None
+        self.apresentador_reconhecimento.parar()
         if hasattr(self, 'btn_iniciar_reconhecimento'):
             self.btn_iniciar_reconhecimento.config(state='normal', bg='#27ae60')
         if hasattr(self, 'btn_parar_reconhecimento'):
@@ -773,20 +1051,14 @@ class SistemaReconhecimentoFacial:
 
     def limpar_registros_hoje(self):
         """Limpa os registros do dia atual"""
+        if not self.sistema_pronto():
+            return
         if messagebox.askyesno("Confirmar", "Deseja limpar todos os registros de hoje?"):
             try:
-                arquivo = "registros/presenca.csv"
-                if os.path.exists(arquivo):
-                    df = pd.read_csv(arquivo)
-                    hoje = datetime.now().strftime('%Y-%m-%d')
-                    # Manter apenas registros de outros dias
-                    df_outros = df[df['Data'] != hoje]
-                    df_outros.to_csv(arquivo, index=False)
-
-                # Limpar set e treeview
-                self.registros_hoje.clear()
-                for item in self.tree_registros.get_children():
-                    self.tree_registros.delete(item)
+                self.nucleo.limpar_registros_hoje()
+
+                # Limpar treeview
+                self.tree_registros.delete(*self.tree_registros.get_children())
 
                 self.log("🗑 Registros de hoje limpos")
                 messagebox.showinfo("Sucesso", "Registros de hoje foram limpos!")
@@ -794,57 +1066,43 @@ class SistemaReconhecimentoFacial:
                 self.log(f"Erro ao limpar registros: {e}")
                 messagebox.showerror("Erro", f"Erro ao limpar registros: {e}")
 
-    def registrar_presenca(self, id_func, nome, confianca):
-        """Registra presença"""
+    def exportar_registros(self):
+        """Exporta o histórico de presença para registros/presenca.csv"""
+        if not self.sistema_pronto():
+            return
         try:
-            hora = datetime.now()
-
-            # Verificar novamente se já registrou hoje (double-check)
-            if id_func in self.registros_hoje:
-                self.log(f"⚠️ {nome} já registrado hoje")
-                return
-
-            registro = {
-                "ID": id_func,
-                "Nome": nome,
-                "Data": hora.strftime('%Y-%m-%d'),
-                "Hora": hora.strftime('%H:%M:%S'),
-                "Confianca": f"{confianca:.1f}%"
-            }
-
-            arquivo = "registros/presenca.csv"
-
-            # Salvar no CSV
-            if not os.path.exists(arquivo):
-                pd.DataFrame([registro]).to_csv(arquivo, index=False)
-            else:
-                df = pd.read_csv(arquivo)
-                df = pd.concat([df, pd.DataFrame([registro])], ignore_index=True)
-                df.to_csv(arquivo, index=False)
-
-            # Adicionar ao set de registros de hoje
-            self.registros_hoje.add(id_func)
+            total = self.presenca.exportar_csv()
+            self.log(f"📤 {total} registros exportados para {self.presenca.caminho_csv}")
+            messagebox.showinfo("Sucesso", f"{total} registros exportados para\n{self.presenca.caminho_csv}")
+        except Exception as e:
+            self.log(f"Erro ao exportar registros: {e}")
+            messagebox.showerror("Erro", f"Erro ao exportar registros: {e}")
 
+    def mostrar_registro(self, id_func, nome, confianca, entrada, hora):
+        """Mostra na interface um registro já gravado pelo núcleo"""
+        try:
             # Atualizar treeview
             if hasattr(self, 'tree_registros'):
                 self.tree_registros.insert('', 0, values=(
                     hora.strftime('%H:%M:%S'),
                     nome,
                     id_func,
-                    f"{confianca:.1f}%"
+                    f"{confianca:.1f}%",
+                    entrada or ""
                 ))
 
                 # Limitar número de registros na treeview
                 if len(self.tree_registros.get_children()) > 20:
                     self.tree_registros.delete(self.tree_registros.get_children()[-1])
 
-            self.log(f"✅ REGISTRADO: {nome} (ID: {id_func}) - Confiança: {confianca:.1f}%")
+            origem = f" em {entrada}" if entrada else ""
+            self.log(f"✅ REGISTRADO: {nome} (ID: {id_func}){origem} - Confiança: {confianca:.1f}%")
 
             # Mostrar mensagem visual na interface
             self.status_bar.config(text=f"✅ Registrado: {nome} às {hora.strftime('%H:%M:%S')}")
 
         except Exception as e:
-            self.log(f"❌ Erro ao registrar: {e}")
+            self.log(f"❌ Erro ao mostrar registro: {e}")
 
     def log(self, mensagem):
         """Adiciona mensagem ao log"""
@@ -867,7 +1125,7 @@ class SistemaReconhecimentoFacial:
                     self.atualizar_cache_nomes()
                     # Atualizar contadores
                     if hasattr(self, 'label_funcionarios'):
-                        self.label_funcionarios.config(text=f"Funcionários cadastrados: {len(self.cache_nomes)}")
+                        self.label_funcionarios.config(text=f"Funcionários cadastrados: {self.funcionarios.total_funcionarios()}")
                     if hasattr(self, 'label_imagens'):
                         self.label_imagens.config(text=f"Total de imagens: {self.contar_total_imagens()}")
 
@@ -880,9 +1138,29 @@ class SistemaReconhecimentoFacial:
                     self.parar_cadastro()
                     self.parar_reconhecimento()
 
-                elif tipo == "registrar":
-                    id_func, nome, conf = valor
-                    self.registrar_presenca(id_func, nome, conf)
+                elif tipo == "registrado":
+                    self.mostrar_registro(*valor)
+
+                elif tipo == "log":
+                    self.log(valor)
+
+                elif tipo == "pronto":
+                    self.concluir_inicializacao(valor)
+
+                elif tipo == "falha_inicio":
+                    self.log(f"❌ Falha na inicialização: {valor}")
+                    messagebox.showerror("Erro", f"Erro ao iniciar o sistema: {valor}")
+
+                elif tipo == "cameras":
+                    self.mostrar_cameras(valor)
+
+                elif tipo == "progresso":
+                    self.progress_var.set(valor)
+                    self.progress_label.config(text=f"{valor}/{self.total_imagens_cadastro} imagens")
+
+                elif tipo == "desempenho":
+                    if hasattr(self, 'label_desempenho'):
+                        self.label_desempenho.config(text=valor)
 
                 elif tipo == "sucesso_treinamento":
                     if hasattr(self, 'status_treinamento'):
@@ -908,12 +1186,24 @@ class SistemaReconhecimentoFacial:
     def on_closing(self):
         """Fecha o sistema"""
         self.capturando = False
-        self.reconhecendo = False
-        time.sleep(0.5)
-        if self.webcam:
-            self.webcam.release()
+        # Perfil em andamento: fecha a janela antes de parar, para as threads
+        # salvarem ao sair e o resumo ser gravado
+        perfilador = self.perfilador
+        if perfilador:
+            perfilador.encerrar()
+        # Fechar antes do fim da inicialização: só existe o que já foi criado
+        if hasattr(self, 'nucleo'):
+            # Espera o núcleo liberar as câmeras antes de fechar o banco
+            self.nucleo.parar(esperar=True)
+        if perfilador:
+            perfilador.concluido.wait(5.0)
         if self.webcam_cadastro:
             self.webcam_cadastro.release()
+        self.exportador_metricas.parar()
+        if hasattr(self, 'presenca'):
+            self.presenca.fechar()
+        if hasattr(self, 'funcionarios'):
+            self.funcionarios.fechar()
         self.root.destroy()
 
 
@@ -0,0 +1,414 @@
+"""Benchmarks de desempenho do sistema de reconhecimento
+
+Uso:
+    python benchmark.py deteccao --video gravacao.mp4
+    python benchmark.py deteccao --camera 0 --frames 200
+    python benchmark.py deteccao --imagens pasta_com_fotos --escalas 1,2,3 --rois "nenhuma;0,0,640,360"
+    python benchmark.py suite --funcionarios 50 --imagens-por 20 --saida resultado.json
+    python benchmark.py suite --sementes fotos_semente --tamanhos 100,1000,5000
+
+A suíte sintetiza a galeria a partir de algumas fotos semente (ou de rostos
+desenhados, sem --sementes) e trabalha numa pasta temporária: não precisa de
+câmera nem de rede e não toca em faces/, recognizer/ ou registros/.
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import cv2
+import numpy as np
+
+from configuracao import carregar_config
+from deteccao import DetectorFaces, carregar_classificador
+from presenca import ArmazenamentoPresenca
+from rastreamento import iou
+from reconhecedor import ReconhecedorLBPH
+from treinamento import (EXTENSOES_IMAGEM, TAMANHO_FACE, carregar_imagens, listar_funcionarios,
+                         treinar_lbph)
+
+
+def carregar_frames(args):
+    """Carrega os frames em memória antes de medir, para não cronometrar a leitura"""
+    frames = []
+    if args.imagens:
+        for arquivo in sorted(os.listdir(args.imagens)):
+            if arquivo.lower().endswith(('.jpg', '.jpeg', '.png')):
+                frame = cv2.imread(os.path.join(args.imagens, arquivo))
+                if frame is not None:
+                    frames.append(frame)
+            if len(frames) >= args.frames:
+                break
+        return frames
+
+    captura = cv2.VideoCapture(args.video if args.video else args.camera)
+    if not args.video:
+        captura.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        captura.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    while len(frames) < args.frames:
+        ret, frame = captura.read()
+        if not ret:
+            break
+        frames.append(frame)
+    captura.release()
+    return frames
+
+
+def medir_detector(detector, cinzas):
+    """Roda o detector sobre todos os frames; retorna (fps, caixas por frame)"""
+    caixas = []
+    detector.detectar(cinzas[0])  # aquecimento
+    inicio = time.perf_counter()
+    for cinza in cinzas:
+        caixas.append(detector.detectar(cinza))
+    duracao = time.perf_counter() - inicio
+    return len(cinzas) / duracao if duracao > 0 else 0.0, caixas
+
+
+def coincidencia(referencia, caixas, limiar=0.5):
+    """Fração das faces da configuração de referência que também foram encontradas"""
+    total = encontradas = 0
+    for ref, atual in zip(referencia, caixas):
+        for caixa in ref:
+            total += 1
+            if any(iou(caixa, outra) >= limiar for outra in atual):
+                encontradas += 1
+    return 100.0 * encontradas / total if total else 100.0
+
+
+def ler_rois(texto, config_roi):
+    rois = []
+    for item in texto.split(";"):
+        item = item.strip()
+        if item == "nenhuma":
+            rois.append(None)
+        elif item == "config":
+            if config_roi:
+                rois.append(tuple(config_roi))
+        elif item:
+            rois.append(tuple(int(v) for v in item.split(",")))
+    return list(dict.fromkeys(rois))
+
+
+def benchmark_deteccao(args):
+    config = carregar_config()["deteccao"]
+    frames = carregar_frames(args)
+    if not frames:
+        raise SystemExit("Nenhum frame disponível para o benchmark")
+    cinzas = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in frames]
+    classificador = carregar_classificador()
+
+    # Referência: o comportamento original (frame inteiro, sem redução)
+    referencia = DetectorFaces(classificador, escala=1.0, roi=None,
+                               scale_factor=1.1, min_neighbors=5, min_size=(100, 100))
+    fps_ref, caixas_ref = medir_detector(referencia, cinzas)
+
+    resultados = []
+    for roi in ler_rois(args.rois, config.get("roi")):
+        for escala in (float(v) for v in args.escalas.split(",")):
+            for scale_factor in (float(v) for v in args.scale_factors.split(",")):
+                detector = DetectorFaces(classificador, escala=escala, roi=roi,
+                                         scale_factor=scale_factor,
+                                         min_neighbors=config["min_neighbors"],
+                                         min_size=config["min_size"])
+                fps, caixas = medir_detector(detector, cinzas)
+                resultados.append({
+                    "configuracao": detector.descricao(),
+                    "escala": escala,
+                    "roi": list(roi) if roi else None,
+                    "scale_factor": scale_factor,
+                    "fps": round(fps, 1),
+                    "ms_por_frame": round(1000.0 / fps, 2) if fps else None,
+                    "faces_por_frame": round(sum(len(c) for c in caixas) / len(caixas), 2),
+                    "coincidencia_pct": round(coincidencia(caixas_ref, caixas), 1),
+                })
+
+    print(f"Frames: {len(frames)} ({frames[0].shape[1]}x{frames[0].shape[0]})")
+    print(f"Referência (escala 1, frame inteiro): {fps_ref:.1f} FPS")
+    print(f"{'FPS':>8} {'ms/frame':>9} {'faces':>6} {'coinc.%':>8}  configuração")
+    for r in resultados:
+        print(f"{r['fps']:>8.1f} {r['ms_por_frame'] or 0:>9.2f} {r['faces_por_frame']:>6.2f} "
+              f"{r['coincidencia_pct']:>8.1f}  {r['configuracao']}")
+
+    return {"frames": len(frames), "referencia_fps": round(fps_ref, 1), "resultados": resultados}
+
+
+def cronometrar(funcao, repeticoes=1):
+    """Executa funcao repeticoes vezes; retorna (ms por execução, último resultado)"""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return 1000.0 * (time.perf_counter() - inicio) / repeticoes, resultado
+
+
+def desenhar_rosto(rng):
+    """Rosto sintético em tons de cinza, para rodar a suíte sem fotos semente"""
+    rosto = np.full(TAMANHO_FACE, int(rng.integers(40, 90)), np.uint8)
+    centro = (100 + int(rng.integers(-8, 8)), 100 + int(rng.integers(-8, 8)))
+    cv2.ellipse(rosto, centro, (int(rng.integers(60, 78)), int(rng.integers(80, 95))), 0, 0, 360,
+                int(rng.integers(150, 220)), -1)
+    olhos_y = centro[1] - int(rng.integers(15, 30))
+    afastamento = int(rng.integers(22, 35))
+    for lado in (-1, 1):
+        cv2.circle(rosto, (centro[0] + lado * afastamento, olhos_y), int(rng.integers(6, 11)), 30, -1)
+    cv2.line(rosto, (centro[0], olhos_y + 10), (centro[0] + int(rng.integers(-5, 5)), centro[1] + 15), 90, 3)
+    cv2.ellipse(rosto, (centro[0], centro[1] + 45), (int(rng.integers(15, 30)), 8), 0, 0, 180, 60, 3)
+    return cv2.GaussianBlur(rosto, (5, 5), 0)
+
+
+def carregar_sementes(pasta, quantidade, rng):
+    """Fotos semente (recortadas pela maior face, se houver) ou rostos desenhados"""
+    sementes = []
+    if pasta:
+        classificador = carregar_classificador()
+        for arquivo in sorted(os.listdir(pasta)):
+            if not arquivo.lower().endswith(EXTENSOES_IMAGEM):
+                continue
+            cinza = cv2.imread(os.path.join(pasta, arquivo), cv2.IMREAD_GRAYSCALE)
+            if cinza is None:
+                continue
+            faces = classificador.detectMultiScale(cinza, 1.1, 5, minSize=(60, 60))
+            if len(faces):
+                x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+                cinza = cinza[y:y + h, x:x + w]
+            sementes.append(cv2.resize(cinza, TAMANHO_FACE))
+    if not sementes:
+        sementes = [desenhar_rosto(rng) for _ in range(quantidade)]
+    return sementes
+
+
+def aumentar(face, rng):
+    """Variação aleatória de uma face: rotação, escala, deslocamento, brilho, contraste e ruído"""
+    altura, largura = face.shape
+    matriz = cv2.getRotationMatrix2D((largura / 2, altura / 2), rng.uniform(-12, 12), rng.uniform(0.9, 1.1))
+    matriz[:, 2] += rng.uniform(-8, 8, 2)
+    saida = cv2.warpAffine(face, matriz, (largura, altura), borderMode=cv2.BORDER_REFLECT)
+    saida = saida.astype(np.float32) * rng.uniform(0.75, 1.25) + rng.uniform(-25, 25)
+    saida += rng.normal(0, 6, saida.shape)
+    if rng.random() < 0.5:
+        saida = saida[:, ::-1]
+    return np.clip(saida, 0, 255).astype(np.uint8)
+
+
+def sintetizar_galeria(pasta_faces, sementes, funcionarios, imagens_por, rng):
+    """Cria faces/<id>_<nome>/ com imagens_por variações por funcionário
+
+    Cada funcionário recebe uma semente e uma distorção fixa própria, para que
+    as identidades sejam distintas mesmo com poucas sementes.
+    """
+    for id_func in range(1, funcionarios + 1):
+        pasta = os.path.join(pasta_faces, f"{id_func}_Funcionario{id_func}")
+        os.makedirs(pasta, exist_ok=True)
+        base = sementes[(id_func - 1) % len(sementes)]
+        distorcao = cv2.getRotationMatrix2D((100, 100), rng.uniform(-20, 20), rng.uniform(0.85, 1.15))
+        base = cv2.warpAffine(base, distorcao, TAMANHO_FACE, borderMode=cv2.BORDER_REFLECT)
+        base = cv2.addWeighted(base, 0.8, cv2.GaussianBlur(rng.integers(0, 255, TAMANHO_FACE, np.uint8),
+                                                            (21, 21), 0), 0.2, 0)
+        for i in range(imagens_por):
+            cv2.imwrite(os.path.join(pasta, f"{id_func}_{i}.jpg"), aumentar(base, rng))
+
+
+def sintetizar_frames(sementes, quantidade, rng):
+    """Frames 640x480 com 0 a 2 faces coladas sobre um fundo com textura"""
+    frames = []
+    for _ in range(quantidade):
+        fundo = cv2.GaussianBlur(rng.integers(0, 255, (480, 640), np.uint8), (31, 31), 0)
+        for _ in range(int(rng.integers(0, 3))):
+            lado = int(rng.integers(120, 230))
+            face = cv2.resize(aumentar(sementes[int(rng.integers(len(sementes)))], rng), (lado, lado))
+            x, y = int(rng.integers(0, 640 - lado)), int(rng.integers(0, 480 - lado))
+            fundo[y:y + lado, x:x + lado] = face
+        frames.append(cv2.cvtColor(fundo, cv2.COLOR_GRAY2BGR))
+    return frames
+
+
+def medir_treinamento(pasta):
+    """Treinamento completo por fase, como no botão TREINAR MODELO, e leitura do trainer.yml"""
+    pasta_faces = os.path.join(pasta, "faces")
+    pasta_cache = os.path.join(pasta, "cache_faces")
+    caminho_modelo = os.path.join(pasta, "trainer.yml")
+
+    ms_listar, (funcionarios, _) = cronometrar(lambda: listar_funcionarios(pasta_faces))
+    pendentes = {p: sorted(i["imagens"]) for p, i in funcionarios.items()}
+    ms_frio, (faces, ids, _, _) = cronometrar(
+        lambda: carregar_imagens(funcionarios, pendentes, pasta_faces, pasta_cache))
+    ms_cache, _ = cronometrar(lambda: carregar_imagens(funcionarios, pendentes, pasta_faces, pasta_cache))
+    ms_treino, _ = cronometrar(lambda: treinar_lbph(faces, ids, "completo", caminho_modelo))
+
+    def ler_modelo():
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(caminho_modelo)
+        return recognizer
+
+    ms_leitura, recognizer = cronometrar(ler_modelo, 3)
+    ms_extracao, reconhecedor = cronometrar(lambda: ReconhecedorLBPH.de_modelo_cv2(recognizer), 3)
+    return recognizer, reconhecedor, faces, ids, {
+        "imagens": int(len(faces)),
+        "funcionarios": len(funcionarios),
+        "listar_ms": round(ms_listar, 1),
+        "preprocessamento_frio_ms": round(ms_frio, 1),
+        "preprocessamento_cache_ms": round(ms_cache, 1),
+        "treino_lbph_ms": round(ms_treino, 1),
+        "leitura_trainer_yml_ms": round(ms_leitura, 1),
+        "extracao_histogramas_ms": round(ms_extracao, 1),
+        "tamanho_trainer_yml_mb": round(os.path.getsize(caminho_modelo) / 2 ** 20, 2),
+    }
+
+
+def medir_predicao(recognizer, reconhecedor, faces, tamanhos, consultas, rng):
+    """predict por face contra galerias de tamanhos crescentes (em funcionários)
+
+    Galerias maiores que a sintetizada repetem os histogramas com rótulos novos
+    e um pouco de ruído: o custo depende só do número de colunas.
+    """
+    amostra = [faces[i] for i in rng.choice(len(faces), min(consultas, len(faces)), replace=False)]
+    por_funcionario = len(reconhecedor) / max(1, len(reconhecedor.ids))
+    base = reconhecedor.galeria.T
+    resultados = []
+
+    ms_cv2, _ = cronometrar(lambda: [recognizer.predict(f) for f in amostra])
+    resultados.append({"funcionarios": len(reconhecedor.ids), "histogramas": len(reconhecedor),
+                       "implementacao": "cv2", "ms_por_face": round(ms_cv2 / len(amostra), 3)})
+
+    for tamanho in tamanhos:
+        colunas = int(tamanho * por_funcionario)
+        repeticoes = -(-colunas // len(base))
+        histogramas = np.tile(base, (repeticoes, 1))[:colunas]
+        histogramas = histogramas * rng.uniform(0.95, 1.05, (colunas, 1)).astype(np.float32)
+        rotulos = np.repeat(np.arange(1, tamanho + 1), int(np.ceil(por_funcionario)))[:colunas]
+        galeria = ReconhecedorLBPH(histogramas, rotulos, limiar=reconhecedor.limiar)
+        ms_unitario, _ = cronometrar(lambda: [galeria.predict(f) for f in amostra])
+        ms_lote, _ = cronometrar(lambda: galeria.predict_lote(amostra))
+        resultados.append({"funcionarios": tamanho, "histogramas": colunas, "implementacao": "numpy",
+                           "ms_por_face": round(ms_unitario / len(amostra), 3),
+                           "ms_por_face_lote": round(ms_lote / len(amostra), 3)})
+    return resultados
+
+
+def medir_presenca(pasta, historicos, registros, rng):
+    """registrar e a carga de "hoje" na abertura, para históricos de tamanhos crescentes"""
+    resultados = []
+    hoje = datetime.now()
+    for historico in historicos:
+        caminho_db = os.path.join(pasta, f"presenca_{historico}.db")
+        presenca = ArmazenamentoPresenca(caminho_db, os.path.join(pasta, f"presenca_{historico}.csv"))
+        # Histórico de dias anteriores (~50 registros por dia) inserido de uma vez
+        linhas = ((int(rng.integers(1, 500)), "Funcionario", (hoje - timedelta(days=1 + i // 50)).strftime('%Y-%m-%d'),
+                   "08:00:00", 90.0, "Entrada 1") for i in range(historico))
+        with presenca.conexao:
+            presenca.conexao.executemany(
+                "INSERT INTO presenca (id, nome, data, hora, confianca, entrada) VALUES (?, ?, ?, ?, ?, ?)", linhas)
+
+        data = hoje.strftime('%Y-%m-%d')
+        contador = iter(range(1, registros + 1))
+        ms_registrar, _ = cronometrar(
+            lambda: presenca.registrar(next(contador), "Funcionario", data, "09:00:00", 90.0, "Entrada 1"), registros)
+        presenca.fechar()
+
+        # Abertura + carregar_registros_hoje, como na inicialização do programa
+        def abrir_e_carregar():
+            armazenamento = ArmazenamentoPresenca(caminho_db, os.path.join(pasta, f"presenca_{historico}.csv"))
+            armazenamento.ids_do_dia(data)
+            armazenamento.ultimos_do_dia(data, 20)
+            armazenamento.contar_dia(data)
+            armazenamento.fechar()
+
+        ms_carregar, _ = cronometrar(abrir_e_carregar, 5)
+        resultados.append({"historico": historico, "registrar_ms": round(ms_registrar, 3),
+                           "carregar_registros_hoje_ms": round(ms_carregar, 2)})
+    return resultados
+
+
+def benchmark_suite(args):
+    rng = np.random.default_rng(args.semente)
+    config = carregar_config()["deteccao"]
+    resultado = {"parametros": {"funcionarios": args.funcionarios, "imagens_por": args.imagens_por,
+                                "sementes": args.sementes or "desenhadas", "semente": args.semente}}
+
+    with tempfile.TemporaryDirectory(prefix="benchmark_") as pasta:
+        sementes = carregar_sementes(args.sementes, 8, rng)
+        ms_sintese, _ = cronometrar(lambda: sintetizar_galeria(os.path.join(pasta, "faces"), sementes,
+                                                               args.funcionarios, args.imagens_por, rng))
+        print(f"🧪 Galeria sintética: {args.funcionarios} x {args.imagens_por} imagens ({ms_sintese / 1000:.1f} s)")
+
+        recognizer, reconhecedor, faces, _, treino = medir_treinamento(pasta)
+        resultado["treinamento"] = treino
+        print(f"⚡ Treino: pré-processamento {treino['preprocessamento_frio_ms']:.0f} ms "
+              f"(cache {treino['preprocessamento_cache_ms']:.0f} ms), LBPH {treino['treino_lbph_ms']:.0f} ms, "
+              f"leitura trainer.yml {treino['leitura_trainer_yml_ms']:.0f} ms")
+
+        frames = sintetizar_frames(sementes, args.frames, rng)
+        cinzas = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in frames]
+        detector = DetectorFaces.de_config(config, carregar_classificador())
+        referencia = DetectorFaces(detector.classificador)
+        fps_config, _ = medir_detector(detector, cinzas)
+        fps_ref, _ = medir_detector(referencia, cinzas)
+        resultado["deteccao"] = {"frames": len(frames), "configuracao": detector.descricao(),
+                                 "ms_por_frame": round(1000.0 / fps_config, 2) if fps_config else None,
+                                 "ms_por_frame_sem_reducao": round(1000.0 / fps_ref, 2) if fps_ref else None}
+        print(f"👁️ Detecção: {resultado['deteccao']['ms_por_frame']} ms/frame "
+              f"(sem redução {resultado['deteccao']['ms_por_frame_sem_reducao']} ms)")
+
+        tamanhos = [int(v) for v in args.tamanhos.split(",")]
+        resultado["predicao"] = medir_predicao(recognizer, reconhecedor, faces, tamanhos, args.consultas, rng)
+        for r in resultado["predicao"]:
+            print(f"🔎 predict {r['implementacao']:>5} {r['funcionarios']:>6} funcionários: "
+                  f"{r['ms_por_face']:.3f} ms/face")
+
+        historicos = [int(v) for v in args.historicos.split(",")]
+        resultado["presenca"] = medir_presenca(pasta, historicos, args.registros, rng)
+        for r in resultado["presenca"]:
+            print(f"📋 histórico {r['historico']:>8}: registrar {r['registrar_ms']:.3f} ms, "
+                  f"carregar hoje {r['carregar_registros_hoje_ms']:.2f} ms")
+
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do sistema de reconhecimento facial")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("deteccao", help="FPS do detectMultiScale para cada configuração")
+    origem = p.add_mutually_exclusive_group()
+    origem.add_argument("--video", help="arquivo de vídeo gravado")
+    origem.add_argument("--imagens", help="pasta com frames/fotos")
+    origem.add_argument("--camera", type=int, default=0, help="índice da câmera (padrão 0)")
+    p.add_argument("--frames", type=int, default=200)
+    p.add_argument("--escalas", default="1,1.5,2,3")
+    p.add_argument("--scale-factors", default="1.1,1.2")
+    p.add_argument("--rois", default="nenhuma;config",
+                   help="lista separada por ';' de 'nenhuma', 'config' ou x,y,w,h")
+    p.add_argument("--saida", help="grava os resultados em JSON")
+    p.set_defaults(funcao=benchmark_deteccao)
+
+    p = sub.add_parser("suite", help="treino, detecção, predict e presença sobre uma galeria sintética")
+    p.add_argument("--funcionarios", type=int, default=50)
+    p.add_argument("--imagens-por", type=int, default=20)
+    p.add_argument("--sementes", help="pasta com algumas fotos de rosto (padrão: rostos desenhados)")
+    p.add_argument("--frames", type=int, default=100, help="frames sintéticos para a detecção")
+    p.add_argument("--tamanhos", default="10,100,1000",
+                   help="tamanhos de galeria (funcionários) para o predict")
+    p.add_argument("--consultas", type=int, default=100)
+    p.add_argument("--historicos", default="1000,100000",
+                   help="tamanhos do histórico de presença")
+    p.add_argument("--registros", type=int, default=200, help="registros cronometrados por histórico")
+    p.add_argument("--semente", type=int, default=0, help="semente aleatória (resultados reproduzíveis)")
+    p.add_argument("--saida", help="grava os resultados em JSON")
+    p.set_defaults(funcao=benchmark_suite)
+
+    args = parser.parse_args()
+    resultado = args.funcao(args)
+    resultado.update({"comando": args.comando, "data": time.strftime("%Y-%m-%d %H:%M:%S"),
+                      "opencv": cv2.__version__, "python": platform.python_version()})
+
+    if getattr(args, "saida", None):
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import os
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+from treinamento import TAMANHO_FACE, acrescentar_ao_cache
+
+
+def nitidez(cinza):
+    """Variância do Laplaciano: baixa em faces borradas (movimento ou foco)"""
+    return float(cv2.Laplacian(cinza, cv2.CV_64F).var())
+
+
+def dhash(cinza):
+    """Hash perceptual de 64 bits (diferença entre pixels vizinhos de uma miniatura 9x8)"""
+    miniatura = cv2.resize(cinza, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (miniatura[:, 1:] > miniatura[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+class FiltroQualidade:
+    """Decide se um recorte entra no cadastro
+
+    Rejeita frames com mais de uma face, recortes borrados e recortes quase
+    iguais aos já aceitos (distância de Hamming do dHash); os motivos são
+    contados para o log do fim do cadastro.
+    """
+
+    def __init__(self, nitidez_minima=50.0, distancia_minima=6):
+        self.nitidez_minima = nitidez_minima
+        self.distancia_minima = distancia_minima
+        self.hashes = []
+        self.rejeitadas = {"varias_faces": 0, "borrada": 0, "repetida": 0}
+
+    def avaliar(self, cinza, faces):
+        """Retorna a caixa da face aceita, ou None (e conta o motivo)"""
+        if len(faces) != 1:
+            if len(faces) > 1:
+                self.rejeitadas["varias_faces"] += 1
+            return None
+        x, y, w, h = faces[0]
+        recorte = cv2.resize(cinza[y:y + h, x:x + w], TAMANHO_FACE)
+        if nitidez(recorte) < self.nitidez_minima:
+            self.rejeitadas["borrada"] += 1
+            return None
+        assinatura = dhash(recorte)
+        if any(bin(assinatura ^ outro).count("1") < self.distancia_minima for outro in self.hashes):
+            self.rejeitadas["repetida"] += 1
+            return None
+        self.hashes.append(assinatura)
+        return faces[0]
+
+
+class GravadorCadastro:
+    """Grava as faces aceitas numa thread própria, fora do laço da câmera
+
+    Cada recorte é codificado em JPEG uma vez; os mesmos bytes vão para o
+    disco e são decodificados para a face pré-processada que o treino usa,
+    que entra no cache de faces ao finalizar (o treino não relê os JPGs).
+    """
+
+    def __init__(self, pasta_faces, pasta, metricas=None):
+        self.pasta_faces = pasta_faces
+        self.pasta = pasta
+        self.metricas = metricas
+        self.fila = queue.Queue()
+        self.preprocessadas = {}
+        self.erros = []
+        self.thread = threading.Thread(target=self.executar, name="gravador-cadastro", daemon=True)
+        self.thread.start()
+
+    def enfileirar(self, arquivo, rosto):
+        self.fila.put((arquivo, rosto))
+
+    def executar(self):
+        while True:
+            item = self.fila.get()
+            if item is None:
+                return
+            try:
+                if self.metricas:
+                    with self.metricas.cronometro("gravacao", entrada="cadastro"):
+                        self.gravar(*item)
+                else:
+                    self.gravar(*item)
+            except Exception as e:
+                self.erros.append(f"{item[0]}: {e}")
+
+    def gravar(self, arquivo, rosto):
+        ok, jpg = cv2.imencode(".jpg", rosto)
+        if not ok:
+            raise ValueError("falha ao codificar JPEG")
+        caminho = os.path.join(self.pasta_faces, self.pasta, arquivo)
+        with open(caminho, "wb") as f:
+            f.write(jpg.tobytes())
+        # Mesmo pré-processamento de treinamento.preprocessar_imagem, a partir dos bytes gravados
+        cinza = cv2.imdecode(jpg, cv2.IMREAD_GRAYSCALE)
+        face = cv2.equalizeHist(cv2.resize(cinza, TAMANHO_FACE))
+        estado = os.stat(caminho)
+        self.preprocessadas[arquivo] = ([estado.st_mtime_ns, estado.st_size], face)
+
+    def finalizar(self):
+        """Espera as gravações pendentes e atualiza o cache de faces; retorna as gravadas"""
+        self.fila.put(None)
+        self.thread.join()
+        if self.preprocessadas:
+            acrescentar_ao_cache(self.pasta, self.preprocessadas)
+        return len(self.preprocessadas)
@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+import time
+
+import cv2
+
+
+# Backends tentados em cada índice (None = escolha automática do OpenCV)
+BACKENDS = [cv2.CAP_DSHOW, cv2.CAP_MSMF] if os.name == "nt" else [None]
+
+
+def abrir_camera(indice, backend=None, largura=640, altura=480):
+    """VideoCapture já configurado; None se a câmera não abrir"""
+    webcam = cv2.VideoCapture(indice) if backend is None else cv2.VideoCapture(indice, backend)
+    webcam.set(cv2.CAP_PROP_FRAME_WIDTH, largura)
+    webcam.set(cv2.CAP_PROP_FRAME_HEIGHT, altura)
+    if not webcam.isOpened():
+        webcam.release()
+        return None
+    return webcam
+
+
+def testar_camera(indice, backend=None):
+    """True se a câmera abre e entrega um frame"""
+    webcam = cv2.VideoCapture(indice) if backend is None else cv2.VideoCapture(indice, backend)
+    try:
+        if not webcam.isOpened():
+            return False
+        ret, frame = webcam.read()
+        return ret and frame is not None
+    finally:
+        webcam.release()
+
+
+class DescobertaCameras:
+    """Descoberta de câmeras em segundo plano, com o resultado guardado em disco
+
+    Abrir um índice sem câmera trava por segundos em alguns drivers, então a
+    sondagem nunca roda na thread da interface. As câmeras encontradas ficam
+    no arquivo e valem nas próximas execuções sem nova sondagem; a revalidação
+    é preguiçosa: só quando abrir uma câmera conhecida falhar (invalidar()).
+    ao_concluir(encontradas) é chamado da thread de descoberta.
+    """
+
+    def __init__(self, caminho="cameras.json", indices=(0, 1, 2), ao_concluir=None):
+        self.caminho = caminho
+        self.indices = list(indices)
+        self.ao_concluir = ao_concluir
+        self.lock = threading.Lock()
+        self.thread = None
+        self.encontradas = self.ler()
+
+    def ler(self):
+        try:
+            with open(self.caminho, encoding="utf-8") as f:
+                return json.load(f)["encontradas"]
+        except (OSError, ValueError, KeyError):
+            return []
+
+    def salvar(self):
+        pasta = os.path.dirname(self.caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({"encontradas": self.encontradas}, f, indent=4)
+        os.replace(temporario, self.caminho)
+
+    def conhecida(self):
+        """Primeira câmera confirmada {"indice", "backend", "confirmada"} ou None"""
+        with self.lock:
+            return dict(self.encontradas[0]) if self.encontradas else None
+
+    def procurando(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def descobrir(self):
+        """Inicia a sondagem em segundo plano (se já não estiver rodando)"""
+        with self.lock:
+            if self.procurando():
+                return
+            self.thread = threading.Thread(target=self.executar, name="descoberta-cameras", daemon=True)
+            self.thread.start()
+
+    def aguardar(self, timeout=None):
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def executar(self):
+        encontradas = []
+        for indice in self.indices:
+            for backend in BACKENDS:
+                if testar_camera(indice, backend):
+                    encontradas.append({"indice": indice, "backend": backend,
+                                        "confirmada": time.strftime("%Y-%m-%d %H:%M:%S")})
+                    break
+        with self.lock:
+            self.encontradas = encontradas
+            try:
+                self.salvar()
+            except OSError:
+                pass
+        if self.ao_concluir:
+            self.ao_concluir(list(encontradas))
+
+    def invalidar(self, indice, backend=None):
+        """A câmera conhecida falhou ao abrir: esquece e procura de novo"""
+        with self.lock:
+            self.encontradas = [c for c in self.encontradas
+                                if (c["indice"], c["backend"]) != (indice, backend)]
+        self.descobrir()
+
+    def resolver(self, indice=None, backend=None):
+        """(indice, backend) para abrir: o configurado, completado pela descoberta
+
+        indice None é a primeira câmera encontrada; backend None é o backend
+        com que aquele índice foi confirmado (ou o automático).
+        """
+        with self.lock:
+            encontradas = list(self.encontradas)
+        if indice is None:
+            if not encontradas:
+                return 0, backend
+            return encontradas[0]["indice"], encontradas[0]["backend"]
+        if backend is None:
+            for camera in encontradas:
+                if camera["indice"] == indice:
+                    return indice, camera["backend"]
+        return indice, backend
@@ -0,0 +1,105 @@
+import copy
+import json
+import os
+
+
+CAMINHO_CONFIG = "config.json"
+
+# Valores padrão; o config.json só precisa conter o que for diferente
+PADRAO = {
+    "deteccao": {
+        # Fator de redução do frame antes do detectMultiScale (2.0 = metade da resolução)
+        "escala": 2.0,
+        # Região de interesse [x, y, largura, altura] em pixels do frame; null = frame inteiro
+        "roi": None,
+        "scale_factor": 1.1,
+        "min_neighbors": 5,
+        "min_size": [100, 100],
+    },
+    "reconhecimento": {
+        # Detecção completa a cada N frames; entre elas as faces seguem pelo rastreador
+        "intervalo_deteccao": 3,
+        # Busca aproximada: funcionários (por centroide) reavaliados com LBPH exato
+        "candidatos_indice": 50,
+        # Threads de análise compartilhando o modelo; 0 = uma por câmera
+        "trabalhadores": 0,
+        # Votação por trilha: registra quando K das últimas N predições concordam
+        "votos_necessarios": 3,
+        "janela_votos": 5,
+    },
+    # Uma entrada por câmera; backend é a constante cv2.CAP_* (null = o confirmado pela descoberta)
+    # e indice null é a primeira câmera encontrada pela descoberta
+    "cameras": [
+        {"indice": None, "backend": None, "entrada": "Entrada 1"},
+    ],
+    "descoberta": {
+        # Câmeras encontradas ficam neste arquivo e só são sondadas de novo se falharem
+        "arquivo": "cameras.json",
+        "indices": [0, 1, 2],
+    },
+    "cadastro": {
+        # Recortes abaixo desta variância do Laplaciano são descartados como borrados
+        "nitidez_minima": 50.0,
+        # Bits diferentes no dHash para um recorte não contar como repetido
+        "distancia_hash_minima": 6,
+    },
+    "interface": {
+        # Taxa máxima de atualização das imagens da câmera na tela
+        "fps_exibicao": 30,
+    },
+    "metricas": {
+        # Arquivo no formato texto do Prometheus (textfile collector); null desativa
+        "arquivo": "registros/metricas.prom",
+        # Segundos entre gravações do arquivo
+        "intervalo": 15,
+    },
+    "relatorios": {
+        # Cópia colunar do presenca.db, uma pasta por mês
+        "pasta": "registros/colunar",
+        # Horário de entrada (HH:MM) e minutos de tolerância antes de contar atraso
+        "entrada": "08:00",
+        "tolerancia_minutos": 5,
+        # Dias em que se conta atraso (0 = segunda ... 6 = domingo)
+        "dias_semana": [0, 1, 2, 3, 4],
+        # Horário próprio por funcionário, ex.: {"42": "09:30"}
+        "horarios": {},
+    },
+    "perfil": {
+        # Perfil das threads de trabalho: pára após N segundos ou N frames (0 = sem limite)
+        "pasta": "perfis",
+        "segundos": 30,
+        "frames": 0,
+        "amostragem_ms": 5,
+    },
+}
+
+
+def mesclar(base, extra):
+    """Mescla recursivamente extra sobre uma cópia de base"""
+    resultado = copy.deepcopy(base)
+    for chave, valor in extra.items():
+        if isinstance(valor, dict) and isinstance(resultado.get(chave), dict):
+            resultado[chave] = mesclar(resultado[chave], valor)
+        else:
+            resultado[chave] = valor
+    return resultado
+
+
+def carregar_config(caminho=CAMINHO_CONFIG):
+    """Lê o config.json (se existir) sobre os valores padrão"""
+    if not os.path.exists(caminho):
+        return copy.deepcopy(PADRAO)
+    with open(caminho, encoding="utf-8") as f:
+        return mesclar(PADRAO, json.load(f))
+
+
+def nomes_entradas(config):
+    """Nome de cada câmera configurada (a "entrada" gravada nos registros)"""
+    return [c.get("entrada") or f"Câmera {c.get('indice') or 0}" for c in config["cameras"]]
+
+
+def salvar_config(config, caminho=CAMINHO_CONFIG):
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=4, ensure_ascii=False)
+    os.replace(temporario, caminho)
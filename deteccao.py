@@ -0,0 +1,65 @@
+import cv2
+import numpy as np
+
+
+def carregar_classificador():
+    return cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+
+
+class DetectorFaces:
+    """Detector Haar com redução de escala, região de interesse e parâmetros ajustáveis
+
+    As caixas retornadas estão sempre nas coordenadas do frame original.
+    """
+
+    def __init__(self, classificador=None, escala=1.0, roi=None,
+                 scale_factor=1.1, min_neighbors=5, min_size=(100, 100)):
+        self.classificador = classificador if classificador is not None else carregar_classificador()
+        self.escala = max(1.0, float(escala))
+        self.roi = tuple(int(v) for v in roi) if roi else None
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = tuple(int(v) for v in min_size)
+
+    @classmethod
+    def de_config(cls, config, classificador=None):
+        """Cria o detector a partir da seção "deteccao" do config.json"""
+        return cls(classificador,
+                   escala=config.get("escala", 1.0),
+                   roi=config.get("roi"),
+                   scale_factor=config.get("scale_factor", 1.1),
+                   min_neighbors=config.get("min_neighbors", 5),
+                   min_size=config.get("min_size", (100, 100)))
+
+    def descricao(self):
+        return (f"escala={self.escala:g} roi={self.roi} scaleFactor={self.scale_factor} "
+                f"minNeighbors={self.min_neighbors} minSize={self.min_size}")
+
+    def detectar(self, cinza):
+        """Detecta faces em um frame em escala de cinza; retorna array (n, 4) de (x, y, w, h)"""
+        x0 = y0 = 0
+        imagem = cinza
+        if self.roi:
+            x, y, w, h = self.roi
+            altura, largura = cinza.shape[:2]
+            x0, y0 = max(0, x), max(0, y)
+            imagem = cinza[y0:min(altura, y + h), x0:min(largura, x + w)]
+            if imagem.size == 0:
+                return np.zeros((0, 4), dtype=np.int32)
+
+        if self.escala > 1.0:
+            tamanho = (max(1, int(imagem.shape[1] / self.escala)), max(1, int(imagem.shape[0] / self.escala)))
+            imagem = cv2.resize(imagem, tamanho, interpolation=cv2.INTER_AREA)
+
+        # minSize refere-se ao frame original; na imagem reduzida ele encolhe junto
+        min_size = (max(1, int(self.min_size[0] / self.escala)), max(1, int(self.min_size[1] / self.escala)))
+        faces = self.classificador.detectMultiScale(
+            imagem, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors, minSize=min_size)
+
+        if len(faces) == 0:
+            return np.zeros((0, 4), dtype=np.int32)
+
+        faces = np.asarray(faces, dtype=np.float64) * self.escala
+        faces[:, 0] += x0
+        faces[:, 1] += y0
+        return np.round(faces).astype(np.int32)
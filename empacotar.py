@@ -0,0 +1,41 @@
+"""Converte faces/<id>_<nome>/ (JPGs soltos) em pacotes mapeáveis
+
+Uso:
+    python empacotar.py
+    python empacotar.py --originais backup/faces --processos 4
+    python empacotar.py --apagar
+
+Cada funcionário vira faces/<id>_<nome>.npy (faces 200x200 pré-processadas)
+mais faces/<id>_<nome>.json (ordem e assinaturas das imagens de origem): dois
+arquivos em vez de um por imagem. O treino lê os pacotes mapeados, sem
+decodificar nada, e como as assinaturas são as dos JPGs já treinados, o
+próximo treino continua incremental. As pastas originais vão para
+--originais (padrão faces_originais/), ou são apagadas com --apagar.
+Cadastrar de novo um funcionário empacotado cria a pasta outra vez; a
+pasta passa a valer no lugar do pacote.
+"""
+import argparse
+import time
+
+from treinamento import empacotar_funcionarios
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Empacota as pastas de faces em arquivos mapeáveis")
+    parser.add_argument("--faces", default="faces", help="pasta das faces (padrão faces/)")
+    parser.add_argument("--originais", default="faces_originais",
+                        help="para onde vão as pastas de JPGs depois de empacotadas")
+    parser.add_argument("--apagar", action="store_true", help="apaga as pastas em vez de movê-las")
+    parser.add_argument("--processos", type=int, help="processos para decodificar as imagens")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    empacotadas = empacotar_funcionarios(args.faces, None if args.apagar else args.originais,
+                                         processos=args.processos)
+    for pasta, imagens in empacotadas.items():
+        print(f"📦 {pasta}: {imagens} imagens")
+    print(f"✅ {len(empacotadas)} funcionários empacotados em {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
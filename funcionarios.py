@@ -0,0 +1,204 @@
+"""Registro persistente dos funcionários cadastrados
+
+Uso:
+    python funcionarios.py              # lista o registro
+    python funcionarios.py reconciliar  # refaz o registro a partir de faces/
+
+O registro é atualizado pelo cadastro e pelo treino; reconciliar só é
+necessário depois de mexer em faces/ à mão (apagar ou copiar funcionários).
+"""
+import argparse
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from treinamento import carregar_manifesto, listar_funcionarios
+
+
+class CadastroFuncionarios:
+    """Funcionários em SQLite, com uma cópia em memória para leituras O(1)
+
+    Guarda id, nome, pasta (ou pacote) em faces/, quantidade de imagens, data
+    do cadastro e a versão do modelo em que as imagens atuais foram treinadas
+    (None = ainda não treinado). Nomes e contadores são lidos da memória;
+    cada alteração grava a linha no banco e atualiza a cópia.
+    """
+
+    def __init__(self, caminho_db="registros/funcionarios.db", pasta_faces="faces"):
+        self.caminho_db = caminho_db
+        self.pasta_faces = pasta_faces
+        self.lock = threading.Lock()
+
+        pasta = os.path.dirname(caminho_db)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+        self.conexao = sqlite3.connect(caminho_db, check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.criar_tabelas()
+        with self.lock:
+            self.funcionarios = {linha[0]: self.linha_para_dict(linha) for linha in self.conexao.execute(
+                "SELECT id, nome, pasta, imagens, cadastrado_em, versao_modelo FROM funcionarios")}
+            self.imagens = sum(f["imagens"] for f in self.funcionarios.values())
+        self.migrar_pastas()
+
+    def criar_tabelas(self):
+        with self.lock, self.conexao:
+            self.conexao.execute("""
+                CREATE TABLE IF NOT EXISTS funcionarios (
+                    id INTEGER PRIMARY KEY,
+                    nome TEXT NOT NULL,
+                    pasta TEXT NOT NULL,
+                    imagens INTEGER NOT NULL,
+                    cadastrado_em TEXT NOT NULL,
+                    versao_modelo TEXT
+                )
+            """)
+            self.conexao.execute("""
+                CREATE TABLE IF NOT EXISTS meta (
+                    chave TEXT PRIMARY KEY,
+                    valor TEXT
+                )
+            """)
+
+    @staticmethod
+    def linha_para_dict(linha):
+        id_func, nome, pasta, imagens, cadastrado_em, versao = linha
+        return {"id": id_func, "nome": nome, "pasta": pasta, "imagens": imagens,
+                "cadastrado_em": cadastrado_em, "versao_modelo": versao}
+
+    def migrar_pastas(self):
+        """Na primeira execução, monta o registro a partir de faces/"""
+        with self.lock:
+            linha = self.conexao.execute(
+                "SELECT valor FROM meta WHERE chave = 'migrado_pastas'").fetchone()
+        if linha or not os.path.exists(self.pasta_faces):
+            return
+        self.reconciliar()
+        with self.lock, self.conexao:
+            self.conexao.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('migrado_pastas', '1')")
+
+    def gravar(self, funcionario):
+        """Grava uma linha no banco e na cópia em memória (chamar com o lock)"""
+        with self.conexao:
+            self.conexao.execute(
+                "INSERT OR REPLACE INTO funcionarios (id, nome, pasta, imagens, cadastrado_em, versao_modelo) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (funcionario["id"], funcionario["nome"], funcionario["pasta"], funcionario["imagens"],
+                 funcionario["cadastrado_em"], funcionario["versao_modelo"]))
+        anterior = self.funcionarios.get(funcionario["id"])
+        self.imagens += funcionario["imagens"] - (anterior["imagens"] if anterior else 0)
+        self.funcionarios[funcionario["id"]] = funcionario
+
+    def registrar_cadastro(self, id_func, nome, pasta, imagens):
+        """Cadastro (ou recadastro) concluído: imagens novas, ainda fora do modelo"""
+        with self.lock:
+            self.gravar({"id": int(id_func), "nome": nome, "pasta": pasta, "imagens": int(imagens),
+                         "cadastrado_em": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                         "versao_modelo": None})
+
+    def marcar_treinados(self, ids, versao):
+        """Funcionários cujas imagens entraram no modelo publicado como `versao`"""
+        with self.lock:
+            for id_func in ids:
+                funcionario = self.funcionarios.get(int(id_func))
+                if funcionario is not None:
+                    self.gravar({**funcionario, "versao_modelo": versao})
+
+    def nome(self, id_func, padrao="Desconhecido"):
+        funcionario = self.funcionarios.get(id_func)
+        return funcionario["nome"] if funcionario else padrao
+
+    def nomes(self):
+        """Cópia de {id: nome}"""
+        with self.lock:
+            return {id_func: f["nome"] for id_func, f in self.funcionarios.items()}
+
+    def total_funcionarios(self):
+        return len(self.funcionarios)
+
+    def total_imagens(self):
+        return self.imagens
+
+    def listar(self):
+        with self.lock:
+            return sorted((dict(f) for f in self.funcionarios.values()), key=lambda f: f["id"])
+
+    def reconciliar(self, no_disco=None):
+        """Refaz o registro a partir de faces/; retorna (adicionados, removidos, alterados)
+
+        no_disco: resultado de listar_funcionarios, se quem chama já listou.
+
+        Data de cadastro e versão do modelo são mantidas para quem não mudou
+        de nome nem de quantidade de imagens; os demais recebem a versão atual
+        se o manifesto do treino já cobre todas as imagens deles.
+        """
+        # Importado aqui: o núcleo usa este registro
+        from nucleo import versao_atual
+
+        if no_disco is None:
+            no_disco = listar_funcionarios(self.pasta_faces)[0] if os.path.exists(self.pasta_faces) else {}
+        treinadas = (carregar_manifesto() or {}).get("pastas", {})
+        versao = versao_atual()
+        agora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        adicionados, alterados = [], []
+        vistos = set()
+
+        with self.lock:
+            for pasta, info in no_disco.items():
+                id_func = info["id"]
+                if id_func in vistos:
+                    continue
+                vistos.add(id_func)
+                anterior = self.funcionarios.get(id_func)
+                atual = {"id": id_func, "nome": info["nome"], "pasta": pasta, "imagens": len(info["imagens"]),
+                         "cadastrado_em": anterior["cadastrado_em"] if anterior else agora,
+                         "versao_modelo": None}
+                if anterior and (anterior["nome"], anterior["imagens"]) == (atual["nome"], atual["imagens"]):
+                    atual["versao_modelo"] = anterior["versao_modelo"]
+                else:
+                    treino = treinadas.get(pasta, {})
+                    if info["imagens"] and all(treino.get("imagens", {}).get(a) == assinatura
+                                               for a, assinatura in info["imagens"].items()):
+                        atual["versao_modelo"] = versao
+                if anterior == atual:
+                    continue
+                (adicionados if anterior is None else alterados).append(id_func)
+                self.gravar(atual)
+
+            removidos = [id_func for id_func in self.funcionarios if id_func not in vistos]
+            with self.conexao:
+                self.conexao.executemany("DELETE FROM funcionarios WHERE id = ?", [(i,) for i in removidos])
+            for id_func in removidos:
+                self.imagens -= self.funcionarios.pop(id_func)["imagens"]
+
+        return adicionados, removidos, alterados
+
+    def fechar(self):
+        with self.lock:
+            self.conexao.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro dos funcionários cadastrados")
+    parser.add_argument("comando", nargs="?", default="listar", choices=["listar", "reconciliar"])
+    parser.add_argument("--faces", default="faces", help="pasta das faces (padrão faces/)")
+    args = parser.parse_args()
+
+    registro = CadastroFuncionarios(pasta_faces=args.faces)
+    try:
+        if args.comando == "reconciliar":
+            adicionados, removidos, alterados = registro.reconciliar()
+            print(f"🔄 {len(adicionados)} adicionados, {len(removidos)} removidos, {len(alterados)} alterados")
+        for f in registro.listar():
+            versao = f["versao_modelo"] or "não treinado"
+            print(f"{f['id']:>6}  {f['nome']:<30} {f['imagens']:>4} imagens  {f['cadastrado_em']}  {versao}")
+        print(f"{registro.total_funcionarios()} funcionários, {registro.total_imagens()} imagens")
+    finally:
+        registro.fechar()
+
+
+if __name__ == "__main__":
+    main()
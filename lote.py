@@ -0,0 +1,250 @@
+"""Reconhecimento em lote de vídeos gravados e pastas de imagens
+
+Uso:
+    python lote.py gravacao_portaria.mp4 --inicio "2026-10-17 07:30:00"
+    python lote.py gravacoes/*.mp4 fotos_evento/ --processos 8 --passo 2
+    python lote.py gravacao.mp4 --simular --saida relatorio.json
+
+Cada vídeo é dividido em trechos de --trecho frames e cada pasta em grupos de
+imagens; os pedaços são distribuídos por um pool de processos, que rodam a
+mesma detecção Haar + LBPH do reconhecimento ao vivo. Os registros seguem a
+regra de registros_hoje: um por funcionário por dia, respeitando o que já
+está gravado no banco.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import cv2
+
+from configuracao import CAMINHO_CONFIG, carregar_config
+from deteccao import DetectorFaces, carregar_classificador
+from nucleo import CAMINHO_MODELO, carregar_reconhecedor, nomes_da_versao, votar_identidade
+from presenca import ArmazenamentoPresenca
+from rastreamento import RastreadorFaces
+from treinamento import EXTENSOES_IMAGEM
+
+
+EXTENSOES_VIDEO = ('.mp4', '.avi', '.mkv', '.mov', '.m4v', '.webm')
+
+# Estado de cada processo do pool (carregado uma vez no initializer)
+_trabalho = {}
+
+
+def iniciar_processo(config):
+    """Initializer do pool: detector, modelo e nomes (da mesma versão) carregados uma vez por processo"""
+    # Um processo por núcleo: as threads internas do OpenCV só disputariam CPU
+    cv2.setNumThreads(1)
+    _trabalho["detector"] = DetectorFaces.de_config(config["deteccao"], carregar_classificador())
+    # Galeria mapeada do formato binário: os processos compartilham as mesmas páginas
+    _trabalho["recognizer"], meta = carregar_reconhecedor()
+    _trabalho["nomes"] = nomes_da_versao(meta)
+    _trabalho["intervalo"] = config["reconhecimento"]["intervalo_deteccao"]
+    _trabalho["votos"] = config["reconhecimento"]["votos_necessarios"]
+    _trabalho["janela_votos"] = max(_trabalho["votos"], config["reconhecimento"]["janela_votos"])
+
+
+def planejar(caminhos, trecho, inicio=None):
+    """Divide as entradas em tarefas (origem, tipo, itens, instante inicial, fps)"""
+    tarefas = []
+    for caminho in caminhos:
+        origem = os.path.basename(os.path.normpath(caminho))
+        if os.path.isdir(caminho):
+            arquivos = sorted(os.path.join(caminho, a) for a in os.listdir(caminho)
+                              if a.lower().endswith(EXTENSOES_IMAGEM))
+            for i in range(0, len(arquivos), trecho):
+                tarefas.append((origem, "imagens", arquivos[i:i + trecho], None, None))
+        elif caminho.lower().endswith(EXTENSOES_VIDEO):
+            captura = cv2.VideoCapture(caminho)
+            total = int(captura.get(cv2.CAP_PROP_FRAME_COUNT))
+            fps = captura.get(cv2.CAP_PROP_FPS) or 30.0
+            captura.release()
+            if total <= 0:
+                print(f"⚠️ Não foi possível ler {caminho}")
+                continue
+            # Sem --inicio, a gravação terminou quando o arquivo foi escrito pela última vez
+            comeco = inicio or (datetime.fromtimestamp(os.path.getmtime(caminho))
+                                - timedelta(seconds=total / fps))
+            for primeiro in range(0, total, trecho):
+                tarefas.append((origem, "video", (caminho, primeiro, min(total, primeiro + trecho)),
+                                comeco, fps))
+        else:
+            print(f"⚠️ Ignorado (nem vídeo nem pasta): {caminho}")
+    return tarefas
+
+
+def frames_da_tarefa(tipo, itens, comeco, fps, passo):
+    """Gera (instante, frame) de um trecho de vídeo ou grupo de imagens"""
+    if tipo == "imagens":
+        for arquivo in itens:
+            frame = cv2.imread(arquivo)
+            if frame is not None:
+                yield datetime.fromtimestamp(os.path.getmtime(arquivo)), frame
+        return
+
+    caminho, primeiro, ultimo = itens
+    captura = cv2.VideoCapture(caminho)
+    captura.set(cv2.CAP_PROP_POS_FRAMES, primeiro)
+    try:
+        for numero in range(primeiro, ultimo):
+            # Frames pulados só avançam o decodificador, sem conversão de cor
+            if (numero - primeiro) % passo:
+                if not captura.grab():
+                    break
+                continue
+            ret, frame = captura.read()
+            if not ret:
+                break
+            yield comeco + timedelta(seconds=numero / fps), frame
+    finally:
+        captura.release()
+
+
+def processar_tarefa(tarefa, passo=1):
+    """Reconhece um pedaço; retorna a primeira ocorrência de cada funcionário por dia"""
+    origem, tipo, itens, comeco, fps = tarefa
+    detector = _trabalho["detector"]
+    recognizer = _trabalho["recognizer"]
+    nomes = _trabalho["nomes"]
+    # Em vídeo as faces seguem pelo rastreador entre detecções e a identidade é votada
+    # como no reconhecimento ao vivo; imagens soltas são independentes (um voto basta)
+    if tipo == "video":
+        intervalo, votos = _trabalho["intervalo"], _trabalho["votos"]
+        rastreador = RastreadorFaces(janela_votos=_trabalho["janela_votos"])
+    else:
+        intervalo, votos = 1, 1
+        rastreador = RastreadorFaces()
+
+    primeiras = {}
+    frames = 0
+    inicio = time.perf_counter()
+    for instante, frame in frames_da_tarefa(tipo, itens, comeco, fps, passo):
+        if tipo == "imagens":
+            rastreador.limpar()
+        if frames % intervalo == 0:
+            cinza = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            trilhas = rastreador.atualizar(detector.detectar(cinza))
+            pendentes = [t for t in trilhas if t.perdida == 0 and not t.confirmada]
+            if pendentes:
+                predicoes = recognizer.predict_lote(
+                    [cinza[y:y + h, x:x + w] for (x, y, w, h) in (t.caixa for t in pendentes)])
+                for trilha, (id_pred, conf) in zip(pendentes, predicoes):
+                    id_confirmado = votar_identidade(trilha, id_pred, conf, nomes, votos)
+                    if id_confirmado is not None:
+                        chave = (instante.strftime('%Y-%m-%d'), id_confirmado)
+                        if chave not in primeiras or instante < primeiras[chave][0]:
+                            primeiras[chave] = (instante, id_confirmado, trilha.nome, 100 - trilha.conf, origem)
+        frames += 1
+
+    return {"pid": os.getpid(), "frames": frames,
+            "segundos": time.perf_counter() - inicio,
+            "duracao_gravada": frames * passo / fps if tipo == "video" else 0.0,
+            "ocorrencias": list(primeiras.values())}
+
+
+def consolidar(ocorrencias, presenca, simular=False, entrada=None):
+    """Aplica a regra de registros_hoje: um registro por funcionário por dia"""
+    registrados = {}
+    novos = []
+    for instante, id_func, nome, confianca, origem in sorted(ocorrencias):
+        data = instante.strftime('%Y-%m-%d')
+        if data not in registrados:
+            registrados[data] = presenca.ids_do_dia(data)
+        if id_func in registrados[data]:
+            continue
+        registrados[data].add(id_func)
+        hora = instante.strftime('%H:%M:%S')
+        if not simular:
+            presenca.registrar(id_func, nome, data, hora, confianca, entrada or origem)
+        novos.append({"id": id_func, "nome": nome, "data": data, "hora": hora,
+                      "confianca": round(confianca, 1), "origem": origem})
+    return novos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconhecimento em lote de vídeos e pastas de imagens")
+    parser.add_argument("entradas", nargs="+", help="arquivos de vídeo e/ou pastas de imagens")
+    parser.add_argument("--config", default=CAMINHO_CONFIG)
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--trecho", type=int, default=900,
+                        help="frames (ou imagens) por tarefa do pool")
+    parser.add_argument("--passo", type=int, default=1, help="analisa 1 a cada N frames do vídeo")
+    parser.add_argument("--inicio", help="data/hora do primeiro frame (AAAA-MM-DD HH:MM:SS)")
+    parser.add_argument("--entrada", help="entrada gravada nos registros (padrão: nome do arquivo)")
+    parser.add_argument("--simular", action="store_true", help="não grava no banco, só relata")
+    parser.add_argument("--saida", help="grava o relatório em JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(CAMINHO_MODELO):
+        raise SystemExit("Treine o modelo primeiro!")
+    config = carregar_config(args.config)
+    # Converte o trainer.yml uma vez aqui, e não em cada processo do pool
+    carregar_reconhecedor()
+    inicio = datetime.strptime(args.inicio, '%Y-%m-%d %H:%M:%S') if args.inicio else None
+    tarefas = planejar(args.entradas, max(1, args.trecho), inicio)
+    if not tarefas:
+        raise SystemExit("Nenhum vídeo ou imagem para processar")
+
+    processos = max(1, min(args.processos, len(tarefas)))
+    print(f"🧩 {len(tarefas)} tarefas em {processos} processos")
+
+    resultados = []
+    comeco = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processos, initializer=iniciar_processo,
+                             initargs=(config,)) as pool:
+        futuros = [pool.submit(processar_tarefa, tarefa, max(1, args.passo)) for tarefa in tarefas]
+        for feitos, futuro in enumerate(as_completed(futuros), 1):
+            resultados.append(futuro.result())
+            print(f"\r⏳ {feitos}/{len(tarefas)} tarefas", end="", flush=True)
+    print()
+    duracao = time.perf_counter() - comeco
+
+    presenca = ArmazenamentoPresenca()
+    try:
+        novos = consolidar([o for r in resultados for o in r["ocorrencias"]],
+                           presenca, args.simular, args.entrada)
+    finally:
+        presenca.fechar()
+
+    # Vazão: total, por núcleo (dividida pelos processos) e de cada processo ocupado
+    frames = sum(r["frames"] for r in resultados)
+    gravado = sum(r["duracao_gravada"] for r in resultados)
+    por_processo = {}
+    for r in resultados:
+        atual = por_processo.setdefault(r["pid"], [0, 0.0])
+        atual[0] += r["frames"]
+        atual[1] += r["segundos"]
+    fps_total = frames / duracao if duracao > 0 else 0.0
+    relatorio = {
+        "frames": frames,
+        "segundos": round(duracao, 2),
+        "processos": processos,
+        "fps_total": round(fps_total, 1),
+        "fps_por_nucleo": round(fps_total / processos, 1),
+        "fps_por_processo": {str(pid): round(f / s, 1) if s > 0 else 0.0
+                             for pid, (f, s) in por_processo.items()},
+        "vezes_tempo_real": round(gravado / duracao, 1) if duracao > 0 and gravado else None,
+        "registros": novos,
+        "simulado": args.simular,
+    }
+
+    print(f"⚡ {frames} frames em {duracao:.1f} s: {fps_total:.1f} FPS "
+          f"({relatorio['fps_por_nucleo']:.1f} FPS por núcleo, {processos} processos)")
+    if relatorio["vezes_tempo_real"]:
+        print(f"🎞️ {gravado:.0f} s de gravação, {relatorio['vezes_tempo_real']:.1f}x o tempo real")
+    acao = "seriam gravados" if args.simular else "gravados"
+    print(f"✅ {len(novos)} registros {acao}")
+    for r in novos:
+        print(f"   {r['data']} {r['hora']}  {r['nome']} (ID: {r['id']})  {r['confianca']:.1f}%  [{r['origem']}]")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        print(f"Relatório gravado em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import collections
+import contextlib
+import os
+import threading
+import time
+
+
+PREFIXO = "reconhecimento_"
+
+
+class RegistroMetricas:
+    """Métricas em memória: latências em janela deslizante, contadores e medidores
+
+    Latências (em segundos) guardam as últimas `janela` amostras de cada série
+    para p50/p95/p99; contagem e soma são acumuladas desde o início, como num
+    summary do Prometheus. Coletores são funções chamadas antes de cada leitura
+    para atualizar medidores que só existem sob demanda (FPS, profundidade de filas).
+    """
+
+    QUANTIS = (0.5, 0.95, 0.99)
+
+    def __init__(self, janela=600):
+        self.janela = janela
+        self.lock = threading.Lock()
+        self.latencias = {}
+        self.contadores = {}
+        self.medidores = {}
+        self.coletores = []
+
+    @staticmethod
+    def chave(nome, rotulos):
+        return nome, tuple(sorted(rotulos.items()))
+
+    def observar(self, nome, segundos, **rotulos):
+        chave = self.chave(nome, rotulos)
+        with self.lock:
+            serie = self.latencias.get(chave)
+            if serie is None:
+                serie = self.latencias[chave] = [collections.deque(maxlen=self.janela), 0, 0.0]
+            serie[0].append(segundos)
+            serie[1] += 1
+            serie[2] += segundos
+
+    @contextlib.contextmanager
+    def cronometro(self, nome, **rotulos):
+        """with metricas.cronometro("deteccao", entrada=...): ..."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio, **rotulos)
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        chave = self.chave(nome, rotulos)
+        with self.lock:
+            self.contadores[chave] = self.contadores.get(chave, 0) + valor
+
+    def definir_contador(self, nome, total, **rotulos):
+        """Contador mantido por outro objeto (ex.: descartes do capturador): guarda o total dele
+
+        Coletores podem rodar ao mesmo tempo (exportador e painel), então o total
+        é copiado em vez de somado; um objeto novo recomeçando do zero aparece
+        como reinício do contador, que o rate() do Prometheus já trata.
+        """
+        with self.lock:
+            self.contadores[self.chave(nome, rotulos)] = total
+
+    def definir(self, nome, valor, **rotulos):
+        """Medidor: guarda só o valor mais recente"""
+        with self.lock:
+            self.medidores[self.chave(nome, rotulos)] = valor
+
+    def adicionar_coletor(self, coletor):
+        self.coletores.append(coletor)
+
+    def remover_coletor(self, coletor):
+        if coletor in self.coletores:
+            self.coletores.remove(coletor)
+
+    def coletar(self):
+        for coletor in list(self.coletores):
+            try:
+                coletor(self)
+            except Exception:
+                pass
+
+    def quantis(self, valores):
+        ordenados = sorted(valores)
+        if not ordenados:
+            return {q: 0.0 for q in self.QUANTIS}
+        return {q: ordenados[min(len(ordenados) - 1, int(len(ordenados) * q))] for q in self.QUANTIS}
+
+    def instantaneo(self):
+        """Cópia consistente de tudo: (latencias, contadores, medidores)"""
+        self.coletar()
+        with self.lock:
+            latencias = {c: (list(s[0]), s[1], s[2]) for c, s in self.latencias.items()}
+            return latencias, dict(self.contadores), dict(self.medidores)
+
+    def resumo(self):
+        """Linhas legíveis para o painel de diagnóstico"""
+        latencias, contadores, medidores = self.instantaneo()
+        linhas = []
+        for (nome, rotulos), (valores, contagem, _) in sorted(latencias.items()):
+            q = self.quantis(valores)
+            linhas.append(f"{nome}{formatar_rotulos(rotulos, ' ')}: p50 {1000 * q[0.5]:.1f} ms  "
+                          f"p95 {1000 * q[0.95]:.1f} ms  p99 {1000 * q[0.99]:.1f} ms  (n={contagem})")
+        for (nome, rotulos), valor in sorted(medidores.items()):
+            linhas.append(f"{nome}{formatar_rotulos(rotulos, ' ')}: {valor:.1f}")
+        for (nome, rotulos), valor in sorted(contadores.items()):
+            linhas.append(f"{nome}{formatar_rotulos(rotulos, ' ')}: {valor}")
+        return linhas
+
+    def texto_prometheus(self):
+        """Formato de exposição de texto do Prometheus (para o textfile collector)"""
+        latencias, contadores, medidores = self.instantaneo()
+        linhas = []
+        tipos = set()
+
+        def cabecalho(nome, tipo):
+            if nome not in tipos:
+                tipos.add(nome)
+                linhas.append(f"# TYPE {nome} {tipo}")
+
+        for (nome, rotulos), (valores, contagem, soma) in sorted(latencias.items()):
+            metrica = f"{PREFIXO}{nome}_segundos"
+            cabecalho(metrica, "summary")
+            for q, valor in self.quantis(valores).items():
+                linhas.append(f"{metrica}{formatar_rotulos(rotulos + (('quantile', str(q)),))} {valor:.6f}")
+            linhas.append(f"{metrica}_sum{formatar_rotulos(rotulos)} {soma:.6f}")
+            linhas.append(f"{metrica}_count{formatar_rotulos(rotulos)} {contagem}")
+        for (nome, rotulos), valor in sorted(contadores.items()):
+            metrica = f"{PREFIXO}{nome}_total"
+            cabecalho(metrica, "counter")
+            linhas.append(f"{metrica}{formatar_rotulos(rotulos)} {valor}")
+        for (nome, rotulos), valor in sorted(medidores.items()):
+            metrica = f"{PREFIXO}{nome}"
+            cabecalho(metrica, "gauge")
+            linhas.append(f"{metrica}{formatar_rotulos(rotulos)} {valor}")
+        return "\n".join(linhas) + "\n"
+
+    def exportar(self, caminho):
+        """Grava o arquivo .prom de forma atômica (o coletor nunca lê um arquivo pela metade)"""
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        temporario = caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write(self.texto_prometheus())
+        os.replace(temporario, caminho)
+
+
+def formatar_rotulos(rotulos, separador=""):
+    if not rotulos:
+        return ""
+    texto = ",".join(f'{chave}="{escapar(valor)}"' for chave, valor in rotulos)
+    return f"{separador}{{{texto}}}"
+
+
+def escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class ExportadorMetricas:
+    """Thread que grava o arquivo de métricas a cada `intervalo` segundos"""
+
+    def __init__(self, metricas, caminho, intervalo=15.0):
+        self.metricas = metricas
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.parada = threading.Event()
+        self.thread = None
+
+    def iniciar(self):
+        if self.caminho and self.intervalo > 0 and self.thread is None:
+            self.thread = threading.Thread(target=self.executar, daemon=True)
+            self.thread.start()
+
+    def executar(self):
+        while not self.parada.wait(self.intervalo):
+            try:
+                self.metricas.exportar(self.caminho)
+            except OSError:
+                pass
+
+    def parar(self):
+        self.parada.set()
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        # Última gravação com os números finais
+        if self.caminho:
+            try:
+                self.metricas.exportar(self.caminho)
+            except OSError:
+                pass
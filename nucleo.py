@@ -0,0 +1,468 @@
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+from cameras import DescobertaCameras
+from configuracao import nomes_entradas
+from deteccao import DetectorFaces
+from funcionarios import CadastroFuncionarios
+from metricas import RegistroMetricas
+from pipeline import CapturadorFrames, EstadoCamera, EscalonadorCameras
+from presenca import ArmazenamentoPresenca
+from reconhecedor import ReconhecedorLBPH, IndiceCentroides
+from treinamento import EXTENSAO_PACOTE
+
+
+CAMINHO_MODELO = "recognizer/trainer.yml"
+# Versões do modelo no formato binário (o trainer.yml continua sendo a base do treino incremental);
+# a versão em uso é a apontada por CAMINHO_VERSAO
+PASTA_VERSOES = "recognizer/versoes"
+CAMINHO_VERSAO = "recognizer/versao_atual.json"
+MANTER_VERSOES = 3
+LIMIAR_CONFIANCA = 80  # Distância LBPH abaixo da qual a identidade é aceita
+
+
+def votar_identidade(trilha, id_pred, conf, nomes, votos_necessarios):
+    """Aplica uma predição à trilha; retorna o id quando a votação o confirma
+
+    Até a confirmação a trilha mostra o candidato com "?" (ou "Desconhecido"),
+    sem registrar nada: um frame isolado mal reconhecido não gera presença.
+    """
+    if conf is None:
+        trilha.definir_identidade(None, "Erro", None, False)
+        return None
+    aceito = id_pred if conf < LIMIAR_CONFIANCA else None  # Menor é melhor no LBPH
+    resultado = trilha.votar(aceito, conf, votos_necessarios)
+    if resultado is not None:
+        id_confirmado, distancia = resultado
+        trilha.definir_identidade(id_confirmado, nomes.get(id_confirmado, "Desconhecido"), distancia, True)
+        return id_confirmado
+    if aceito is not None:
+        trilha.definir_identidade(None, f"{nomes.get(aceito, 'Desconhecido')}?", conf, False)
+    else:
+        trilha.definir_identidade(None, "Desconhecido", conf, False)
+    return None
+
+
+def assinatura_arquivo(caminho):
+    estado = os.stat(caminho)
+    return [estado.st_mtime_ns, estado.st_size]
+
+
+def versao_atual():
+    """Nome da versão publicada do modelo (None se ainda não há nenhuma)"""
+    try:
+        with open(CAMINHO_VERSAO, encoding="utf-8") as f:
+            return json.load(f)["versao"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def publicar_versao(reconhecedor, indice=None, nomes=None, caminho_modelo=CAMINHO_MODELO):
+    """Grava uma versão completa numa pasta nova e só então a aponta como atual
+
+    Ninguém lê uma pasta de versão antes do ponteiro, e o ponteiro é trocado
+    com os.replace, então um leitor vê a versão anterior inteira ou a nova
+    inteira. Os nomes vão junto, para ids e nomes nunca se desencontrarem.
+    """
+    os.makedirs(PASTA_VERSOES, exist_ok=True)
+    # O número é reservado com um os.mkdir exclusivo: outro processo publicando ao
+    # mesmo tempo (janela após o treino, serviço ou lote reconvertendo o YAML)
+    # recebe o número seguinte e nunca grava na mesma pasta
+    numero = max((int(v) for v in os.listdir(PASTA_VERSOES) if v.isdigit()), default=0) + 1
+    while True:
+        versao = f"{numero:06d}"
+        pasta = os.path.join(PASTA_VERSOES, versao)
+        try:
+            os.mkdir(pasta)
+            break
+        except FileExistsError:
+            numero += 1
+    nomes = carregar_nomes() if nomes is None else nomes
+    origem = assinatura_arquivo(caminho_modelo) if os.path.exists(caminho_modelo) else None
+    reconhecedor.salvar(pasta, {"versao": versao, "origem": origem,
+                                "nomes": {str(i): nome for i, nome in nomes.items()}})
+    if indice is not None:
+        indice.salvar(os.path.join(pasta, "indice.npz"))
+
+    # Se uma publicação simultânea de número maior já terminou, o ponteiro fica nela
+    atual = versao_atual()
+    if atual is None or not atual.isdigit() or int(atual) < numero:
+        temporario = f"{CAMINHO_VERSAO}.{versao}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({"versao": versao}, f)
+        os.replace(temporario, CAMINHO_VERSAO)
+
+    # No Windows uma versão ainda mapeada por outro processo não sai; fica para a próxima
+    for antiga in os.listdir(PASTA_VERSOES):
+        if antiga.isdigit() and int(antiga) <= numero - MANTER_VERSOES:
+            shutil.rmtree(os.path.join(PASTA_VERSOES, antiga), ignore_errors=True)
+    return versao
+
+
+def carregar_reconhecedor(caminho_modelo=CAMINHO_MODELO):
+    """(reconhecedor, metadados) da versão atual, com a galeria mapeada do formato binário
+
+    Sem versão publicada, ou se o trainer.yml mudou por fora desde a última
+    versão, converte o YAML (lento, só desta vez) e publica uma versão nova.
+    """
+    origem = assinatura_arquivo(caminho_modelo) if os.path.exists(caminho_modelo) else None
+    versao = versao_atual()
+    if versao is not None:
+        try:
+            reconhecedor, meta = ReconhecedorLBPH.carregar(os.path.join(PASTA_VERSOES, versao))
+            if origem is None or meta.get("origem") == origem:
+                return reconhecedor, meta
+        except (OSError, ValueError, KeyError):
+            pass
+
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(caminho_modelo)
+    versao = publicar_versao(ReconhecedorLBPH.de_modelo_cv2(recognizer), caminho_modelo=caminho_modelo)
+    return ReconhecedorLBPH.carregar(os.path.join(PASTA_VERSOES, versao))
+
+
+def nomes_da_versao(meta):
+    return {int(i): nome for i, nome in meta.get("nomes", {}).items()}
+
+
+def carregar_nomes(pasta_faces="faces"):
+    """Lê {id: nome} das pastas "<id>_<nome>" (e dos pacotes "<id>_<nome>.npy") de faces/"""
+    nomes = {}
+    if os.path.exists(pasta_faces):
+        for pasta in os.listdir(pasta_faces):
+            if pasta.endswith(EXTENSAO_PACOTE):
+                pasta = pasta[:-len(EXTENSAO_PACOTE)]
+            elif not os.path.isdir(os.path.join(pasta_faces, pasta)):
+                continue
+            partes = pasta.split("_", 1)
+            if len(partes) == 2 and partes[0].isdigit():
+                nomes[int(partes[0])] = partes[1]
+    return nomes
+
+
+class NucleoReconhecimento:
+    """Captura, reconhecimento e registro de presença, sem nenhuma interface
+
+    Quem usa o núcleo (a janela Tk ou o serviço sem tela) recebe tudo pelo
+    callback ao_evento(tipo, valor), chamado das threads de trabalho:
+        "log"        texto para o log
+        "erro"       falha que interrompeu o reconhecimento
+        "registrado" (id, nome, confianca, entrada, datetime) de um novo registro
+    Com ao_frame(instante, frame, sobreposicoes) definido, os frames da câmera
+    exibida são repassados para desenho; sem ele nada é renderizado.
+    A latência de cada etapa vai para `metricas` (rótulo entrada = câmera).
+    """
+
+    def __init__(self, config, presenca=None, ao_evento=None, ao_frame=None, metricas=None, descoberta=None,
+                 funcionarios=None):
+        self.config = config
+        self.presenca = presenca if presenca is not None else ArmazenamentoPresenca()
+        self.funcionarios = funcionarios if funcionarios is not None else CadastroFuncionarios()
+        self.ao_evento = ao_evento
+        self.ao_frame = ao_frame
+        self.metricas = metricas if metricas is not None else RegistroMetricas()
+        self.metricas.adicionar_coletor(self.coletar_metricas)
+
+        self.candidatos_indice = config["reconhecimento"]["candidatos_indice"]
+        self.intervalo_deteccao = config["reconhecimento"]["intervalo_deteccao"]
+        self.votos_necessarios = config["reconhecimento"]["votos_necessarios"]
+        self.janela_votos = max(self.votos_necessarios, config["reconhecimento"]["janela_votos"])
+        self.entradas = nomes_entradas(config)
+        self.entrada_exibida = self.entradas[0] if self.entradas else None
+        # Índice e backend das câmeras sem configuração explícita (cache em disco)
+        self.descoberta = descoberta if descoberta is not None else DescobertaCameras(
+            config["descoberta"]["arquivo"], config["descoberta"]["indices"])
+
+        self.recognizer = None
+        self.cache_nomes = {}
+        # Modelo em uso: (recognizer, nomes, versão), trocado por inteiro numa única atribuição
+        self.ativo = None
+        self.usar_indice = False
+        # Versão lida do disco (pré-carga em segundo plano): (versão, reconhecedor, metadados)
+        self.base = None
+        self.lock_modelo = threading.Lock()
+        self.thread_precarga = None
+        self.registros_hoje = set()
+        self.dia = None
+        self.lock_registro = threading.Lock()
+
+        self.reconhecendo = False
+        self.cameras_ativas = []
+        self.thread = None
+        # Perfil opcional das threads de análise (perfil.Perfilador)
+        self.perfilador = None
+
+    def emitir(self, tipo, valor):
+        if self.ao_evento:
+            self.ao_evento(tipo, valor)
+
+    def atualizar_nomes(self):
+        """Recarrega os nomes do registro no mesmo dicionário (quem o referencia vê a mudança)"""
+        nomes = self.funcionarios.nomes()
+        self.cache_nomes.clear()
+        self.cache_nomes.update(nomes)
+        return self.cache_nomes
+
+    def carregar_registros_hoje(self):
+        """Recarrega os IDs já registrados hoje; retorna a data usada"""
+        hoje = datetime.now().strftime('%Y-%m-%d')
+        with self.lock_registro:
+            self.registros_hoje = self.presenca.ids_do_dia(hoje)
+            self.dia = hoje
+        return hoje
+
+    def limpar_registros_hoje(self):
+        hoje = datetime.now().strftime('%Y-%m-%d')
+        with self.lock_registro:
+            self.presenca.limpar_dia(hoje)
+            self.registros_hoje = set()
+            self.dia = hoje
+
+    def precarregar_modelo(self):
+        """Carrega o modelo em segundo plano, para o INICIAR não esperar pela leitura"""
+        if not os.path.exists(CAMINHO_MODELO) and versao_atual() is None:
+            return
+        if self.thread_precarga and self.thread_precarga.is_alive():
+            return
+
+        def precarregar():
+            inicio = time.perf_counter()
+            try:
+                _, reconhecedor, _ = self.ler_versao()
+                self.emitir("log", f"⚡ Modelo pré-carregado em {1000 * (time.perf_counter() - inicio):.0f} ms "
+                                   f"({len(reconhecedor)} histogramas)")
+            except Exception as e:
+                self.emitir("log", f"⚠️ Pré-carga do modelo falhou: {e}")
+
+        self.thread_precarga = threading.Thread(target=precarregar, name="precarga-modelo", daemon=True)
+        self.thread_precarga.start()
+
+    def ler_versao(self):
+        """A versão atual do disco; relida só quando outra versão foi publicada"""
+        with self.lock_modelo:
+            base = self.base
+            origem = assinatura_arquivo(CAMINHO_MODELO) if os.path.exists(CAMINHO_MODELO) else None
+            if (base is None or base[0] != versao_atual()
+                    or (origem is not None and base[2].get("origem") != origem)):
+                reconhecedor, meta = carregar_reconhecedor()
+                self.base = base = (meta["versao"], reconhecedor, meta)
+            return base
+
+    def ativar(self, base):
+        """Troca em duas etapas: monta o modelo novo por completo e publica com uma atribuição
+
+        Os trabalhadores leem self.ativo uma vez por frame; os frames em
+        andamento terminam com o modelo anterior, os seguintes já usam o novo.
+        """
+        versao, recognizer, meta = base
+        if self.usar_indice:
+            recognizer = IndiceCentroides.carregar(os.path.join(PASTA_VERSOES, versao, "indice.npz"),
+                                                   recognizer, self.candidatos_indice)
+        nomes = nomes_da_versao(meta)
+        self.ativo = (recognizer, nomes, versao)
+        self.recognizer = recognizer
+        self.cache_nomes.clear()
+        self.cache_nomes.update(nomes)
+
+    def carregar_modelo(self, usar_indice=False):
+        """Modelo para o reconhecimento (exato ou com o índice), aproveitando a pré-carga"""
+        precarga = self.thread_precarga
+        if precarga and precarga.is_alive() and precarga is not threading.current_thread():
+            precarga.join()
+        self.usar_indice = usar_indice
+        self.ativar(self.ler_versao())
+        return self.recognizer
+
+    def verificar_versao(self):
+        """Troca a quente se outra versão foi publicada (por esta janela ou outro processo)"""
+        ativo = self.ativo
+        if ativo is None or versao_atual() in (None, ativo[2]):
+            return False
+        inicio = time.perf_counter()
+        base = self.ler_versao()
+        self.ativar(base)
+        self.emitir("log", f"🔄 Modelo trocado para a versão {base[0]} ({len(base[1])} histogramas, "
+                           f"{1000 * (time.perf_counter() - inicio):.0f} ms) sem parar o reconhecimento")
+        return True
+
+    def publicar_modelo(self, reconhecedor, indice=None):
+        """Publica o modelo recém-treinado; com um modelo em uso, troca a quente"""
+        versao = publicar_versao(reconhecedor, indice, self.funcionarios.nomes())
+        if self.ativo is not None:
+            self.verificar_versao()
+        else:
+            self.precarregar_modelo()
+        return versao
+
+    def registrar(self, id_func, nome, confianca, entrada=None):
+        """Grava a presença se o funcionário ainda não foi registrado hoje"""
+        agora = datetime.now()
+        hoje = agora.strftime('%Y-%m-%d')
+        with self.lock_registro:
+            # Virada do dia em execuções longas: recomeça o conjunto de hoje
+            if hoje != self.dia:
+                self.registros_hoje = self.presenca.ids_do_dia(hoje)
+                self.dia = hoje
+            if id_func in self.registros_hoje:
+                return False
+            with self.metricas.cronometro("registro"):
+                self.presenca.registrar(id_func, nome, hoje, agora.strftime('%H:%M:%S'), confianca, entrada)
+            self.registros_hoje.add(id_func)
+        self.metricas.incrementar("registros", entrada=entrada or "")
+        self.emitir("registrado", (id_func, nome, confianca, entrada, agora))
+        return True
+
+    def iniciar(self):
+        """Inicia o reconhecimento em segundo plano (o modelo já deve estar carregado)"""
+        self.reconhecendo = True
+        self.thread = threading.Thread(target=self.executar, daemon=True)
+        self.thread.start()
+
+    def parar(self, esperar=False):
+        self.reconhecendo = False
+        if esperar and self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5.0)
+
+    def executar(self):
+        """Coordena o reconhecimento de todas as câmeras configuradas
+
+        Pipeline: uma thread de captura por câmera (CapturadorFrames) ->
+        trabalhadores de análise que compartilham o modelo e atendem as câmeras
+        em rodízio -> ao_frame com a câmera escolhida, se houver quem exiba.
+        As filas descartam o item mais antigo, então uma câmera lenta só perde
+        os próprios frames.
+        """
+        cameras = []
+        try:
+            escalonador = EscalonadorCameras(cameras)
+            descoberta = self.descoberta
+            # Câmera automática sem nenhuma conhecida: sonda agora (nesta thread, não na interface)
+            if descoberta.conhecida() is None and any(c.get("indice") is None for c in self.config["cameras"]):
+                descoberta.descobrir()
+                descoberta.aguardar()
+            for config_camera, entrada in zip(self.config["cameras"], self.entradas):
+                indice, backend = descoberta.resolver(config_camera.get("indice"), config_camera.get("backend"))
+                capturador = CapturadorFrames(indice, backend, largura=640, altura=480,
+                                              ao_receber=escalonador.avisar)
+                if capturador.iniciar():
+                    cameras.append(EstadoCamera(capturador, entrada, self.janela_votos))
+                else:
+                    self.emitir("log", f"⚠️ Câmera '{entrada}' (índice {indice}) não abriu")
+                    descoberta.invalidar(indice, backend)
+
+            if not cameras:
+                self.reconhecendo = False
+                self.emitir("erro", "Não foi possível abrir a câmera!")
+                return
+            escalonador.cameras = cameras
+            self.cameras_ativas = cameras
+
+            # Por padrão, uma thread de análise por câmera (o detector e o numpy liberam o GIL)
+            quantidade = self.config["reconhecimento"]["trabalhadores"] or len(cameras)
+            trabalhadores = []
+            for numero in range(quantidade):
+                trabalhador = threading.Thread(target=self.trabalhador, args=(escalonador,),
+                                               name=f"analise-{numero + 1}", daemon=True)
+                trabalhador.start()
+                trabalhadores.append(trabalhador)
+            self.emitir("log", f"📷 {len(cameras)} câmera(s), {quantidade} trabalhador(es) de análise")
+
+            # Enquanto os trabalhadores rodam, esta thread procura versões novas do modelo
+            while self.reconhecendo:
+                time.sleep(1.0)
+                try:
+                    self.verificar_versao()
+                except Exception as e:
+                    self.emitir("log", f"⚠️ Troca de modelo falhou, segue a versão anterior: {e}")
+            for trabalhador in trabalhadores:
+                trabalhador.join()
+
+        except Exception as e:
+            self.emitir("log", f"Erro no reconhecimento: {e}")
+        finally:
+            for camera in cameras:
+                camera.capturador.parar()
+
+    def trabalhador(self, escalonador):
+        """Estágio de análise: pega o próximo frame pronto de qualquer câmera"""
+        try:
+            # Um detector por thread: o CascadeClassifier não pode ser usado por duas threads ao mesmo tempo
+            detector = DetectorFaces.de_config(self.config["deteccao"])
+            while self.reconhecendo:
+                camera, item = escalonador.pegar(timeout=0.5)
+                perfilador = self.perfilador
+                if perfilador:
+                    perfilador.quadro(contar=camera is not None)
+                if camera is None:
+                    continue
+                try:
+                    self.analisar_frame(camera, item, detector)
+                except Exception as e:
+                    self.emitir("log", f"Erro no reconhecimento ({camera.entrada}): {e}")
+                finally:
+                    escalonador.liberar(camera)
+        finally:
+            if self.perfilador:
+                self.perfilador.sair()
+
+    def analisar_frame(self, camera, item, detector):
+        """Detecta, rastreia e reconhece um frame de uma câmera"""
+        _, instante, frame = item
+        rastreador = camera.rastreador
+        metricas = self.metricas
+        entrada = camera.entrada
+        # Tempo entre a leitura da câmera e o início da análise (fila + espera por trabalhador)
+        metricas.observar("espera_captura", time.perf_counter() - instante, entrada=entrada)
+
+        # Detecção completa só a cada N frames; nos demais as trilhas mantêm a caixa
+        if camera.numero_frame % self.intervalo_deteccao == 0:
+            with metricas.cronometro("deteccao", entrada=entrada):
+                cinza = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                faces = detector.detectar(cinza)
+                trilhas = rastreador.atualizar(faces)
+
+            # Predição só para trilhas novas ou ainda não confirmadas,
+            # todas de uma vez numa única passada pela galeria
+            pendentes = [t for t in trilhas if t.perdida == 0 and not t.confirmada]
+            # Modelo e nomes lidos juntos: uma troca no meio do frame não os mistura
+            recognizer, nomes, _ = self.ativo or (None, {}, None)
+            if recognizer and pendentes:
+                try:
+                    with metricas.cronometro("predicao", entrada=entrada):
+                        predicoes = recognizer.predict_lote(
+                            [cinza[y:y + h, x:x + w] for (x, y, w, h) in (t.caixa for t in pendentes)])
+                except Exception:
+                    predicoes = [(-1, None)] * len(pendentes)
+
+                for trilha, (id_pred, conf) in zip(pendentes, predicoes):
+                    id_confirmado = votar_identidade(trilha, id_pred, conf, nomes, self.votos_necessarios)
+
+                    # Registrar presença (uma vez por trilha confirmada, se ainda não registrou hoje)
+                    if id_confirmado is not None and id_confirmado not in self.registros_hoje:
+                        self.registrar(id_confirmado, trilha.nome, 100 - trilha.conf, entrada)  # Passar porcentagem
+        camera.numero_frame += 1
+        camera.analise.registrar(time.perf_counter() - instante)
+        metricas.observar("analise", time.perf_counter() - instante, entrada=entrada)
+
+        # Só a câmera exibida segue para o desenho, e só se alguém exibe
+        if self.ao_frame and camera.entrada == self.entrada_exibida:
+            sobreposicoes = [(t.caixa, t.nome, t.conf, t.confirmada) for t in rastreador.trilhas
+                             if t.perdida == 0 and t.nome is not None]
+            self.ao_frame(instante, frame, sobreposicoes)
+
+    def coletar_metricas(self, metricas):
+        """FPS e descartes de cada câmera, lidos no momento da exportação"""
+        for camera in self.cameras_ativas:
+            metricas.definir("fps_captura", round(camera.capturador.medidor.fps(), 2), entrada=camera.entrada)
+            metricas.definir("fps_analise", round(camera.analise.fps(), 2), entrada=camera.entrada)
+            metricas.definir_contador("frames_descartados", camera.capturador.descartados, entrada=camera.entrada)
+
+    def resumo_desempenho(self):
+        """Uma linha por câmera: FPS de captura e análise e frames descartados"""
+        return [camera.resumo() for camera in self.cameras_ativas]
@@ -0,0 +1,188 @@
+import cProfile
+import collections
+import contextlib
+import os
+import pstats
+import sys
+import threading
+import time
+
+import cv2
+
+
+# Nomes das funções e classes do OpenCV, para separar o tempo nativo do cv2 no pstats
+NOMES_CV2 = set(dir(cv2)) | set(dir(cv2.CascadeClassifier)) | set(dir(cv2.VideoCapture))
+
+
+def chamada_opencv(funcao):
+    """True para entradas do pstats que são chamadas nativas do OpenCV"""
+    arquivo, _, nome = funcao
+    if arquivo != "~":
+        return False
+    return "cv2." in nome or nome.strip("<>") in NOMES_CV2
+
+
+class Perfilador:
+    """Perfil opcional das threads de trabalho, limitado por tempo ou por frames
+
+    cProfile só enxerga a thread em que foi ligado, então cada thread de
+    trabalho liga o próprio perfil ao chamar quadro() (a cada frame) ou ao
+    entrar em perfilar(). Em paralelo, uma thread de amostragem grava as
+    pilhas das threads perfiladas no formato "collapsed" (flame graph).
+
+    Saída em <pasta>/<data_hora>/: um .prof (pstats) e um .collapsed por thread
+    e resumo.txt com o tempo do OpenCV versus o restante (Python) de cada uma.
+    """
+
+    def __init__(self, pasta="perfis", segundos=30.0, frames=0, amostragem=0.005):
+        self.pasta = os.path.join(pasta, time.strftime("%Y%m%d_%H%M%S"))
+        self.segundos = segundos
+        self.frames = frames
+        self.amostragem = amostragem
+        self.lock = threading.Lock()
+        self.threads = {}  # ident -> {"nome", "perfil", "frames", "salvo"}
+        self.pilhas = collections.defaultdict(collections.Counter)
+        self.ativo = False
+        self.inicio = None
+        self.frames_total = 0
+        self.concluido = threading.Event()
+        self.thread_amostragem = None
+
+    def iniciar(self):
+        os.makedirs(self.pasta, exist_ok=True)
+        self.inicio = time.perf_counter()
+        self.ativo = True
+        self.thread_amostragem = threading.Thread(target=self.amostrar, name="perfil-amostragem", daemon=True)
+        self.thread_amostragem.start()
+        return self
+
+    def expirou(self):
+        if self.segundos and time.perf_counter() - self.inicio >= self.segundos:
+            return True
+        return bool(self.frames) and self.frames_total >= self.frames
+
+    def encerrar(self):
+        """Fecha a janela; cada thread desliga o próprio perfil na próxima chamada"""
+        self.ativo = False
+        self.finalizar_se_pronto()
+
+    def ligar(self, nome=None):
+        ident = threading.get_ident()
+        with self.lock:
+            estado = self.threads.get(ident)
+            if estado is None:
+                estado = self.threads[ident] = {"nome": nome or threading.current_thread().name,
+                                                "perfil": cProfile.Profile(), "frames": 0, "salvo": False}
+                estado["perfil"].enable()
+        return estado
+
+    def quadro(self, nome=None, contar=True):
+        """Chamado pela thread de trabalho a cada frame (contar=False quando ficou ociosa)"""
+        if self.ativo and self.expirou():
+            self.encerrar()
+        if not self.ativo:
+            self.sair()
+        elif contar:
+            estado = self.ligar(nome)
+            with self.lock:
+                estado["frames"] += 1
+                self.frames_total += 1
+
+    def sair(self):
+        """Desliga e salva o perfil da thread atual (chamar antes de a thread terminar)"""
+        with self.lock:
+            estado = self.threads.get(threading.get_ident())
+            if estado is None or estado["salvo"]:
+                return
+            estado["perfil"].disable()
+            estado["salvo"] = True
+        estado["perfil"].dump_stats(os.path.join(self.pasta, f"{self.arquivo(estado)}.prof"))
+        self.finalizar_se_pronto()
+
+    @contextlib.contextmanager
+    def perfilar(self, nome):
+        """Perfila o bloco inteiro na thread atual (ex.: uma rodada de treinamento)"""
+        if not self.ativo:
+            yield
+            return
+        self.ligar(nome)
+        try:
+            yield
+        finally:
+            self.sair()
+
+    def amostrar(self):
+        """Pilhas das threads perfiladas a cada `amostragem` segundos
+
+        Também fecha a janela no limite: sem frames de reconhecimento ou cadastro
+        (só treinamento, ou trabalhadores já parados) quadro() nunca seria chamado.
+        """
+        while self.ativo:
+            if self.expirou():
+                self.encerrar()
+                break
+            quadros = sys._current_frames()
+            with self.lock:
+                idents = [i for i, e in self.threads.items() if not e["salvo"]]
+            for ident in idents:
+                quadro = quadros.get(ident)
+                pilha = []
+                while quadro is not None:
+                    codigo = quadro.f_code
+                    pilha.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+                    quadro = quadro.f_back
+                if pilha:
+                    self.pilhas[ident][";".join(reversed(pilha))] += 1
+            time.sleep(self.amostragem)
+
+    def arquivo(self, estado):
+        return "".join(c if c.isalnum() or c in "-_" else "_" for c in estado["nome"])
+
+    def finalizar_se_pronto(self):
+        """Grava collapsed e resumo quando a janela fechou e todas as threads salvaram"""
+        with self.lock:
+            if self.ativo or self.concluido.is_set() or any(not e["salvo"] for e in self.threads.values()):
+                return
+            self.concluido.set()
+            estados = dict(self.threads)
+
+        # A amostragem pode estar na última passada, ainda mexendo em pilhas:
+        # espera ela sair do laço (fora do lock, que ela também usa)
+        amostragem = self.thread_amostragem
+        if amostragem is not None and amostragem is not threading.current_thread():
+            amostragem.join()
+
+        linhas = [f"Perfil de {len(estados)} thread(s), {self.frames_total} frames, "
+                  f"{time.perf_counter() - self.inicio:.1f} s", ""]
+        for ident, estado in estados.items():
+            nome = self.arquivo(estado)
+            with open(os.path.join(self.pasta, f"{nome}.collapsed"), "w", encoding="utf-8") as f:
+                for pilha, contagem in self.pilhas[ident].most_common():
+                    f.write(f"{pilha} {contagem}\n")
+            linhas += self.resumir(estado)
+        with open(os.path.join(self.pasta, "resumo.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(linhas) + "\n")
+
+    def resumir(self, estado):
+        """Tempo próprio (tottime) do OpenCV versus o restante, total e por frame"""
+        estatisticas = pstats.Stats(estado["perfil"]).stats
+        total = sum(s[2] for s in estatisticas.values())
+        opencv = {f: s for f, s in estatisticas.items() if chamada_opencv(f)}
+        tempo_opencv = sum(s[2] for s in opencv.values())
+        frames = max(1, estado["frames"])
+
+        linhas = [f"== {estado['nome']} ({estado['frames']} frames)",
+                  f"   total {1000 * total:.1f} ms | OpenCV {1000 * tempo_opencv:.1f} ms "
+                  f"({100 * tempo_opencv / total if total else 0:.0f}%) | "
+                  f"Python e demais {1000 * (total - tempo_opencv):.1f} ms",
+                  f"   por frame: OpenCV {1000 * tempo_opencv / frames:.2f} ms, "
+                  f"demais {1000 * (total - tempo_opencv) / frames:.2f} ms",
+                  "   chamadas OpenCV (chamadas, ms por chamada, ms total):"]
+        for (_, _, nome), s in sorted(opencv.items(), key=lambda item: -item[1][2])[:10]:
+            linhas.append(f"      {nome:<45} {s[1]:>7} {1000 * s[2] / max(1, s[1]):>9.3f} {1000 * s[2]:>10.1f}")
+        linhas.append("   maiores tempos próprios:")
+        for (arquivo, linha, nome), s in sorted(estatisticas.items(), key=lambda item: -item[1][2])[:15]:
+            origem = nome if arquivo == "~" else f"{os.path.basename(arquivo)}:{linha}({nome})"
+            linhas.append(f"      {origem:<60} {1000 * s[2]:>10.1f} ms")
+        linhas.append("")
+        return linhas
@@ -0,0 +1,200 @@
+import collections
+import threading
+import time
+
+from cameras import abrir_camera
+from rastreamento import RastreadorFaces
+
+
+class FilaDescarte:
+    """Fila limitada que descarta o item mais antigo quando está cheia
+
+    Um estágio lento nunca acumula frames velhos: ele sempre recebe o mais novo.
+    """
+
+    def __init__(self, tamanho=1):
+        self.tamanho = tamanho
+        self.itens = collections.deque()
+        self.condicao = threading.Condition()
+        self.descartados = 0
+        self.fechada = False
+
+    def put(self, item):
+        with self.condicao:
+            if len(self.itens) >= self.tamanho:
+                self.itens.popleft()
+                self.descartados += 1
+            self.itens.append(item)
+            self.condicao.notify()
+
+    def get(self, timeout=None):
+        """Retorna o próximo item, ou None se o tempo esgotar ou a fila for fechada"""
+        with self.condicao:
+            self.condicao.wait_for(lambda: self.itens or self.fechada, timeout)
+            return self.itens.popleft() if self.itens else None
+
+    def fechar(self):
+        with self.condicao:
+            self.fechada = True
+            self.condicao.notify_all()
+
+    def __len__(self):
+        return len(self.itens)
+
+
+class MedidorDesempenho:
+    """Janela deslizante de latência fim a fim e taxa de frames"""
+
+    def __init__(self, janela=120):
+        self.latencias = collections.deque(maxlen=janela)
+        self.instantes = collections.deque(maxlen=janela)
+        self.lock = threading.Lock()
+
+    def registrar(self, latencia):
+        with self.lock:
+            self.latencias.append(latencia)
+            self.instantes.append(time.perf_counter())
+
+    def fps(self):
+        with self.lock:
+            if len(self.instantes) < 2:
+                return 0.0
+            duracao = self.instantes[-1] - self.instantes[0]
+            return (len(self.instantes) - 1) / duracao if duracao > 0 else 0.0
+
+    def latencia_ms(self, percentil=50):
+        with self.lock:
+            if not self.latencias:
+                return 0.0
+            ordenadas = sorted(self.latencias)
+        indice = min(len(ordenadas) - 1, int(len(ordenadas) * percentil / 100.0))
+        return 1000.0 * ordenadas[indice]
+
+
+class CapturadorFrames:
+    """Thread dedicada à câmera que mantém só o frame mais recente
+
+    O read() da câmera dita o ritmo; quem consome nunca espera por frames
+    antigos acumulados no buffer.
+    """
+
+    def __init__(self, indice=0, backend=None, largura=640, altura=480, ao_receber=None):
+        self.indice = indice
+        self.backend = backend
+        self.largura = largura
+        self.altura = altura
+        # Chamado a cada frame novo (ex.: para acordar os trabalhadores)
+        self.ao_receber = ao_receber
+        self.frames = FilaDescarte(1)
+        self.medidor = MedidorDesempenho()
+        self.webcam = None
+        self.ativo = False
+        self.thread = None
+        self.sequencia = 0
+
+    def iniciar(self):
+        """Abre a câmera e inicia a leitura; retorna False se não abrir"""
+        self.webcam = abrir_camera(self.indice, self.backend, self.largura, self.altura)
+        if self.webcam is None:
+            return False
+
+        self.ativo = True
+        self.thread = threading.Thread(target=self.capturar, daemon=True)
+        self.thread.start()
+        return True
+
+    def capturar(self):
+        ultimo = time.perf_counter()
+        while self.ativo:
+            ret, frame = self.webcam.read()
+            agora = time.perf_counter()
+            if not ret or frame is None:
+                # Câmera sem frame: espera antes de tentar de novo, sem girar em falso
+                time.sleep(0.05)
+                continue
+            self.sequencia += 1
+            self.medidor.registrar(agora - ultimo)
+            ultimo = agora
+            self.frames.put((self.sequencia, agora, frame))
+            if self.ao_receber:
+                self.ao_receber()
+
+    def ler(self, timeout=1.0):
+        """Retorna (sequencia, instante_captura, frame) do frame mais novo, ou None"""
+        return self.frames.get(timeout)
+
+    @property
+    def descartados(self):
+        return self.frames.descartados
+
+    def parar(self):
+        self.ativo = False
+        self.frames.fechar()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2.0)
+        if self.webcam:
+            self.webcam.release()
+
+
+class EstadoCamera:
+    """Uma câmera do pipeline: captura, rastreador e contadores próprios"""
+
+    def __init__(self, capturador, entrada, janela_votos=1):
+        self.capturador = capturador
+        self.entrada = entrada
+        self.rastreador = RastreadorFaces(janela_votos=janela_votos)
+        self.numero_frame = 0
+        self.ocupada = False
+        self.analise = MedidorDesempenho()
+
+    def resumo(self):
+        return (f"{self.entrada}: captura {self.capturador.medidor.fps():.1f} FPS, "
+                f"análise {self.analise.fps():.1f} FPS "
+                f"({self.analise.latencia_ms(50):.0f} ms), "
+                f"descartados {self.capturador.descartados}")
+
+
+class EscalonadorCameras:
+    """Distribui os frames das câmeras entre os trabalhadores em rodízio
+
+    Cada câmera é analisada por um trabalhador por vez (o rastreador é dela) e
+    o rodízio garante que uma câmera lenta nunca deixe outra sem atendimento:
+    frames que não couberem no ritmo são descartados na própria câmera.
+    """
+
+    def __init__(self, cameras):
+        self.cameras = list(cameras)
+        self.condicao = threading.Condition()
+        self.proxima = 0
+
+    def avisar(self):
+        """Chamado pelos capturadores quando chega frame novo"""
+        with self.condicao:
+            self.condicao.notify_all()
+
+    def pegar(self, timeout=0.5):
+        """Retorna (camera, item) do próximo frame a analisar, ou (None, None)"""
+        limite = time.perf_counter() + timeout
+        with self.condicao:
+            while True:
+                total = len(self.cameras)
+                for deslocamento in range(total):
+                    i = (self.proxima + deslocamento) % total
+                    camera = self.cameras[i]
+                    if camera.ocupada or len(camera.capturador.frames) == 0:
+                        continue
+                    item = camera.capturador.ler(timeout=0)
+                    if item is None:
+                        continue
+                    camera.ocupada = True
+                    self.proxima = (i + 1) % total
+                    return camera, item
+
+                restante = limite - time.perf_counter()
+                if restante <= 0 or not self.condicao.wait(restante):
+                    return None, None
+
+    def liberar(self, camera):
+        with self.condicao:
+            camera.ocupada = False
+            self.condicao.notify_all()
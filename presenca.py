@@ -0,0 +1,212 @@
+import csv
+import os
+import sqlite3
+import threading
+
+
+class ArmazenamentoPresenca:
+    """Armazena os registros de presença em SQLite (modo WAL, somente inserção)"""
+
+    COLUNAS_CSV = ["ID", "Nome", "Data", "Hora", "Confianca"]
+
+    def __init__(self, caminho_db="registros/presenca.db", caminho_csv="registros/presenca.csv"):
+        self.caminho_db = caminho_db
+        self.caminho_csv = caminho_csv
+        self.lock = threading.Lock()
+        # Linhas do CSV antigo que a migração não conseguiu importar (quem abre o banco avisa)
+        self.linhas_ignoradas = 0
+
+        pasta = os.path.dirname(caminho_db)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+        # Uma única conexão compartilhada; o lock serializa o acesso entre threads
+        self.conexao = sqlite3.connect(caminho_db, check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        # NORMAL em WAL: cada commit só anexa ao log, o fsync fica para o checkpoint
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.criar_tabelas()
+        self.migrar_csv()
+
+    def criar_tabelas(self):
+        """Cria as tabelas se ainda não existirem"""
+        with self.lock, self.conexao:
+            self.conexao.execute("""
+                CREATE TABLE IF NOT EXISTS presenca (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id INTEGER NOT NULL,
+                    nome TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    hora TEXT NOT NULL,
+                    confianca REAL NOT NULL,
+                    entrada TEXT
+                )
+            """)
+            # Bancos criados antes do suporte a várias câmeras não têm a coluna entrada
+            colunas = {linha[1] for linha in self.conexao.execute("PRAGMA table_info(presenca)")}
+            if "entrada" not in colunas:
+                self.conexao.execute("ALTER TABLE presenca ADD COLUMN entrada TEXT")
+            # Índice por dia: consultar/limpar "hoje" não depende do tamanho do histórico
+            self.conexao.execute(
+                "CREATE INDEX IF NOT EXISTS idx_presenca_data ON presenca (data, seq)")
+            self.conexao.execute("""
+                CREATE TABLE IF NOT EXISTS meta (
+                    chave TEXT PRIMARY KEY,
+                    valor TEXT
+                )
+            """)
+
+    def ler_meta(self, chave):
+        with self.lock:
+            linha = self.conexao.execute(
+                "SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+        return linha[0] if linha else None
+
+    def gravar_meta(self, chave, valor):
+        with self.lock, self.conexao:
+            self.conexao.execute(
+                "INSERT OR REPLACE INTO meta (chave, valor) VALUES (?, ?)", (chave, str(valor)))
+
+    @staticmethod
+    def converter_confianca(valor):
+        """Converte '87.3%' (formato antigo do CSV) para 87.3"""
+        try:
+            return float(str(valor).strip().rstrip("%"))
+        except ValueError:
+            return 0.0
+
+    def migrar_csv(self):
+        """Importa o presenca.csv antigo uma única vez"""
+        if self.ler_meta("migrado_csv"):
+            return 0
+
+        if not os.path.exists(self.caminho_csv):
+            self.gravar_meta("migrado_csv", 0)
+            return 0
+
+        # Linhas corrompidas do CSV antigo são puladas, sem impedir a abertura do banco
+        linhas = []
+        ignoradas = 0
+        with open(self.caminho_csv, newline="", encoding="utf-8") as f:
+            for r in csv.DictReader(f):
+                try:
+                    if not (r["Nome"] and r["Data"] and r["Hora"]):
+                        raise ValueError("campo vazio")
+                    linhas.append((int(r["ID"]), r["Nome"], r["Data"], r["Hora"],
+                                   self.converter_confianca(r["Confianca"])))
+                except (KeyError, TypeError, ValueError):
+                    ignoradas += 1
+        self.linhas_ignoradas = ignoradas
+
+        # Importação e marca de migrado na mesma transação: uma queda entre
+        # as duas não faz o CSV ser importado de novo na próxima execução
+        with self.lock, self.conexao:
+            self.conexao.executemany(
+                "INSERT INTO presenca (id, nome, data, hora, confianca) VALUES (?, ?, ?, ?, ?)", linhas)
+            self.conexao.execute(
+                "INSERT OR REPLACE INTO meta (chave, valor) VALUES ('migrado_csv', ?)", (str(len(linhas)),))
+        return len(linhas)
+
+    def registrar(self, id_func, nome, data, hora, confianca, entrada=None):
+        """Anexa um registro (O(1), independente do tamanho do histórico)"""
+        with self.lock, self.conexao:
+            self.conexao.execute(
+                "INSERT INTO presenca (id, nome, data, hora, confianca, entrada) VALUES (?, ?, ?, ?, ?, ?)",
+                (int(id_func), nome, data, hora, float(confianca), entrada))
+
+    def registros_do_dia(self, data):
+        """Retorna (id, nome, hora, confianca, entrada) dos registros de um dia, em ordem de chegada"""
+        with self.lock:
+            return self.conexao.execute(
+                "SELECT id, nome, hora, confianca, entrada FROM presenca WHERE data = ? ORDER BY seq",
+                (data,)).fetchall()
+
+    def ids_do_dia(self, data):
+        """Retorna o conjunto de IDs já registrados em um dia"""
+        with self.lock:
+            linhas = self.conexao.execute(
+                "SELECT DISTINCT id FROM presenca WHERE data = ?", (data,)).fetchall()
+        return {linha[0] for linha in linhas}
+
+    def ultimos_do_dia(self, data, limite=20):
+        """Retorna os últimos registros de um dia, do mais recente para o mais antigo"""
+        with self.lock:
+            return self.conexao.execute(
+                "SELECT id, nome, hora, confianca, entrada FROM presenca WHERE data = ? "
+                "ORDER BY seq DESC LIMIT ?", (data, limite)).fetchall()
+
+    def contar_dia(self, data):
+        with self.lock:
+            return self.conexao.execute(
+                "SELECT COUNT(*) FROM presenca WHERE data = ?", (data,)).fetchone()[0]
+
+    def limpar_dia(self, data):
+        """Remove os registros de um dia"""
+        with self.lock, self.conexao:
+            return self.conexao.execute("DELETE FROM presenca WHERE data = ?", (data,)).rowcount
+
+    def resumo_meses(self, meses):
+        """Retorna (mes, linhas, ultimo_seq) de cada mês AAAA-MM da lista que tem registros"""
+        resumo = []
+        with self.lock:
+            # Uma faixa do índice de data por mês (o GROUP BY por substr varreria o período todo)
+            for mes in meses:
+                linhas, ultimo = self.conexao.execute(
+                    "SELECT COUNT(*), MAX(seq) FROM presenca WHERE data BETWEEN ? AND ?",
+                    (f"{mes}-01", f"{mes}-31")).fetchone()
+                if linhas:
+                    resumo.append((mes, linhas, ultimo))
+        return resumo
+
+    def colunas_do_mes(self, mes, tamanho=50000):
+        """Registros de um mês em blocos de (seq, id, dia, segundos, confianca, entrada)
+
+        Dia e segundos do dia já vêm convertidos pelo SQLite, então só a
+        entrada continua texto.
+        """
+        blocos = []
+        with self.lock:
+            cursor = self.conexao.execute(
+                "SELECT seq, id, CAST(substr(data, 9, 2) AS INTEGER), "
+                "CAST(substr(hora, 1, 2) AS INTEGER) * 3600 + CAST(substr(hora, 4, 2) AS INTEGER) * 60 "
+                "+ CAST(substr(hora, 7, 2) AS INTEGER), confianca, entrada "
+                "FROM presenca WHERE data BETWEEN ? AND ?", (f"{mes}-01", f"{mes}-31"))
+            while True:
+                linhas = cursor.fetchmany(tamanho)
+                if not linhas:
+                    break
+                blocos.append(linhas)
+        return blocos
+
+    def nomes_do_mes(self, mes):
+        """{id: nome} com o nome do registro mais recente de cada funcionário no mês"""
+        with self.lock:
+            return {id_func: nome for id_func, nome, _ in self.conexao.execute(
+                "SELECT id, nome, MAX(seq) FROM presenca WHERE data BETWEEN ? AND ? GROUP BY id",
+                (f"{mes}-01", f"{mes}-31"))}
+
+    def exportar_csv(self, destino=None):
+        """Exporta todo o histórico no layout ID,Nome,Data,Hora,Confianca"""
+        destino = destino or self.caminho_csv
+        temporario = destino + ".tmp"
+        total = 0
+
+        with self.lock:
+            cursor = self.conexao.execute(
+                "SELECT id, nome, data, hora, confianca FROM presenca ORDER BY seq")
+            with open(temporario, "w", newline="", encoding="utf-8") as f:
+                escritor = csv.writer(f)
+                escritor.writerow(self.COLUNAS_CSV)
+                while True:
+                    linhas = cursor.fetchmany(5000)
+                    if not linhas:
+                        break
+                    escritor.writerows((i, n, d, h, f"{c:.1f}%") for i, n, d, h, c in linhas)
+                    total += len(linhas)
+
+        os.replace(temporario, destino)
+        return total
+
+    def fechar(self):
+        with self.lock:
+            self.conexao.close()
@@ -0,0 +1,105 @@
+import collections
+import itertools
+
+
+def iou(a, b):
+    """Interseção sobre união de duas caixas (x, y, w, h)"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    largura = min(ax + aw, bx + bw) - max(ax, bx)
+    altura = min(ay + ah, by + bh) - max(ay, by)
+    if largura <= 0 or altura <= 0:
+        return 0.0
+    intersecao = largura * altura
+    return intersecao / float(aw * ah + bw * bh - intersecao)
+
+
+class Trilha:
+    """Uma face acompanhada entre frames, com a identidade reconhecida em cache"""
+
+    def __init__(self, id_trilha, caixa, janela_votos=1):
+        self.id = id_trilha
+        self.caixa = tuple(int(v) for v in caixa)
+        self.perdida = 0
+        self.id_pred = None
+        self.nome = None
+        self.conf = None
+        self.confirmada = False
+        # Últimas predições (id aceito ou None, distância) para a votação
+        self.votos = collections.deque(maxlen=janela_votos)
+
+    def definir_identidade(self, id_pred, nome, conf, confirmada):
+        self.id_pred = id_pred
+        self.nome = nome
+        self.conf = conf
+        self.confirmada = confirmada
+
+    def votar(self, id_pred, conf, votos_necessarios):
+        """Acrescenta uma predição; retorna (id, distância média) quando K das últimas N concordam
+
+        id_pred None conta como voto contra (face desconhecida ou abaixo do limiar).
+        """
+        self.votos.append((id_pred, conf))
+        contagem = collections.Counter(i for i, _ in self.votos if i is not None)
+        if not contagem:
+            return None
+        vencedor, votos = contagem.most_common(1)[0]
+        if votos < votos_necessarios:
+            return None
+        distancias = [c for i, c in self.votos if i == vencedor]
+        return vencedor, sum(distancias) / len(distancias)
+
+
+class RastreadorFaces:
+    """Rastreador por IoU: associa as detecções às trilhas existentes
+
+    Só é atualizado nos frames em que a detecção roda; entre eles as trilhas
+    mantêm a última caixa e a identidade já reconhecida.
+    """
+
+    def __init__(self, limiar_iou=0.3, max_perdidas=2, janela_votos=1):
+        self.limiar_iou = limiar_iou
+        # Em rodadas de detecção, não em frames
+        self.max_perdidas = max_perdidas
+        self.janela_votos = janela_votos
+        self.trilhas = []
+        self.contador = itertools.count(1)
+
+    def atualizar(self, caixas):
+        """Associa as caixas detectadas às trilhas; retorna as trilhas ativas"""
+        caixas = [tuple(int(v) for v in c) for c in caixas]
+
+        # Associação gulosa pelos maiores IoU
+        pares = sorted(((iou(t.caixa, c), i, j)
+                        for i, t in enumerate(self.trilhas)
+                        for j, c in enumerate(caixas)), reverse=True)
+        trilhas_usadas = set()
+        caixas_usadas = set()
+        for valor, i, j in pares:
+            if valor < self.limiar_iou:
+                break
+            if i in trilhas_usadas or j in caixas_usadas:
+                continue
+            trilha = self.trilhas[i]
+            trilha.caixa = caixas[j]
+            trilha.perdida = 0
+            trilhas_usadas.add(i)
+            caixas_usadas.add(j)
+
+        # Trilhas sem detecção envelhecem e somem; detecções novas viram trilhas
+        ativas = []
+        for i, trilha in enumerate(self.trilhas):
+            if i not in trilhas_usadas:
+                trilha.perdida += 1
+                if trilha.perdida > self.max_perdidas:
+                    continue
+            ativas.append(trilha)
+        for j, caixa in enumerate(caixas):
+            if j not in caixas_usadas:
+                ativas.append(Trilha(next(self.contador), caixa, self.janela_votos))
+
+        self.trilhas = ativas
+        return self.trilhas
+
+    def limpar(self):
+        self.trilhas = []
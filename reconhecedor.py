@@ -0,0 +1,371 @@
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+
+# O LBPH do OpenCV devolve (-1, DBL_MAX) quando nenhuma distância fica abaixo do limiar
+DISTANCIA_MAXIMA = sys.float_info.max
+EPSILON_FLOAT = np.finfo(np.float32).eps
+
+
+def lbp_estendido(img, raio=1, vizinhos=8):
+    """LBP circular com interpolação bilinear, idêntico ao elbp do OpenCV"""
+    src = np.asarray(img, dtype=np.float32)
+    linhas, colunas = src.shape
+    centro = src[raio:linhas - raio, raio:colunas - raio]
+    resultado = np.zeros(centro.shape, dtype=np.int32)
+    um = np.float32(1)
+
+    for n in range(vizinhos):
+        # Mesma sequência de operações (double -> float) usada no OpenCV
+        x = np.float32(raio * math.cos(2.0 * math.pi * n / vizinhos))
+        y = np.float32(-raio * math.sin(2.0 * math.pi * n / vizinhos))
+        fx, fy = int(math.floor(x)), int(math.floor(y))
+        cx, cy = int(math.ceil(x)), int(math.ceil(y))
+        tx = x - np.float32(fx)
+        ty = y - np.float32(fy)
+        w1 = (um - tx) * (um - ty)
+        w2 = tx * (um - ty)
+        w3 = (um - tx) * ty
+        w4 = tx * ty
+
+        def vizinho(dy, dx):
+            return src[raio + dy:linhas - raio + dy, raio + dx:colunas - raio + dx]
+
+        t = w1 * vizinho(fy, fx) + w2 * vizinho(fy, cx) + w3 * vizinho(cy, fx) + w4 * vizinho(cy, cx)
+        bit = (t > centro) | (np.abs(t - centro) < EPSILON_FLOAT)
+        resultado |= bit.astype(np.int32) << n
+
+    return resultado
+
+
+def histograma_espacial(lbp, padroes=256, grid_x=8, grid_y=8):
+    """Histogramas normalizados de cada célula da grade, concatenados (igual ao OpenCV)"""
+    altura = lbp.shape[0] // grid_y
+    largura = lbp.shape[1] // grid_x
+    tamanho = grid_x * grid_y * padroes
+    if altura == 0 or largura == 0:
+        return np.zeros(tamanho, dtype=np.float32)
+
+    celulas = lbp[:grid_y * altura, :grid_x * largura].reshape(grid_y, altura, grid_x, largura)
+    deslocamento = (np.arange(grid_y).reshape(-1, 1, 1, 1) * grid_x
+                    + np.arange(grid_x).reshape(1, 1, -1, 1)) * padroes
+    contagens = np.bincount((celulas + deslocamento).ravel(), minlength=tamanho)
+    return contagens.astype(np.float32) / np.float32(altura * largura)
+
+
+def distancias_qui_quadrado(consultas, galeria, somas, colunas=None,
+                            elementos_por_bloco=1 << 19):
+    """Distância qui-quadrado (HISTCMP_CHISQR_ALT) de cada consulta para as colunas da galeria
+
+    galeria é D x N (uma coluna por histograma) e somas traz a soma de cada
+    coluna. Usa (q-g)²/(q+g) = (q+g) - 4qg/(q+g): as somas são pré-calculadas e
+    o termo cruzado só precisa das linhas em que alguma consulta é não nula.
+    """
+    consultas = np.atleast_2d(np.asarray(consultas, dtype=np.float32))
+    if colunas is not None:
+        somas = somas[colunas]
+    total = len(somas)
+    cruzado = np.zeros((len(consultas), total), dtype=np.float64)
+    if total == 0 or len(consultas) == 0:
+        return cruzado
+
+    linhas = np.flatnonzero(consultas.any(axis=0))
+    passo = max(8, elementos_por_bloco // (len(consultas) * total))
+
+    for inicio in range(0, len(linhas), passo):
+        indices = linhas[inicio:inicio + passo]
+        if colunas is None:
+            bloco = galeria[indices]
+        else:
+            bloco = galeria[np.ix_(indices, colunas)]
+        valores = consultas[:, indices, None]
+        soma = bloco + valores
+        # Onde q+g == 0 o produto também é 0; o epsilon só evita 0/0
+        soma += np.float32(1e-30)
+        produto = bloco * valores
+        produto /= soma
+        cruzado += produto.sum(axis=1)
+
+    resultado = 2.0 * (consultas.sum(axis=1, dtype=np.float64)[:, None] + somas[None, :])
+    resultado -= 8.0 * cruzado
+    np.maximum(resultado, 0.0, out=resultado)
+    return resultado
+
+
+def melhores_k(por_funcionario, ids, k):
+    """Seleciona, por linha, os k menores valores; retorna (ids, valores) ordenados"""
+    linhas = len(por_funcionario)
+    k = min(k, por_funcionario.shape[1])
+    if k == 0:
+        return np.zeros((linhas, 0), np.int32), np.zeros((linhas, 0), np.float64)
+    if k < por_funcionario.shape[1]:
+        melhores = np.argpartition(por_funcionario, k - 1, axis=1)[:, :k]
+    else:
+        melhores = np.tile(np.arange(k), (linhas, 1))
+    valores = np.take_along_axis(por_funcionario, melhores, axis=1)
+    ordem = np.argsort(valores, axis=1, kind="stable")
+    melhores = np.take_along_axis(melhores, ordem, axis=1)
+    return ids[melhores], np.take_along_axis(valores, ordem, axis=1)
+
+
+def predicoes_de(ids, distancias, limiar):
+    """Converte o top-1 em (id_pred, conf) com a semântica do predict do OpenCV"""
+    resultados = []
+    for i in range(len(ids)):
+        if ids.shape[1] == 0 or distancias[i, 0] >= limiar:
+            resultados.append((-1, DISTANCIA_MAXIMA))
+        else:
+            resultados.append((int(ids[i, 0]), float(distancias[i, 0])))
+    return resultados
+
+
+class ReconhecedorLBPH:
+    """Comparador LBPH vetorizado em NumPy, com a mesma API de predict() do OpenCV
+
+    A galeria fica numa matriz float32 contígua (D x N, uma coluna por imagem,
+    agrupada por rótulo) e todas as faces de um frame são comparadas numa
+    única passada por ela.
+    """
+
+    # Elementos por bloco temporário (consultas x linhas x imagens); cabe no cache L2/L3
+    ELEMENTOS_POR_BLOCO = 1 << 19
+
+    def __init__(self, histogramas, rotulos, raio=1, vizinhos=8, grid_x=8, grid_y=8,
+                 limiar=DISTANCIA_MAXIMA, transposta=False, somas=None):
+        galeria = np.asarray(histogramas, dtype=np.float32)
+        if not transposta:
+            galeria = galeria.T
+        rotulos = np.asarray(rotulos, dtype=np.int32).ravel()
+
+        # Agrupar por rótulo para obter o mínimo por funcionário com reduceat
+        if np.any(np.diff(rotulos) < 0):
+            ordem = np.argsort(rotulos, kind="stable")
+            galeria = galeria[:, ordem]
+            rotulos = rotulos[ordem]
+            somas = None
+
+        # Uma galeria mapeada em memória (já contígua e ordenada) é usada sem cópia
+        self.galeria = np.ascontiguousarray(galeria)
+        self.rotulos = rotulos
+        self.somas = (np.asarray(somas, dtype=np.float64) if somas is not None
+                      else self.galeria.sum(axis=0, dtype=np.float64))
+        self.ids, self.inicios = np.unique(self.rotulos, return_index=True)
+
+        self.raio = raio
+        self.vizinhos = vizinhos
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.limiar = limiar
+
+    @classmethod
+    def de_modelo_cv2(cls, recognizer):
+        """Extrai histogramas, rótulos e parâmetros de um cv2.face.LBPHFaceRecognizer"""
+        histogramas = recognizer.getHistograms()
+        matriz = np.vstack(histogramas) if len(histogramas) else np.zeros((0, 0), np.float32)
+        return cls(matriz, recognizer.getLabels(),
+                   raio=recognizer.getRadius(), vizinhos=recognizer.getNeighbors(),
+                   grid_x=recognizer.getGridX(), grid_y=recognizer.getGridY(),
+                   limiar=recognizer.getThreshold())
+
+    ARQUIVOS = ("galeria.npy", "rotulos.npy", "somas.npy")
+
+    def salvar(self, pasta, metadados=None):
+        """Grava o modelo no formato binário: galeria D x N float32, rótulos e somas em .npy
+
+        O modelo.json é gravado por último e marca o conjunto como completo;
+        cada arquivo é substituído com os.replace, então quem já mapeou a versão
+        anterior continua lendo os dados antigos até recarregar.
+        """
+        os.makedirs(pasta, exist_ok=True)
+        for nome, dados in zip(self.ARQUIVOS, (self.galeria, self.rotulos, self.somas)):
+            temporario = os.path.join(pasta, nome + ".tmp")
+            with open(temporario, "wb") as f:
+                np.save(f, dados)
+            os.replace(temporario, os.path.join(pasta, nome))
+
+        meta = dict(metadados or {})
+        meta.update({"formato": 1, "histogramas": len(self), "dimensao": int(self.galeria.shape[0]),
+                     "raio": self.raio, "vizinhos": self.vizinhos, "grid_x": self.grid_x,
+                     "grid_y": self.grid_y, "limiar": self.limiar})
+        temporario = os.path.join(pasta, "modelo.json.tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(temporario, os.path.join(pasta, "modelo.json"))
+
+    @classmethod
+    def carregar(cls, pasta, mmap=True):
+        """Lê o formato binário; com mmap a galeria é mapeada (sem parse, compartilhada entre processos)
+
+        Retorna (reconhecedor, metadados).
+        """
+        with open(os.path.join(pasta, "modelo.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        galeria, rotulos, somas = (np.load(os.path.join(pasta, nome), mmap_mode="r" if mmap else None)
+                                   for nome in cls.ARQUIVOS)
+        if galeria.shape != (meta["dimensao"], meta["histogramas"]) or len(rotulos) != meta["histogramas"]:
+            raise ValueError(f"Modelo binário incompleto em {pasta}")
+        reconhecedor = cls(galeria, np.asarray(rotulos), raio=meta["raio"], vizinhos=meta["vizinhos"],
+                           grid_x=meta["grid_x"], grid_y=meta["grid_y"], limiar=meta["limiar"],
+                           transposta=True, somas=somas)
+        return reconhecedor, meta
+
+    def __len__(self):
+        return len(self.rotulos)
+
+    def histograma(self, face):
+        """Histograma LBPH de uma face (mesma entrada aceita pelo predict do OpenCV)"""
+        lbp = lbp_estendido(face, self.raio, self.vizinhos)
+        return histograma_espacial(lbp, 2 ** self.vizinhos, self.grid_x, self.grid_y)
+
+    def histogramas_de(self, faces):
+        return np.stack([self.histograma(face) for face in faces])
+
+    def distancias(self, consultas, colunas=None):
+        """Distâncias de cada histograma de consulta para a galeria (ou só para as colunas dadas)"""
+        return distancias_qui_quadrado(consultas, self.galeria, self.somas, colunas,
+                                       self.ELEMENTOS_POR_BLOCO)
+
+    def top_k_histogramas(self, consultas, k=1, excluir=None):
+        """top_k a partir de histogramas já calculados
+
+        excluir: coluna da galeria a ignorar para cada consulta (avaliação leave-one-out).
+        """
+        distancias = self.distancias(consultas)
+        if excluir is not None:
+            distancias[np.arange(len(distancias)), excluir] = np.inf
+        # Menor distância de cada funcionário (a galeria está agrupada por rótulo)
+        por_funcionario = np.minimum.reduceat(distancias, self.inicios, axis=1)
+        return melhores_k(por_funcionario, self.ids, k)
+
+    def top_k(self, faces, k=1):
+        """Retorna (ids, distancias), ambos (n_faces, k), com os k funcionários mais próximos"""
+        if len(faces) == 0 or len(self.ids) == 0:
+            return np.zeros((len(faces), 0), np.int32), np.zeros((len(faces), 0), np.float64)
+        return self.top_k_histogramas(self.histogramas_de(faces), k)
+
+    def predict_lote(self, faces):
+        """predict() para todas as faces de um frame de uma vez; lista de (id_pred, conf)"""
+        ids, distancias = self.top_k(faces, 1)
+        return predicoes_de(ids, distancias, self.limiar)
+
+    def predict(self, face):
+        """Mesma semântica do LBPHFaceRecognizer.predict: (id_pred, conf)"""
+        return self.predict_lote([face])[0]
+
+
+class IndiceCentroides:
+    """Busca aproximada: pré-filtra pelos centroides de cada funcionário e reordena com LBPH exato
+
+    candidatos é o ajuste recall/latência: quantos funcionários mais próximos do
+    centroide passam para a comparação exata com todas as suas imagens.
+    """
+
+    def __init__(self, reconhecedor, centroides, candidatos=50):
+        self.reconhecedor = reconhecedor
+        self.centroides = np.ascontiguousarray(centroides, dtype=np.float32)
+        self.somas_centroides = self.centroides.sum(axis=0, dtype=np.float64)
+        self.candidatos = candidatos
+        self.limiar = reconhecedor.limiar
+        self.fins = np.append(reconhecedor.inicios[1:], len(reconhecedor))
+
+    @classmethod
+    def construir(cls, reconhecedor, candidatos=50):
+        """Calcula o histograma médio (D x E) de cada funcionário"""
+        if len(reconhecedor) == 0:
+            return cls(reconhecedor, np.zeros((reconhecedor.galeria.shape[0], 0), np.float32), candidatos)
+        somas = np.add.reduceat(reconhecedor.galeria, reconhecedor.inicios, axis=1, dtype=np.float64)
+        contagens = np.diff(np.append(reconhecedor.inicios, len(reconhecedor)))
+        return cls(reconhecedor, (somas / contagens).astype(np.float32), candidatos)
+
+    def salvar(self, caminho):
+        with open(caminho, "wb") as f:
+            np.savez(f, centroides=self.centroides, ids=self.reconhecedor.ids,
+                     total=len(self.reconhecedor))
+
+    @classmethod
+    def carregar(cls, caminho, reconhecedor, candidatos=50):
+        """Carrega o índice salvo no treino; reconstrói se não corresponder ao modelo"""
+        try:
+            with np.load(caminho) as dados:
+                if (int(dados["total"]) == len(reconhecedor)
+                        and np.array_equal(dados["ids"], reconhecedor.ids)):
+                    return cls(reconhecedor, dados["centroides"], candidatos)
+        except (OSError, KeyError, ValueError):
+            pass
+        return cls.construir(reconhecedor, candidatos)
+
+    def __len__(self):
+        return len(self.reconhecedor)
+
+    def top_k_histogramas(self, consultas, k=1, excluir=None):
+        rec = self.reconhecedor
+        if self.candidatos >= len(rec.ids):
+            return rec.top_k_histogramas(consultas, k, excluir)
+
+        # 1) Funcionários mais próximos pelo centroide (união das consultas do frame)
+        aproximadas = distancias_qui_quadrado(consultas, self.centroides, self.somas_centroides,
+                                              elementos_por_bloco=rec.ELEMENTOS_POR_BLOCO)
+        escolhidos = np.unique(np.argpartition(aproximadas, self.candidatos - 1, axis=1)
+                               [:, :self.candidatos])
+
+        # 2) LBPH exato só nas imagens desses funcionários
+        tamanhos = self.fins[escolhidos] - rec.inicios[escolhidos]
+        colunas = np.concatenate([np.arange(rec.inicios[e], self.fins[e]) for e in escolhidos])
+        distancias = rec.distancias(consultas, colunas)
+        if excluir is not None:
+            for i, coluna in enumerate(excluir):
+                distancias[i, colunas == coluna] = np.inf
+        inicios = np.concatenate(([0], np.cumsum(tamanhos)[:-1]))
+        por_funcionario = np.minimum.reduceat(distancias, inicios, axis=1)
+        return melhores_k(por_funcionario, rec.ids[escolhidos], k)
+
+    def top_k(self, faces, k=1):
+        if len(faces) == 0 or len(self.reconhecedor.ids) == 0:
+            return np.zeros((len(faces), 0), np.int32), np.zeros((len(faces), 0), np.float64)
+        return self.top_k_histogramas(self.reconhecedor.histogramas_de(faces), k)
+
+    def predict_lote(self, faces):
+        ids, distancias = self.top_k(faces, 1)
+        return predicoes_de(ids, distancias, self.limiar)
+
+    def predict(self, face):
+        return self.predict_lote([face])[0]
+
+
+def avaliar_indice(indice, amostras=200, semente=0):
+    """Compara o índice com o LBPH exato (top-1, leave-one-out sobre a galeria)
+
+    Retorna concordância (%) e tempo médio por consulta de cada busca, em ms.
+    """
+    rec = indice.reconhecedor
+    total = len(rec)
+    if total < 2:
+        return {"amostras": 0, "concordancia": 100.0, "tempo_exato_ms": 0.0, "tempo_indice_ms": 0.0}
+
+    rng = np.random.default_rng(semente)
+    colunas = np.sort(rng.choice(total, size=min(amostras, total), replace=False))
+    consultas = np.ascontiguousarray(rec.galeria[:, colunas].T)
+
+    iguais = 0
+    tempo_exato = tempo_indice = 0.0
+    for consulta, coluna in zip(consultas, colunas):
+        inicio = time.perf_counter()
+        exato, _ = rec.top_k_histogramas(consulta[None], 1, excluir=[coluna])
+        tempo_exato += time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        aproximado, _ = indice.top_k_histogramas(consulta[None], 1, excluir=[coluna])
+        tempo_indice += time.perf_counter() - inicio
+
+        iguais += int(exato[0, 0] == aproximado[0, 0])
+
+    n = len(colunas)
+    return {"amostras": n,
+            "concordancia": 100.0 * iguais / n,
+            "tempo_exato_ms": 1000.0 * tempo_exato / n,
+            "tempo_indice_ms": 1000.0 * tempo_indice / n}
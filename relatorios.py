@@ -0,0 +1,298 @@
+"""Relatórios de presença: chegadas do dia, dias presentes por mês e atrasos
+
+Uso:
+    python relatorios.py                              # mês atual
+    python relatorios.py 2026-10
+    python relatorios.py 2026-01 2026-12 --saida relatorio_2026.csv
+    python relatorios.py 2026-10 --chegadas chegadas_outubro.csv
+
+Os registros do presenca.db são copiados para registros/colunar/AAAA-MM/,
+uma pasta por mês com colunas tipadas em .npy (id, dia, segundos do dia,
+confiança numérica e entrada codificada por um dicionário). Um mês só é
+refeito quando muda no banco (quantidade de linhas ou último seq), então
+meses fechados não são relidos. As agregações rodam mês a mês sobre as
+colunas mapeadas, com NumPy. Horário de entrada, tolerância e dias contados
+vêm da seção "relatorios" do config.json.
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import numpy as np
+
+from configuracao import CAMINHO_CONFIG, carregar_config
+from presenca import ArmazenamentoPresenca
+
+
+# Colunas de cada mês e seus tipos
+COLUNAS = {"id": np.int32, "dia": np.uint8, "segundos": np.int32,
+           "confianca": np.float32, "entrada": np.int16}
+
+
+def hora_para_segundos(hora):
+    """'08:00' ou '08:00:00' -> segundos desde a meia-noite"""
+    partes = [int(p) for p in hora.split(":")]
+    return partes[0] * 3600 + partes[1] * 60 + (partes[2] if len(partes) > 2 else 0)
+
+
+def segundos_para_hora(segundos):
+    segundos = int(round(segundos))
+    return f"{segundos // 3600:02d}:{segundos // 60 % 60:02d}:{segundos % 60:02d}"
+
+
+def meses_entre(de, ate):
+    """Meses AAAA-MM de de até ate, inclusive"""
+    ano, mes = map(int, de.split("-"))
+    fim = tuple(map(int, ate.split("-")))
+    meses = []
+    while (ano, mes) <= fim:
+        meses.append(f"{ano:04d}-{mes:02d}")
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return meses
+
+
+class ArmazenamentoColunar:
+    """Cópia do presenca.db em colunas .npy, particionada por mês
+
+    Cada pasta AAAA-MM guarda um .npy por coluna e um meta.json gravado por
+    último (linhas, último seq, dicionário de entradas e nomes), como o
+    formato binário do modelo: sem meta.json válido, o mês é refeito.
+    """
+
+    def __init__(self, pasta="registros/colunar"):
+        self.pasta = pasta
+
+    def ler_meta(self, mes):
+        try:
+            with open(os.path.join(self.pasta, mes, "meta.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def sincronizar(self, presenca, de, ate):
+        """Refaz os meses entre de e ate que mudaram no banco; retorna os refeitos"""
+        meses = meses_entre(de, ate)
+        no_banco = {mes: (linhas, ultimo) for mes, linhas, ultimo in presenca.resumo_meses(meses)}
+        refeitos = []
+        for mes in meses:
+            meta = self.ler_meta(mes)
+            if mes not in no_banco:
+                # Mês limpo no banco depois de copiado
+                if meta is not None:
+                    shutil.rmtree(os.path.join(self.pasta, mes), ignore_errors=True)
+                continue
+            if meta is None or (meta["linhas"], meta["ultimo_seq"]) != no_banco[mes]:
+                self.gravar_mes(presenca, mes)
+                refeitos.append(mes)
+        return refeitos
+
+    def gravar_mes(self, presenca, mes):
+        """Converte os registros de um mês, bloco a bloco, e grava as colunas"""
+        partes = {nome: [] for nome in COLUNAS}
+        entradas = {}
+        ultimo_seq = 0
+        for bloco in presenca.colunas_do_mes(mes):
+            numeros = np.array([linha[:5] for linha in bloco], dtype=np.float64)
+            ultimo_seq = max(ultimo_seq, int(numeros[:, 0].max()))
+            for i, nome in enumerate(("id", "dia", "segundos", "confianca"), 1):
+                partes[nome].append(numeros[:, i].astype(COLUNAS[nome]))
+            partes["entrada"].append(np.array([entradas.setdefault(linha[5] or "", len(entradas))
+                                               for linha in bloco], dtype=COLUNAS["entrada"]))
+
+        pasta = os.path.join(self.pasta, mes)
+        os.makedirs(pasta, exist_ok=True)
+        linhas = 0
+        for nome, tipo in COLUNAS.items():
+            dados = np.concatenate(partes[nome]) if partes[nome] else np.empty(0, tipo)
+            linhas = len(dados)
+            temporario = os.path.join(pasta, nome + ".npy.tmp")
+            with open(temporario, "wb") as f:
+                np.save(f, dados)
+            os.replace(temporario, os.path.join(pasta, nome + ".npy"))
+
+        meta = {"formato": 1, "mes": mes, "linhas": linhas, "ultimo_seq": ultimo_seq,
+                "entradas": list(entradas),
+                "nomes": {str(i): n for i, n in presenca.nomes_do_mes(mes).items()}}
+        temporario = os.path.join(pasta, "meta.json.tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+        os.replace(temporario, os.path.join(pasta, "meta.json"))
+
+    def carregar_mes(self, mes):
+        """(colunas mapeadas, meta) de um mês, ou None se o mês não tem registros"""
+        meta = self.ler_meta(mes)
+        if meta is None:
+            return None
+        pasta = os.path.join(self.pasta, mes)
+        colunas = {nome: np.load(os.path.join(pasta, nome + ".npy"), mmap_mode="r") for nome in COLUNAS}
+        if any(len(c) != meta["linhas"] for c in colunas.values()):
+            raise ValueError(f"Mês incompleto em {pasta}; rode de novo para refazê-lo")
+        return colunas, meta
+
+
+class HorarioTrabalho:
+    """Horário de entrada (geral ou por funcionário), tolerância e dias em que se conta atraso"""
+
+    def __init__(self, entrada="08:00", tolerancia_minutos=5, dias_semana=(0, 1, 2, 3, 4), horarios=None):
+        self.entrada = hora_para_segundos(entrada)
+        self.tolerancia = int(tolerancia_minutos * 60)
+        self.dias_semana = np.array(list(dias_semana), dtype=np.int64)
+        self.horarios = {int(i): hora_para_segundos(h) for i, h in (horarios or {}).items()}
+
+    @classmethod
+    def de_config(cls, opcoes):
+        return cls(opcoes["entrada"], opcoes["tolerancia_minutos"], opcoes["dias_semana"], opcoes["horarios"])
+
+    def limites(self, ids):
+        """Horário de entrada de cada linha, em segundos"""
+        limites = np.full(len(ids), self.entrada, dtype=np.int32)
+        for id_func, entrada in self.horarios.items():
+            limites[ids == id_func] = entrada
+        return limites
+
+
+def primeiras_chegadas(colunas):
+    """Índices do primeiro registro de cada funcionário em cada dia, ordenados por (id, dia)"""
+    chave = colunas["id"].astype(np.int64) * 32 + colunas["dia"]
+    ordem = np.lexsort((colunas["segundos"], chave))
+    chave = chave[ordem]
+    primeiro = np.ones(len(chave), dtype=bool)
+    np.not_equal(chave[1:], chave[:-1], out=primeiro[1:])
+    return ordem[primeiro]
+
+
+def chegadas_do_mes(colunas, meta, horario):
+    """Primeira chegada de cada funcionário por dia, com o atraso em segundos (0 = no horário)"""
+    indices = primeiras_chegadas(colunas)
+    ids = colunas["id"][indices]
+    dias = colunas["dia"][indices]
+    segundos = colunas["segundos"][indices]
+
+    # Dia da semana: 1970-01-01 foi quinta-feira (3, com segunda = 0)
+    datas = np.datetime64(meta["mes"] + "-01", "D") + (dias.astype(np.int64) - 1)
+    semana = (datas.astype(np.int64) + 3) % 7
+    limites = horario.limites(ids)
+    conta = np.isin(semana, horario.dias_semana) & (segundos > limites + horario.tolerancia)
+    return {"id": ids, "dia": dias, "segundos": segundos,
+            "confianca": colunas["confianca"][indices], "entrada": colunas["entrada"][indices],
+            "atraso": np.where(conta, segundos - limites, 0)}
+
+
+def resumo_do_mes(chegadas):
+    """Por funcionário: (ids, dias presentes, atrasos, segundos de atraso, chegada média)"""
+    ids, grupo = np.unique(chegadas["id"], return_inverse=True)
+    dias = np.bincount(grupo, minlength=len(ids))
+    atrasos = np.bincount(grupo, weights=chegadas["atraso"] > 0, minlength=len(ids)).astype(np.int64)
+    segundos_atraso = np.bincount(grupo, weights=chegadas["atraso"], minlength=len(ids))
+    media = np.bincount(grupo, weights=chegadas["segundos"], minlength=len(ids)) / np.maximum(dias, 1)
+    return ids, dias, atrasos, segundos_atraso, media
+
+
+def gerar_relatorio(de, ate, config, presenca=None, colunar=None):
+    """Sincroniza a cópia colunar e agrega mês a mês
+
+    Retorna {"meses": [(mes, resumo, chegadas, meta)], "nomes": {id: nome},
+    "refeitos": [...], "linhas": total de registros lidos}.
+    """
+    opcoes = config["relatorios"]
+    colunar = colunar or ArmazenamentoColunar(opcoes["pasta"])
+    horario = HorarioTrabalho.de_config(opcoes)
+
+    propria = presenca is None
+    presenca = presenca or ArmazenamentoPresenca()
+    try:
+        refeitos = colunar.sincronizar(presenca, de, ate)
+    finally:
+        if propria:
+            presenca.fechar()
+
+    meses, nomes, linhas = [], {}, 0
+    for mes in meses_entre(de, ate):
+        carregado = colunar.carregar_mes(mes)
+        if carregado is None:
+            continue
+        colunas, meta = carregado
+        chegadas = chegadas_do_mes(colunas, meta, horario)
+        meses.append((mes, resumo_do_mes(chegadas), chegadas, meta))
+        nomes.update({int(i): n for i, n in meta["nomes"].items()})
+        linhas += meta["linhas"]
+    return {"meses": meses, "nomes": nomes, "refeitos": refeitos, "linhas": linhas}
+
+
+def gravar_resumo(relatorio, destino):
+    """Um CSV com uma linha por funcionário por mês"""
+    nomes = relatorio["nomes"]
+    with open(destino, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["Mes", "ID", "Nome", "DiasPresentes", "Atrasos", "MinutosAtraso", "ChegadaMedia"])
+        for mes, (ids, dias, atrasos, segundos_atraso, media), _, _ in relatorio["meses"]:
+            for i in range(len(ids)):
+                escritor.writerow([mes, int(ids[i]), nomes.get(int(ids[i]), ""), int(dias[i]), int(atrasos[i]),
+                                   round(segundos_atraso[i] / 60, 1), segundos_para_hora(media[i])])
+
+
+def gravar_chegadas(relatorio, destino):
+    """Um CSV com a primeira chegada de cada funcionário em cada dia"""
+    nomes = relatorio["nomes"]
+    with open(destino, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["ID", "Nome", "Data", "Hora", "Confianca", "Entrada", "MinutosAtraso"])
+        for mes, _, chegadas, meta in relatorio["meses"]:
+            entradas = meta["entradas"]
+            for i in range(len(chegadas["id"])):
+                id_func = int(chegadas["id"][i])
+                escritor.writerow([id_func, nomes.get(id_func, ""), f"{mes}-{int(chegadas['dia'][i]):02d}",
+                                   segundos_para_hora(chegadas["segundos"][i]),
+                                   round(float(chegadas["confianca"][i]), 1),
+                                   entradas[chegadas["entrada"][i]], round(chegadas["atraso"][i] / 60, 1)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatórios de presença por mês")
+    parser.add_argument("de", nargs="?", help="primeiro mês (AAAA-MM; padrão: mês atual)")
+    parser.add_argument("ate", nargs="?", help="último mês (AAAA-MM; padrão: o primeiro)")
+    parser.add_argument("--config", default=CAMINHO_CONFIG)
+    parser.add_argument("--saida", help="grava o resumo por funcionário e mês em CSV")
+    parser.add_argument("--chegadas", help="grava a primeira chegada de cada dia em CSV")
+    args = parser.parse_args()
+
+    de = args.de or datetime.now().strftime('%Y-%m')
+    ate = args.ate or de
+    config = carregar_config(args.config)
+
+    inicio = time.perf_counter()
+    relatorio = gerar_relatorio(de, ate, config)
+    duracao = time.perf_counter() - inicio
+
+    # Totais do período por funcionário, somando os resumos mensais
+    totais = {}
+    for _, (ids, dias, atrasos, segundos_atraso, _), _, _ in relatorio["meses"]:
+        for i in range(len(ids)):
+            total = totais.setdefault(int(ids[i]), [0, 0, 0.0])
+            total[0] += int(dias[i])
+            total[1] += int(atrasos[i])
+            total[2] += float(segundos_atraso[i])
+
+    nomes = relatorio["nomes"]
+    periodo = de if de == ate else f"{de} a {ate}"
+    print(f"📊 Presença {periodo}")
+    for id_func, (dias, atrasos, segundos_atraso) in sorted(totais.items()):
+        print(f"{id_func:>6}  {nomes.get(id_func, ''):<30} {dias:>4} dias  {atrasos:>3} atrasos  "
+              f"{segundos_atraso / 60:>7.0f} min")
+    print(f"⚡ {relatorio['linhas']} registros de {len(relatorio['meses'])} meses em {1000 * duracao:.0f} ms "
+          f"({len(relatorio['refeitos'])} meses atualizados a partir do banco)")
+
+    if args.saida:
+        gravar_resumo(relatorio, args.saida)
+        print(f"Resumo gravado em {args.saida}")
+    if args.chegadas:
+        gravar_chegadas(relatorio, args.chegadas)
+        print(f"Chegadas gravadas em {args.chegadas}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Reconhecimento sem interface gráfica (quiosques sem tela)
+
+Uso:
+    python servico.py
+    python servico.py --config quiosque.json --camera 0:Portaria --camera 1:Garagem
+    python servico.py --indice --relatorio 60
+
+Lê o config.json (ou o arquivo de --config); as opções de linha de comando
+sobrepõem o arquivo. Não há pré-visualização: nenhum frame é desenhado.
+Encerre com Ctrl+C (ou SIGTERM).
+"""
+import argparse
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+
+from configuracao import CAMINHO_CONFIG, carregar_config
+from metricas import ExportadorMetricas, RegistroMetricas
+from perfil import Perfilador
+from nucleo import CAMINHO_MODELO, NucleoReconhecimento
+
+
+def log(mensagem):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {mensagem}", flush=True)
+
+
+def ao_evento(tipo, valor):
+    if tipo == "registrado":
+        id_func, nome, confianca, entrada, hora = valor
+        origem = f" em {entrada}" if entrada else ""
+        log(f"✅ REGISTRADO: {nome} (ID: {id_func}){origem} - Confiança: {confianca:.1f}%")
+    elif tipo == "erro":
+        log(f"❌ {valor}")
+    else:
+        log(valor)
+
+
+def ler_camera(texto):
+    """"indice[:entrada]" -> item da lista "cameras" do config"""
+    indice, _, entrada = texto.partition(":")
+    return {"indice": int(indice), "backend": None, "entrada": entrada or f"Câmera {indice}"}
+
+
+def aplicar_argumentos(config, args):
+    if args.camera:
+        config["cameras"] = [ler_camera(c) for c in args.camera]
+    if args.intervalo_deteccao is not None:
+        config["reconhecimento"]["intervalo_deteccao"] = args.intervalo_deteccao
+    if args.trabalhadores is not None:
+        config["reconhecimento"]["trabalhadores"] = args.trabalhadores
+    if args.escala is not None:
+        config["deteccao"]["escala"] = args.escala
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconhecimento facial sem interface gráfica")
+    parser.add_argument("--config", default=CAMINHO_CONFIG, help="arquivo de configuração (padrão config.json)")
+    parser.add_argument("--camera", action="append",
+                        help="câmera como indice[:entrada]; pode repetir (substitui as do config)")
+    parser.add_argument("--indice", action="store_true", help="usa a busca aproximada (galerias grandes)")
+    parser.add_argument("--intervalo-deteccao", type=int)
+    parser.add_argument("--trabalhadores", type=int)
+    parser.add_argument("--escala", type=float, help="redução do frame antes da detecção")
+    parser.add_argument("--perfil", type=float, metavar="SEGUNDOS",
+                        help="perfila as threads de análise por SEGUNDOS a partir do início")
+    parser.add_argument("--perfil-frames", type=int, metavar="N",
+                        help="perfila as threads de análise pelos primeiros N frames")
+    parser.add_argument("--relatorio", type=float, default=30.0,
+                        help="segundos entre relatórios de desempenho (0 desativa)")
+    args = parser.parse_args()
+
+    config = aplicar_argumentos(carregar_config(args.config), args)
+    if not os.path.exists(CAMINHO_MODELO):
+        raise SystemExit("Treine o modelo primeiro!")
+
+    metricas = RegistroMetricas()
+    exportador = ExportadorMetricas(metricas, config["metricas"]["arquivo"], config["metricas"]["intervalo"])
+    nucleo = NucleoReconhecimento(config, ao_evento=ao_evento, metricas=metricas)
+    if nucleo.presenca.linhas_ignoradas:
+        log(f"⚠️ {nucleo.presenca.linhas_ignoradas} linhas inválidas do "
+            f"{nucleo.presenca.caminho_csv} não foram importadas")
+    nucleo.atualizar_nomes()
+    hoje = nucleo.carregar_registros_hoje()
+    log(f"📋 Carregados {nucleo.presenca.contar_dia(hoje)} registros de hoje")
+    nucleo.carregar_modelo(usar_indice=args.indice)
+    log(f"✅ Modelo carregado ({len(nucleo.recognizer)} histogramas)")
+
+    # Ctrl+C e SIGTERM encerram de forma limpa
+    encerrar = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: encerrar.set())
+    signal.signal(signal.SIGTERM, lambda *_: encerrar.set())
+
+    if args.perfil or args.perfil_frames:
+        opcoes = config["perfil"]
+        nucleo.perfilador = Perfilador(opcoes["pasta"], args.perfil or 0, args.perfil_frames or 0,
+                                       opcoes["amostragem_ms"] / 1000.0).iniciar()
+        log(f"🔬 Perfil das threads de análise em {nucleo.perfilador.pasta}")
+
+    nucleo.iniciar()
+    exportador.iniciar()
+    log("👁️ Reconhecimento iniciado (sem interface)")
+    ultimo_relatorio = time.monotonic()
+    while nucleo.reconhecendo and not encerrar.wait(1.0):
+        if args.relatorio > 0 and time.monotonic() - ultimo_relatorio >= args.relatorio:
+            ultimo_relatorio = time.monotonic()
+            for linha in nucleo.resumo_desempenho():
+                log(f"⏱ {linha}")
+
+    # Perfil em andamento: fecha a janela antes de parar, para as threads
+    # salvarem ao sair e o resumo ser gravado
+    perfilador = nucleo.perfilador
+    if perfilador:
+        perfilador.encerrar()
+    nucleo.parar(esperar=True)
+    if perfilador:
+        if perfilador.concluido.wait(5.0):
+            log(f"🔬 Perfil gravado em {perfilador.pasta}")
+        else:
+            log("⚠️ Perfil não concluído a tempo; resultados parciais")
+    exportador.parar()
+    nucleo.presenca.fechar()
+    nucleo.funcionarios.fechar()
+    log("⏹ Reconhecimento interrompido")
+
+
+if __name__ == "__main__":
+    main()
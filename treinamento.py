@@ -0,0 +1,387 @@
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import cv2
+import numpy as np
+
+
+EXTENSOES_IMAGEM = ('.jpg', '.jpeg', '.png')
+
+# Parâmetros do LBPH; mudar qualquer um deles exige reconstruir o modelo
+PARAMETROS_LBPH = {"radius": 1, "neighbors": 8, "grid_x": 8, "grid_y": 8, "threshold": 80.0}
+
+CAMINHO_MODELO = "recognizer/trainer.yml"
+CAMINHO_MANIFESTO = "recognizer/manifesto.json"
+# Um .npy por funcionário com as faces já pré-processadas (200x200, equalizadas)
+PASTA_CACHE = "recognizer/cache_faces"
+TAMANHO_FACE = (200, 200)
+# Funcionário empacotado: faces/<id>_<nome>.npy no mesmo formato do cache, com o índice .json ao lado
+EXTENSAO_PACOTE = ".npy"
+
+
+def listar_funcionarios(pasta_faces="faces"):
+    """Lista os funcionários e a assinatura (mtime, tamanho) de cada imagem
+
+    Pastas com JPGs soltos e pacotes .npy entram do mesmo jeito; num pacote
+    as assinaturas vêm do índice (as dos JPGs de origem). Se existirem os
+    dois para o mesmo funcionário, vale a pasta (recadastro depois do pacote).
+    """
+    funcionarios = {}
+    ignoradas = []
+
+    for pasta in sorted(os.listdir(pasta_faces)):
+        caminho = os.path.join(pasta_faces, pasta)
+        pacote = pasta.endswith(EXTENSAO_PACOTE)
+        if pacote:
+            pasta = pasta[:-len(EXTENSAO_PACOTE)]
+        elif not os.path.isdir(caminho):
+            continue
+
+        # Extrair ID e nome da pasta
+        partes = pasta.split("_", 1)
+        if len(partes) != 2:
+            continue
+        try:
+            id_func = int(partes[0])
+        except ValueError:
+            ignoradas.append(pasta)
+            continue
+
+        if pacote:
+            indice = ler_indice_cache(pasta, pasta_faces)
+            if indice is None:
+                ignoradas.append(pasta)
+            elif pasta not in funcionarios:
+                funcionarios[pasta] = {"id": id_func, "nome": partes[1],
+                                       "imagens": indice["assinaturas"], "pacote": True}
+            continue
+
+        imagens = {}
+        with os.scandir(caminho) as entradas:
+            for entrada in entradas:
+                if entrada.name.lower().endswith(EXTENSOES_IMAGEM) and entrada.is_file():
+                    info = entrada.stat()
+                    imagens[entrada.name] = [info.st_mtime_ns, info.st_size]
+
+        funcionarios[pasta] = {"id": id_func, "nome": partes[1], "imagens": imagens}
+
+    return funcionarios, ignoradas
+
+
+def carregar_manifesto(caminho=CAMINHO_MANIFESTO):
+    """Lê o manifesto das imagens que já estão no modelo salvo"""
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def salvar_manifesto(manifesto, caminho=CAMINHO_MANIFESTO):
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f)
+    os.replace(temporario, caminho)
+
+
+def planejar_treinamento(funcionarios, manifesto, caminho_modelo=CAMINHO_MODELO):
+    """Decide entre treino incremental e completo
+
+    Retorna (modo, pendentes, motivo), onde modo é "completo", "incremental" ou
+    "atualizado" e pendentes mapeia pasta -> lista de arquivos a treinar.
+    """
+    todas = {pasta: sorted(info["imagens"]) for pasta, info in funcionarios.items()}
+
+    if not manifesto or not os.path.exists(caminho_modelo):
+        return "completo", todas, "nenhum modelo anterior"
+    if manifesto.get("parametros") != PARAMETROS_LBPH:
+        return "completo", todas, "parâmetros do LBPH alterados"
+
+    pendentes = {}
+    treinadas = manifesto.get("pastas", {})
+
+    for pasta, info in treinadas.items():
+        atual = funcionarios.get(pasta)
+        # Funcionário removido: o LBPH não permite apagar histogramas
+        if atual is None:
+            return "completo", todas, f"funcionário removido ({pasta})"
+        # Imagem já treinada foi alterada ou apagada: funcionário recadastrado
+        for arquivo, assinatura in info["imagens"].items():
+            if atual["imagens"].get(arquivo) != assinatura:
+                return "completo", todas, f"funcionário recadastrado ({pasta})"
+
+    for pasta, info in funcionarios.items():
+        anterior = treinadas.get(pasta, {})
+        # Imagens ilegíveis ficam registradas para não serem tentadas a cada treino
+        ja_vistas = {**anterior.get("falhas", {}), **anterior.get("imagens", {})}
+        novas = sorted(a for a in info["imagens"] if ja_vistas.get(a) != info["imagens"][a])
+        if novas:
+            pendentes[pasta] = novas
+
+    if not pendentes:
+        return "atualizado", {}, "nenhuma imagem nova"
+    return "incremental", pendentes, f"{len(pendentes)} pastas novas ou alteradas"
+
+
+def preprocessar_imagem(caminho):
+    """Lê a imagem em cinza, redimensiona para 200x200 e equaliza o histograma"""
+    img = cv2.imread(caminho, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return None
+    img = cv2.resize(img, (200, 200))
+    return cv2.equalizeHist(img)
+
+
+def caminhos_cache(pasta, pasta_cache=PASTA_CACHE):
+    base = os.path.join(pasta_cache, pasta)
+    return base + ".npy", base + ".json"
+
+
+def ler_indice_cache(pasta, pasta_cache=PASTA_CACHE):
+    """Lê o índice do cache de uma pasta: ordem das linhas e assinatura de cada arquivo"""
+    try:
+        with open(caminhos_cache(pasta, pasta_cache)[1], encoding="utf-8") as f:
+            indice = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not all(chave in indice for chave in ("ordem", "assinaturas", "falhas")):
+        return None
+    return indice
+
+
+def cache_valido(pasta, imagens, pasta_cache=PASTA_CACHE):
+    """O cache vale se cobre exatamente as imagens atuais (mesmo mtime e tamanho)"""
+    indice = ler_indice_cache(pasta, pasta_cache)
+    if indice is None or not os.path.exists(caminhos_cache(pasta, pasta_cache)[0]):
+        return False
+    return {**indice["assinaturas"], **indice["falhas"]} == imagens
+
+
+def preprocessar_pasta(pasta, imagens, pasta_faces="faces", pasta_cache=PASTA_CACHE):
+    """Atualiza o cache de uma pasta decodificando só as imagens novas ou alteradas
+
+    Roda nos processos do pool; retorna quantas imagens foram decodificadas.
+    """
+    caminho_npy = caminhos_cache(pasta, pasta_cache)[0]
+    indice = ler_indice_cache(pasta, pasta_cache)
+
+    cache = None
+    linhas_cache = {}
+    if indice is not None and os.path.exists(caminho_npy):
+        try:
+            cache = np.load(caminho_npy, mmap_mode="r")
+            if len(cache) == len(indice["ordem"]):
+                linhas_cache = {nome: i for i, nome in enumerate(indice["ordem"])}
+        except (OSError, ValueError):
+            cache = None
+
+    saida = np.empty((len(imagens),) + TAMANHO_FACE, dtype=np.uint8)
+    ordem = []
+    falhas = {}
+    decodificadas = 0
+
+    for nome in sorted(imagens):
+        assinatura = imagens[nome]
+        linha = linhas_cache.get(nome)
+        if linha is not None and indice["assinaturas"].get(nome) == assinatura:
+            saida[len(ordem)] = cache[linha]
+        else:
+            img = preprocessar_imagem(os.path.join(pasta_faces, pasta, nome))
+            decodificadas += 1
+            if img is None:
+                falhas[nome] = assinatura
+                continue
+            saida[len(ordem)] = img
+        ordem.append(nome)
+
+    # Liberar o mmap antes de substituir o arquivo (necessário no Windows)
+    del cache
+
+    gravar_cache(pasta, saida[:len(ordem)], ordem, {nome: imagens[nome] for nome in ordem},
+                 falhas, pasta_cache)
+    return decodificadas
+
+
+def gravar_cache(pasta, faces, ordem, assinaturas, falhas, pasta_cache=PASTA_CACHE):
+    caminho_npy, caminho_json = caminhos_cache(pasta, pasta_cache)
+    os.makedirs(pasta_cache, exist_ok=True)
+    temporario = caminho_npy + ".tmp"
+    with open(temporario, "wb") as f:
+        np.save(f, faces)
+    os.replace(temporario, caminho_npy)
+
+    temporario = caminho_json + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump({"ordem": ordem, "assinaturas": assinaturas, "falhas": falhas}, f)
+    os.replace(temporario, caminho_json)
+
+
+def acrescentar_ao_cache(pasta, novas, pasta_cache=PASTA_CACHE):
+    """Grava no cache faces pré-processadas no próprio cadastro, sem decodificar nada
+
+    novas: {arquivo: (assinatura, face)}. Linhas de outros arquivos continuam;
+    as de mesmo nome (recadastro) são substituídas.
+    """
+    indice = ler_indice_cache(pasta, pasta_cache)
+    caminho_npy = caminhos_cache(pasta, pasta_cache)[0]
+    linhas, ordem, assinaturas = [], [], {}
+    if indice is not None and os.path.exists(caminho_npy):
+        try:
+            cache = np.load(caminho_npy, mmap_mode="r")
+            if len(cache) == len(indice["ordem"]):
+                for i, nome in enumerate(indice["ordem"]):
+                    if nome not in novas:
+                        linhas.append(np.array(cache[i]))
+                        ordem.append(nome)
+                        assinaturas[nome] = indice["assinaturas"][nome]
+            del cache
+        except (OSError, ValueError, KeyError):
+            linhas, ordem, assinaturas = [], [], {}
+
+    for nome, (assinatura, face) in sorted(novas.items()):
+        linhas.append(face)
+        ordem.append(nome)
+        assinaturas[nome] = assinatura
+    falhas = {nome: assinatura for nome, assinatura in (indice or {}).get("falhas", {}).items()
+              if nome not in novas}
+    faces = np.stack(linhas) if linhas else np.empty((0,) + TAMANHO_FACE, dtype=np.uint8)
+    gravar_cache(pasta, faces, ordem, assinaturas, falhas, pasta_cache)
+
+
+def atualizar_cache(funcionarios, pastas, pasta_faces="faces", pasta_cache=PASTA_CACHE, processos=None):
+    """Atualiza em paralelo o cache das pastas desatualizadas; retorna imagens decodificadas"""
+    os.makedirs(pasta_cache, exist_ok=True)
+
+    # Remover o cache de funcionários que não existem mais (ou que viraram pacote)
+    for arquivo in os.listdir(pasta_cache):
+        pasta, extensao = os.path.splitext(arquivo)
+        if extensao in (".npy", ".json") and (pasta not in funcionarios or funcionarios[pasta].get("pacote")):
+            os.remove(os.path.join(pasta_cache, arquivo))
+
+    # Pacotes já estão pré-processados: não há o que decodificar
+    desatualizadas = [p for p in pastas if not funcionarios[p].get("pacote")
+                      and not cache_valido(p, funcionarios[p]["imagens"], pasta_cache)]
+    if not desatualizadas:
+        return 0
+
+    tarefa = partial(preprocessar_pasta, pasta_faces=pasta_faces, pasta_cache=pasta_cache)
+    imagens = [funcionarios[p]["imagens"] for p in desatualizadas]
+    processos = processos or os.cpu_count() or 1
+
+    # Iniciar processos só compensa com várias pastas
+    if processos == 1 or len(desatualizadas) == 1:
+        return sum(map(tarefa, desatualizadas, imagens))
+
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        lote = max(1, len(desatualizadas) // (processos * 4))
+        return sum(pool.map(tarefa, desatualizadas, imagens, chunksize=lote))
+
+
+def carregar_imagens(funcionarios, pendentes, pasta_faces="faces", pasta_cache=PASTA_CACHE, processos=None):
+    """Carrega as imagens pendentes já pré-processadas
+
+    Retorna (faces, ids, carregadas, decodificadas); faces é um único array
+    uint8 pré-alocado, preenchido direto a partir do cache de cada pasta (ou
+    do pacote mapeado, no caso de funcionários empacotados).
+    """
+    decodificadas = atualizar_cache(funcionarios, list(pendentes), pasta_faces, pasta_cache, processos)
+
+    selecoes = []
+    total = 0
+    for pasta, arquivos in pendentes.items():
+        origem = pasta_faces if funcionarios[pasta].get("pacote") else pasta_cache
+        indice = ler_indice_cache(pasta, origem)
+        linhas_cache = {nome: i for i, nome in enumerate(indice["ordem"])}
+        selecao = [(linhas_cache[a], a) for a in arquivos if a in linhas_cache]
+        falhas = {a: indice["falhas"][a] for a in arquivos if a in indice["falhas"]}
+        selecoes.append((pasta, origem, selecao, falhas))
+        total += len(selecao)
+
+    faces = np.empty((total,) + TAMANHO_FACE, dtype=np.uint8)
+    ids = np.empty(total, dtype=np.int32)
+    carregadas = {}
+    posicao = 0
+
+    for pasta, origem, selecao, falhas in selecoes:
+        info = funcionarios[pasta]
+        fim = posicao + len(selecao)
+        if selecao:
+            cache = np.load(caminhos_cache(pasta, origem)[0], mmap_mode="r")
+            np.take(cache, [linha for linha, _ in selecao], axis=0, out=faces[posicao:fim])
+            del cache
+            ids[posicao:fim] = info["id"]
+        carregadas[pasta] = {"id": info["id"], "nome": info["nome"],
+                             "imagens": {a: info["imagens"][a] for _, a in selecao},
+                             "falhas": falhas}
+        posicao = fim
+
+    return faces, ids, carregadas, decodificadas
+
+
+def empacotar_funcionarios(pasta_faces="faces", pasta_originais="faces_originais",
+                           pasta_cache=PASTA_CACHE, processos=None):
+    """Converte as pastas de JPGs soltos em pacotes (um .npy mapeável + índice por funcionário)
+
+    O pacote é o próprio cache de treino: as faces são decodificadas uma
+    última vez (só as que o cache ainda não tem) e o .npy e o .json vão para
+    faces/. Depois a pasta original é movida para pasta_originais, ou apagada
+    se pasta_originais for None. Retorna {pasta: imagens empacotadas}.
+    """
+    funcionarios, _ = listar_funcionarios(pasta_faces)
+    soltas = [p for p, info in funcionarios.items() if not info.get("pacote")]
+    atualizar_cache(funcionarios, soltas, pasta_faces, pasta_cache, processos)
+
+    empacotadas = {}
+    for pasta in soltas:
+        indice = ler_indice_cache(pasta, pasta_cache)
+        # O índice antes do .npy: o pacote só é listado quando os dois estão no lugar
+        for origem, destino in reversed(list(zip(caminhos_cache(pasta, pasta_cache),
+                                                 caminhos_cache(pasta, pasta_faces)))):
+            shutil.move(origem, destino)
+        caminho = os.path.join(pasta_faces, pasta)
+        if pasta_originais is None:
+            shutil.rmtree(caminho)
+        else:
+            os.makedirs(pasta_originais, exist_ok=True)
+            shutil.move(caminho, os.path.join(pasta_originais, pasta))
+        empacotadas[pasta] = len(indice["ordem"])
+    return empacotadas
+
+
+def treinar_lbph(faces, ids, modo, caminho_modelo=CAMINHO_MODELO):
+    """Treina do zero (modo "completo") ou atualiza o modelo salvo com recognizer.update()"""
+    faces_array = np.asarray(faces, dtype=np.uint8)
+    ids_array = np.asarray(ids, dtype=np.int32)
+
+    if modo == "completo":
+        recognizer = cv2.face.LBPHFaceRecognizer_create(**PARAMETROS_LBPH)
+        recognizer.train(faces_array, ids_array)
+    else:
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(caminho_modelo)
+        recognizer.update(faces_array, ids_array)
+
+    # Grava ao lado e troca com os.replace: quem lê o trainer.yml nunca pega um arquivo pela metade
+    # (a extensão .yml fica no final porque o OpenCV escolhe o formato por ela)
+    base, extensao = os.path.splitext(caminho_modelo)
+    temporario = f"{base}.tmp{extensao}"
+    recognizer.write(temporario)
+    os.replace(temporario, caminho_modelo)
+    return recognizer
+
+
+def atualizar_manifesto(manifesto, carregadas, modo):
+    """Acrescenta (incremental) ou substitui (completo) as imagens do manifesto"""
+    if modo == "completo" or not manifesto:
+        manifesto = {"parametros": PARAMETROS_LBPH, "pastas": {}}
+
+    for pasta, info in carregadas.items():
+        anterior = manifesto["pastas"].setdefault(
+            pasta, {"id": info["id"], "nome": info["nome"], "imagens": {}, "falhas": {}})
+        anterior["imagens"].update(info["imagens"])
+        anterior.setdefault("falhas", {}).update(info["falhas"])
+
+    return manifesto